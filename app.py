@@ -1,11 +1,24 @@
 # -*- coding: utf-8 -*-
+import time
+INIZIO_SCRIPT = time.perf_counter()  # Per i tempi di avvio: al primo rerun gli import sono a freddo
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
+import os
 from datetime import datetime
 
+import dati
+import grafici
+import regolazione
+import telemetria
+
+# I moduli delle singole sezioni (rendimenti, screening, stress, tabelle, valutazione,
+# whatif) sono importati nel frammento che li usa: le sezioni pigre o su richiesta non
+# pesano sull'avvio a freddo
+
+telemetria.avvio("import", INIZIO_SCRIPT)
+
 # --- Configurazione Pagina ---
 st.set_page_config(
     page_title="Analisi Dividendi ENAV",
@@ -13,181 +26,55 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- Dati Chiave Estratti ---
-TICKER = "ENAV.MI"
-NOME_SOCIETA = "ENAV S.p.A."
-SETTORE = "Infrastrutture di Trasporto - Controllo del Traffico Aereo"
-ULTIMO_DPS_PAGATO_VAL = 0.23  # Relativo all'esercizio 2023
-ANNO_ULTIMO_DPS = 2023
-PREZZO_RIFERIMENTO_APPROX = 3.60  # Prezzo attuale approssimativo
-POLITICA_PAYOUT = "80% del Free Cash Flow"
-DPS_ATTESO_2024_VAL = 0.27  # Proposto per esercizio 2024
-CRESCITA_ATTESA_DPS_2024 = "+17.4%"  # Crescita rispetto al 2023
-YIELD_ATTUALE = round((ULTIMO_DPS_PAGATO_VAL / PREZZO_RIFERIMENTO_APPROX) * 100, 2)
-YIELD_FORWARD = round((DPS_ATTESO_2024_VAL / PREZZO_RIFERIMENTO_APPROX) * 100, 2)
-
-# Dati storici Dividendo Per Azione (DPS) - CORRETTO per il 2019
-dps_storico_data = {
-    'Anno Esercizio': [2019, 2020, 2021, 2022, 2023, 2024],
-    'DPS (€)': [0.21, 0.0, 0.1081, 0.1967, 0.23, 0.27],  # 2024 proposto, 2019 corretto
-    'Nota': ['Pre-Covid', 'Covid (Cancellato)', 'Ripresa', 'Crescita', 'Record', 'Proposto'],
-    'Tipo': ['Storico', 'Storico', 'Storico', 'Storico', 'Storico', 'Proposto']
-}
-df_dps = pd.DataFrame(dps_storico_data)
-
-# Dati Finanziari Chiave - CORRETTO per il 2019
-fin_data = {
-    'Metrica': [
-        'Ricavi Totali (€M)',
-        'EBITDA (€M)',
-        'Utile Netto (€M)',
-        'EPS Diluito (€)',
-        'Cash Flow Operativo (CFO, €M)',
-        'Capex (€M)',
-        'Free Cash Flow (FCF, €M)',
-        'Debito Netto / EBITDA (Leva)',
-        'Dividendo per Azione (DPS, €)'
-    ],
-    '2019': [
-        911.91,  # Revenue
-        312.27,  # EBITDA
-        118.43,  # Net Income
-        0.22,    # Diluted EPS
-        341.63,  # CFO
-        -101.76, # Capex
-        225.32,  # FCF
-        'Cassa Netta', # Leva
-        0.21      # DPS - CORRETTO
-    ],
-    '2020': [
-        780.87,  # Revenue
-        210.42,  # EBITDA
-        54.28,   # Net Income
-        0.10,    # Diluted EPS
-        -173.06, # CFO
-        -74.0,   # Capex
-        -264.55, # FCF
-        '1.45x', # Leva
-        0.0      # DPS (cancellato)
-    ],
-    '2021': [
-        845.11,  # Revenue
-        238.83,  # EBITDA
-        78.37,   # Net Income
-        0.14,    # Diluted EPS
-        -157.15, # CFO
-        -71.50,  # Capex
-        -242.78, # FCF
-        '1.85x', # Leva
-        0.1081   # DPS
-    ],
-    '2022': [
-        952.78,  # Revenue
-        284.38,  # EBITDA
-        105.0,   # Net Income
-        0.19,    # Diluted EPS
-        236.90,  # CFO
-        -79.76,  # Capex
-        139.13,  # FCF
-        '1.1x',  # Leva
-        0.1967   # DPS
-    ],
-    '2023': [
-        1011.31, # Revenue
-        313.23,  # EBITDA
-        112.92,  # Net Income
-        0.21,    # Diluted EPS
-        210.62,  # CFO
-        -83.83,  # Capex
-        100.14,  # FCF
-        '0.8x',  # Leva
-        0.23     # DPS
-    ],
-    '2024E': [
-        1037.0,  # Revenue (stima)
-        311.0,   # EBITDA (stima)
-        126.0,   # Net Income (stima)
-        0.23,    # Diluted EPS (stima)
-        257.44,  # CFO (stima)
-        -85.0,   # Capex (stima)
-        199.0,   # FCF (stima da piano industriale)
-        '<0.8x', # Leva (stima)
-        0.27     # DPS proposto
-    ]
-}
-df_fin = pd.DataFrame(fin_data)
-
-# Creazione di un DataFrame più pulito per grafici finanziari - CORRETTO per il 2019
-df_fin_clean = pd.DataFrame({
-    'Anno': ['2019', '2020', '2021', '2022', '2023', '2024E'],
-    'Ricavi (€M)': [911.91, 780.87, 845.11, 952.78, 1011.31, 1037.0],
-    'EBITDA (€M)': [312.27, 210.42, 238.83, 284.38, 313.23, 311.0],
-    'Utile Netto (€M)': [118.43, 54.28, 78.37, 105.0, 112.92, 126.0],
-    'EPS (€)': [0.22, 0.10, 0.14, 0.19, 0.21, 0.23],
-    'FCF (€M)': [225.32, -264.55, -242.78, 139.13, 100.14, 199.0],
-    'DPS (€)': [0.21, 0.0, 0.1081, 0.1967, 0.23, 0.27]  # CORRETTO per il 2019
-})
-
-# Calcoliamo il payout ratio (DPS/EPS e DPS/FCF) - CORRETTO per il 2019
-df_payout = pd.DataFrame({
-    'Anno': [2019, 2020, 2021, 2022, 2023, 2024],
-    'EPS (€)': [0.22, 0.10, 0.14, 0.19, 0.21, 0.23],
-    'DPS (€)': [0.21, 0.0, 0.1081, 0.1967, 0.23, 0.27],  # CORRETTO per il 2019
-    'FCF per Share (€)': [0.42, -0.49, -0.45, 0.26, 0.19, 0.37]
-})
-
-df_payout['Payout Ratio (% di EPS)'] = (df_payout['DPS (€)'] / df_payout['EPS (€)']) * 100
-df_payout['Payout Ratio (% di FCF)'] = (df_payout['DPS (€)'] / df_payout['FCF per Share (€)']) * 100
-df_payout.loc[df_payout['FCF per Share (€)'] <= 0, 'Payout Ratio (% di FCF)'] = 0  # Gestisce divisione per zero o FCF negativo
-
-# Dati proiezione dividendi futuri basati sul piano industriale - CORRETTO per il 2019
-df_dps_projection = pd.DataFrame({
-    'Anno': [2019, 2020, 2021, 2022, 2023, 2024, 2025, 2026, 2027, 2028, 2029],
-    'DPS (€)': [0.21, 0.0, 0.1081, 0.1967, 0.23, 0.27, 0.28, 0.29, 0.30, 0.31, 0.32],  # CORRETTO per il 2019
-    'Tipo': ['Storico', 'Storico', 'Storico', 'Storico', 'Storico', 'Proposto', 'Piano', 'Piano', 'Piano', 'Piano', 'Piano']
-})
-
-# Dati Yield annuale
-df_yield = pd.DataFrame({
-    'Anno': ['2021', '2022', '2023', '2024E'],
-    'Dividend Yield (%)': [2.7, 5.5, 6.4, 7.0],
-})
-
-# Dati per reset regolatorio e EBITDA
-df_ebitda_reset = pd.DataFrame({
-    'Anno': ['2023', '2024E', '2025E', '2026E', '2027E', '2028E', '2029E'],
-    'EBITDA (€M)': [313.23, 311.0, 225.0, 246.0, 285.0, 325.0, 361.0],
-    'Fase': ['Attuale', 'Attuale', 'Post-Reset', 'Recupero', 'Recupero', 'Recupero', 'Recupero']
-})
-
-# Dati per confronto yield con peers
-df_yield_comp = pd.DataFrame({
-    'Società': ['ENAV', 'Media Utilities IT', 'FTSE MIB', 'BTP 10Y', 'Media Infrastr. UE'],
-    'Dividend Yield 2024E (%)': [7.0, 5.2, 4.5, 3.8, 4.1]
-})
-
-# Dati per composizione ricavi (regolati vs non regolati)
-df_revenue_split_current = pd.DataFrame({
-    'Segmento': ['Attività Regolamentate (En-route)', 'Attività Regolamentate (Terminal)', 'Attività Non Regolamentate'],
-    'Ricavi 2023 (%)': [65, 30, 5]
-})
-
-df_revenue_split_future = pd.DataFrame({
-    'Segmento': ['Attività Regolamentate (En-route)', 'Attività Regolamentate (Terminal)', 'Attività Non Regolamentate'],
-    'Ricavi 2029E (%)': [60, 31, 9]
-})
-
-# Dati per impatto target 2025-2029
-df_targets = pd.DataFrame({
-    'Metrica': ['Ricavi', 'EBITDA', 'Utile Netto', 'FCF Cumulato', 'Dividendi Cumulati', 'Debt/EBITDA'],
-    '2024': [1037, 311, 126, 'N/A', 'N/A', 0.8],
-    '2029 Target': [1200, 361, 165, '€1 Mld', '€813M', 0.0],
-    'CAGR/Diff': ['+3%', '+3% (+13% dal 2025)', '+6%', '€200M/anno medio', '€160M/anno medio', '-0.8x']
-})
+# --- Telemetria (ENAV_TELEMETRIA=1; pannello con ?debug=1) ---
+INIZIO_RERUN = telemetria.orologio()
+telemetria.avvia_esportatore()
+
+# Gli spazi della cache su disco delle versioni precedenti si eliminano all'avvio del processo
+dati.elimina_spazi_superati(grafici.SPAZIO_FIGURE)
+
+# --- Società analizzata ---
+# Il ticker arriva da ?ticker=... (default ENAV.MI); con più emittenti in archivio compare un selettore
+SOCIETA_DISPONIBILI = dati.societa_disponibili()
+TICKER = st.query_params.get("ticker", dati.TICKER)
+if TICKER not in SOCIETA_DISPONIBILI:
+    TICKER = dati.TICKER
+if len(SOCIETA_DISPONIBILI) > 1:
+    TICKER = st.sidebar.selectbox("Società", SOCIETA_DISPONIBILI, index=SOCIETA_DISPONIBILI.index(TICKER))
+    st.query_params["ticker"] = TICKER
+
+# --- Dati Chiave Estratti (pipeline di metriche in metriche.py, in cache per ticker) ---
+kpi = dati.carica_kpi(TICKER)
+NOME_SOCIETA = kpi['nome']
+NOME_BREVE = kpi['nome_breve']
+SETTORE = kpi['settore']
+ULTIMO_DPS_PAGATO_VAL = kpi['ultimo_dps']  # Ultimo dividendo storico
+ANNO_ULTIMO_DPS = int(kpi['anno_ultimo_dps'])
+PREZZO_RIFERIMENTO_APPROX = kpi['prezzo_riferimento']  # Prezzo attuale approssimativo
+POLITICA_PAYOUT = kpi['politica_payout']
+ANNO_DPS_ATTESO = int(kpi['anno_dps_atteso'])
+DPS_ATTESO_VAL = kpi['dps_atteso']  # Proposto per l'esercizio successivo
+CRESCITA_ATTESA_DPS = f"{kpi['crescita_dps']:+.1f}%"  # Crescita rispetto all'ultimo DPS
+YIELD_ATTUALE = kpi['yield_attuale']
+YIELD_FORWARD = kpi['yield_forward']
+
+# --- Dati (costruiti una sola volta e condivisi tra i rerun, vedi dati.py) ---
+df_dps = dati.carica_dps(TICKER)
+df_fin = dati.carica_fin(TICKER)
+df_fin_clean = dati.carica_fin_clean(TICKER)
+df_payout = dati.carica_payout(TICKER)
+df_fcf_div = dati.carica_fcf_div(TICKER)
+df_dps_projection = dati.carica_dps_projection(TICKER)
+df_yield = dati.carica_yield(TICKER)
+df_ebitda_reset = dati.carica_ebitda_reset(TICKER)
+RESET = {nome: float(valore[0]) for nome, valore in regolazione.indicatori(dati.percorso_reset(df_ebitda_reset)).items()}
+df_yield_comp = dati.carica_yield_comp()
+df_revenue_split_current, df_revenue_split_future = dati.carica_revenue_split()
+df_targets = dati.carica_targets()
 
 # Rischi e punti di forza
 rischi = [
-    "Reset regolatorio RP4 (2025): temporanea flessione dell'EBITDA del 28% nel 2025",
+    f"Reset regolatorio RP4 ({dati.ANNO_RESET}): temporanea flessione dell'EBITDA del {-RESET['calo_reset']:.0%} nel {dati.ANNO_RESET}",
     "Potenziali eventi straordinari sul traffico aereo (come accaduto con COVID-19)",
     "Rischi esecutivi nelle iniziative di crescita non regolamentate",
     "Rischi legati alle acquisizioni M&A programmate (fino a €350M)",
@@ -203,971 +90,661 @@ punti_forza = [
     "WACC regolatorio più elevato nel nuovo periodo (6.7% vs 4.4% precedente)"
 ]
 
-# --- Titolo e Header ---
-st.title(f"✈️ Analisi Dividendi: {NOME_SOCIETA} ({TICKER})")
-st.caption(f"Analisi aggiornata al: {datetime.now().strftime('%d/%m/%Y')}. Dati finanziari storici fino al 2023, stime 2024, e Piano Industriale 2025-2029.")
-st.markdown("---")
-
-# --- Metriche Chiave Dividendo ---
-st.subheader("📊 Indicatori Chiave del Dividendo")
-col1, col2, col3, col4 = st.columns(4)
-with col1:
-    st.metric(
-        label=f"Ultimo DPS Pagato (Esercizio {ANNO_ULTIMO_DPS})",
-        value=f"€ {ULTIMO_DPS_PAGATO_VAL:.4f}",
-        help="Dividendo relativo all'esercizio 2023, pagato nel 2024."
-    )
-with col2:
-    st.metric(
-        label=f"Dividend Yield (Attuale)",
-        value=f"{YIELD_ATTUALE:.2f}%",
-        help=f"Basato sull'ultimo DPS (€{ULTIMO_DPS_PAGATO_VAL:.4f}) e un prezzo di riferimento di €{PREZZO_RIFERIMENTO_APPROX:.2f}."
-    )
-with col3:
-    st.metric(
-        label="Politica di Payout",
-        value=POLITICA_PAYOUT,
-        help="Politica dichiarata dalla società per la distribuzione del free cash flow."
-    )
-with col4:
-    st.metric(
-        label="DPS Proposto (Esercizio 2024)",
-        value=f"€ {DPS_ATTESO_2024_VAL:.4f}",
-        delta=CRESCITA_ATTESA_DPS_2024,
-        help=f"Dividendo proposto per l'esercizio 2024, con un incremento del 17.4% rispetto al 2023."
-    )
-st.markdown("---")
-
-# --- Grafici Dividendi ---
-st.subheader("📈 Analisi del Dividendo")
-
-# Layout a 2 colonne per i grafici
-col1, col2 = st.columns(2)
-
-# GRAFICO 1: Storico DPS - nella prima colonna - CORRETTO
-with col1:
-    fig_dps = px.bar(
-        df_dps,
-        x='Anno Esercizio',
-        y='DPS (€)',
-        title="Evoluzione del Dividendo per Azione ENAV (2019-2024)",
-        text='DPS (€)',
-        color='Tipo',
-        color_discrete_map={'Storico': 'royalblue', 'Proposto': 'green'},
-        barmode='group'
-    )
-    
-    # Aggiunta di annotazioni per spiegare gli eventi chiave
-    fig_dps.add_annotation(
-        x=2020, y=0.01,
-        text="Cancellato<br>per Covid-19",
-        showarrow=True,
-        font=dict(size=10, color="red"),
-        arrowhead=2,
-        arrowsize=1,
-        arrowwidth=1,
-        ax=-20, ay=-30
-    )
-    
-    fig_dps.add_annotation(
-        x=2019, y=0.21,
-        text="Dividendo<br>pre-Covid",
-        showarrow=True,
-        font=dict(size=10, color="navy"),
-        arrowhead=2,
-        arrowsize=1,
-        arrowwidth=1,
-        ax=-20, ay=-20
-    )
-    
-    fig_dps.add_annotation(
-        x=2022, y=0.22,
-        text="Ripresa e<br>crescita post-Covid",
-        showarrow=True,
-        font=dict(size=10),
-        arrowhead=2,
-        arrowsize=1,
-        arrowwidth=1,
-        ax=20, ay=-30
-    )
-    
-    fig_dps.update_traces(texttemplate='€%{y:.4f}', textposition="outside")
-    fig_dps.update_layout(
-        xaxis_title="Anno Esercizio Fiscale", 
-        yaxis_title="Dividendo per Azione (€)",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
-    st.plotly_chart(fig_dps, use_container_width=True)
-
-# GRAFICO 2: Dividend Yield - nella seconda colonna
-with col2:
-    fig_yield = px.bar(
-        df_yield,
-        x='Anno',
-        y='Dividend Yield (%)',
-        title="Andamento del Dividend Yield",
-        text='Dividend Yield (%)',
-        color='Dividend Yield (%)',
-        color_continuous_scale=px.colors.sequential.Viridis
-    )
-    fig_yield.update_traces(texttemplate='%{y:.1f}%', textposition="outside")
-    fig_yield.update_layout(xaxis_title="Anno", yaxis_title="Dividend Yield (%)")
-    st.plotly_chart(fig_yield, use_container_width=True)
-    
-st.caption("Fonte: Dati estratti dall'analisi e dalle relazioni finanziarie. Si nota la progressiva crescita del dividendo e del yield dopo la cancellazione dovuta alla pandemia.")
-st.markdown("---")
-
-# --- Sezione Sostenibilità del Dividendo ---
-st.subheader("📊 Sostenibilità e Proiezioni del Dividendo")
-
-# Layout a 2 colonne per i grafici
-col1, col2 = st.columns(2)
-
-# GRAFICO 3: Payout Ratio migliorato - nella prima colonna
-with col1:
-    # Creamo un grafico combinato che mostri entrambi i tipi di payout ratio
-    fig_payout = go.Figure()
-    
-    # Filtriamo gli anni con dividendi positivi
-    df_payout_filtered = df_payout[df_payout['DPS (€)'] > 0]
-    
-    # Aggiungiamo barre per il payout ratio rispetto all'EPS
-    fig_payout.add_trace(go.Bar(
-        x=df_payout_filtered['Anno'],
-        y=df_payout_filtered['Payout Ratio (% di EPS)'],
-        name='% dell\'EPS',
-        text=df_payout_filtered['Payout Ratio (% di EPS)'].round(1).astype(str) + '%',
-        textposition="outside",
-        marker_color='rgba(0, 128, 0, 0.7)',
-    ))
-    
-    # Aggiungiamo barre per il payout ratio rispetto al FCF dove FCF è positivo
-    df_payout_fcf = df_payout_filtered[df_payout_filtered['FCF per Share (€)'] > 0]
-    fig_payout.add_trace(go.Bar(
-        x=df_payout_fcf['Anno'],
-        y=df_payout_fcf['Payout Ratio (% di FCF)'],
-        name='% del FCF',
-        text=df_payout_fcf['Payout Ratio (% di FCF)'].round(1).astype(str) + '%',
-        textposition="outside",
-        marker_color='rgba(65, 105, 225, 0.7)',
-        visible='legendonly'  # Inizialmente nascosto, attivabile dalla legenda
-    ))
-    
-    # Aggiungiamo linea target policy (80% del FCF)
-    fig_payout.add_shape(
-        type="line",
-        x0=df_payout_filtered['Anno'].min()-0.5,
-        x1=df_payout_filtered['Anno'].max()+0.5,
-        y0=80,
-        y1=80,
-        line=dict(color="red", width=2, dash="dash"),
-    )
-    
-    fig_payout.add_annotation(
-        x=df_payout_filtered['Anno'].max(),
-        y=85,
-        text="Target Payout: 80% del FCF",
-        showarrow=False,
-        font=dict(color="red")
-    )
-    
-    # Aggiungiamo annotazione per spiegare il payout ratio alto nel 2021
-    if df_payout_filtered['Anno'].min() <= 2021 <= df_payout_filtered['Anno'].max():
-        eps_2021 = df_payout_filtered.loc[df_payout_filtered['Anno'] == 2021, 'Payout Ratio (% di EPS)'].values[0]
-        if eps_2021 > 70:  # Solo se è un valore alto
-            fig_payout.add_annotation(
-                x=2021,
-                y=eps_2021,
-                text="EPS impattato<br>dal COVID",
-                showarrow=True,
-                arrowhead=2,
-                arrowsize=1,
-                arrowwidth=1,
-                arrowcolor="green",
-                ax=25,
-                ay=-30
-            )
-    
-    fig_payout.update_layout(
-        title={
-            'text': "Payout Ratio di ENAV",
-            'font': {'size': 16}
-        },
-        xaxis_title="Anno",
-        yaxis_title="Payout Ratio (%)",
-        barmode='group',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        yaxis=dict(
-            range=[0, max(df_payout_filtered['Payout Ratio (% di EPS)'].max(), 
-                          df_payout_fcf['Payout Ratio (% di FCF)'].max() if not df_payout_fcf.empty else 0) * 1.15]
-        )
-    )
-    
-    st.plotly_chart(fig_payout, use_container_width=True)
-    
-    # Aggiungiamo una spiegazione più chiara sotto il grafico
-    st.info("""
-    **Note sul Payout Ratio:**
-    - ENAV ha una politica di dividendi basata sull'80% del Free Cash Flow (FCF)
-    - Il grafico mostra il dividendo come percentuale dell'Utile per Azione (EPS)
-    - È possibile visualizzare anche il ratio basato sul FCF attivandolo dalla legenda (solo per anni con FCF positivo)
-    - Nel 2021, il FCF era negativo a causa degli impatti COVID, ma la società ha comunque ripreso la distribuzione dei dividendi
-    """)
-
-
-# GRAFICO 4: FCF vs Dividend Paid - nella seconda colonna
-with col2:
-    # Calcoliamo i dividendi totali pagati (DPS * numero azioni approssimative - 541.74M azioni)
-    azioni_totali = 541.74  # milioni
-
-    df_fcf_div = pd.DataFrame({
-        'Anno': [2021, 2022, 2023, 2024],
-        'FCF (€M)': [-242.78, 139.13, 100.14, 199.0],
-        'Dividendi Totali Pagati (€M)': [
-            0.1081 * azioni_totali,
-            0.1967 * azioni_totali,
-            0.23 * azioni_totali,
-            0.27 * azioni_totali
-        ]
-    })
-    
-    df_fcf_div['Dividendi Totali Pagati (€M)'] = df_fcf_div['Dividendi Totali Pagati (€M)'].round(1)
-    
-    # Calcoliamo la copertura FCF solo per gli anni con FCF positivo
-    df_fcf_div['Copertura FCF'] = 0.0
-    mask = df_fcf_div['FCF (€M)'] > 0
-    df_fcf_div.loc[mask, 'Copertura FCF'] = (df_fcf_div.loc[mask, 'FCF (€M)'] / df_fcf_div.loc[mask, 'Dividendi Totali Pagati (€M)']).round(2)
-    
-    fig_fcf_div = go.Figure()
-    fig_fcf_div.add_trace(go.Bar(
-        x=df_fcf_div['Anno'],
-        y=df_fcf_div['FCF (€M)'],
-        name='Free Cash Flow',
-        marker_color='royalblue'
-    ))
-    fig_fcf_div.add_trace(go.Bar(
-        x=df_fcf_div['Anno'],
-        y=df_fcf_div['Dividendi Totali Pagati (€M)'],
-        name='Dividendi Pagati',
-        marker_color='darkgreen'
-    ))
-    
-    # Aggiungiamo la linea di Copertura FCF solo per gli anni con FCF positivo
-    y_values = df_fcf_div['Copertura FCF'] * 100  # Scala per visualizzazione
-    fig_fcf_div.add_trace(go.Scatter(
-        x=df_fcf_div.loc[mask, 'Anno'],
-        y=y_values[mask],
-        name='Copertura FCF (volte)',
-        mode='lines+markers+text',
-        text=df_fcf_div.loc[mask, 'Copertura FCF'],
-        textposition="top center",
-        yaxis='y2',
-        line=dict(color='red', width=2)
-    ))
-    
-    fig_fcf_div.update_layout(
-        title="Free Cash Flow vs Dividendi Pagati",
-        barmode='group',
-        xaxis_title="Anno",
-        yaxis_title="Milioni di €",
-        yaxis2=dict(
-            title="Copertura FCF (volte)",
-            overlaying="y",
-            side="right",
-            range=[0, 3],
-            showgrid=False
-        ),
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        )
-    )
-    
-    # Aggiungiamo annotazione per spiegare il FCF negativo nel 2021
-    fig_fcf_div.add_annotation(
-        x=2021, y=-242.78/2,
-        text="FCF negativo<br>post-Covid",
-        showarrow=True,
-        font=dict(color="white"),
-        arrowhead=2,
-        arrowsize=1,
-        arrowwidth=1,
-        ax=40, ay=0
-    )
-    
-    st.plotly_chart(fig_fcf_div, use_container_width=True)
-
-st.caption("Fonte: Elaborazione su dati finanziari. I grafici mostrano il payout ratio rispetto alla politica dichiarata (80% del FCF) e la capacità del FCF di coprire i dividendi distribuiti. Nel 2021 il FCF era negativo a causa degli impatti COVID, ma la società ha comunque ripreso la distribuzione dei dividendi con un approccio progressivo.")
-st.markdown("---")
+# Sezioni dell'analisi completa: (titolo, file in contenuti/analisi_completa/, aperta di default)
+SEZIONI_ANALISI_COMPLETA = [
+    ("**Executive Summary**", "analisi_completa/00_executive_summary.md", True),
+    ("**1. Storico dei Dividendi e Rendimento**", "analisi_completa/01_storico_dividendi.md", False),
+    ("**2. Modello di Business e Stabilità dei Flussi di Cassa**", "analisi_completa/02_modello_business.md", False),
+    ("**3. Piano Industriale 2025-2029 e Prospettive di Crescita**", "analisi_completa/03_piano_industriale.md", False),
+    ("**4. Focus sulle Attività Non Regolamentate**", "analisi_completa/04_attivita_non_regolamentate.md", False),
+    ("**5. Investimenti per la Crescita**", "analisi_completa/05_investimenti.md", False),
+    ("**6. Elementi Distintivi per l'Investitore a Dividendo**", "analisi_completa/06_elementi_distintivi.md", False),
+    ("**7. Analisi del Reset Regolatorio RP4**", "analisi_completa/07_reset_regolatorio.md", False),
+    ("**8. Sostenibilità finanziaria e posizione di cassa**", "analisi_completa/08_sostenibilita_finanziaria.md", False),
+    ("**9. Principali Rischi da Considerare**", "analisi_completa/09_rischi.md", False),
+    ("**10. Valutazione e Prospettive per l'Investitore**", "analisi_completa/10_valutazione.md", False),
+    ("**11. Conclusioni**", "analisi_completa/11_conclusioni.md", False),
+]
 
-# --- Proiezione Futura dei Dividendi ---
-st.subheader("🔮 Proiezione Futura del Dividendo (Piano Industriale 2025-2029)")
-
-fig_proj = px.line(
-    df_dps_projection,
-    x='Anno',
-    y='DPS (€)',
-    title="Dividendo per Azione: Storico e Proiezione Piano Industriale",
-    markers=True,
-    text='DPS (€)',
-    color='Tipo',
-    color_discrete_map={'Storico': 'royalblue', 'Proposto': 'green', 'Piano': 'orange'}
-)
-fig_proj.update_traces(texttemplate='€%{y:.4f}', textposition="top center")
+# --- Rendering pigro ---
+# Con RENDER_PIGRO attivo (default; disattivabile con ENAV_RENDER_PIGRO=0) i testi lunghi
+# e i grafici sotto la piega vengono costruiti e inviati al browser solo quando aperti.
+RENDER_PIGRO = os.environ.get("ENAV_RENDER_PIGRO", "1") != "0"
 
-# Aggiungi etichette e annotazioni
-fig_proj.add_vrect(
-    x0=2024.5, x1=2029.5, 
-    fillcolor="lightgreen", opacity=0.2, 
-    line_width=0
-)
 
-fig_proj.add_annotation(
-    x=2027, y=0.31,
-    text="Piano Industriale<br>2025-2029",
-    showarrow=True,
-    arrowhead=2,
-    arrowcolor="green",
-    arrowwidth=2,
-    arrowsize=1,
-    ax=0,
-    ay=-40
-)
+def espansore_pigro(titolo, render, chiave, aperto=False):
+    """Come st.expander, ma in modalità pigra il contenuto è generato solo se aperto."""
+    if not RENDER_PIGRO:
+        with st.expander(titolo, expanded=aperto), telemetria.misura("espansore", chiave):
+            render()
+        return
+    with st.container(border=True):
+        if st.toggle(titolo, value=aperto, key=f"pigro_{chiave}"):
+            with telemetria.misura("espansore", chiave):
+                render()
 
-fig_proj.add_annotation(
-    x=2025, y=0.25,
-    text="Reset Regolatorio RP4<br>inizio 2025",
-    showarrow=True,
-    arrowhead=2,
-    arrowcolor="red",
-    arrowwidth=2,
-    arrowsize=1,
-    ax=-40,
-    ay=30
-)
 
-fig_proj.update_layout(xaxis_title="Anno", yaxis_title="Dividendo per Azione (€)")
-st.plotly_chart(fig_proj, use_container_width=True)
-
-# Aggiungiamo una spiegazione del reset regolatorio
-st.info("""
-**Reset Regolatorio RP4 (2025-2029)**: All'inizio del nuovo periodo regolatorio nel 2025, ENAV subirà un temporaneo calo dell'EBITDA (-28%), 
-che è un fenomeno fisiologico dovuto all'azzeramento dei meccanismi di bilanciamento del traffico e al reset dei parametri economici. 
-Nonostante questo, la società ha confermato che i dividendi continueranno a crescere anche durante questa fase,
-grazie alla forte posizione di cassa e alla generazione di Free Cash Flow.
-""")
-
-col1, col2 = st.columns(2)
-
-# GRAFICO 5: Reset Regolatorio e EBITDA - Versione corretta
-with col1:
-    # Invece di usare barre per fase, usiamo un approccio più semplice con colori per fase
-    # Questo evita i problemi di visualizzazione con le barre raggruppate
-    
-    # Mappatura dei colori per ogni fase
-    color_map = {
-        'Attuale': 'rgb(65, 105, 225)',      # Blu
-        'Post-Reset': 'rgb(220, 20, 60)',    # Rosso
-        'Recupero': 'rgb(46, 139, 87)'       # Verde
-    }
-    
-    # Creiamo un array di colori basato sulla fase di ogni punto dati
-    colors = [color_map[fase] for fase in df_ebitda_reset['Fase']]
-    
-    # Creiamo un grafico a barre semplice con colori diversi per ogni barra
-    fig_reset = go.Figure()
-    
-    # Aggiungiamo le barre dell'EBITDA con colori personalizzati
-    fig_reset.add_trace(go.Bar(
-        x=df_ebitda_reset['Anno'],
-        y=df_ebitda_reset['EBITDA (€M)'],
-        marker_color=colors,
-        text=df_ebitda_reset['EBITDA (€M)'].round().astype(int).astype(str) + "M€",
-        textposition='auto',
-        width=0.6,
-        showlegend=False
-    ))
-    
-    # Aggiungiamo la linea di tendenza
-    fig_reset.add_trace(go.Scatter(
-        x=df_ebitda_reset['Anno'],
-        y=df_ebitda_reset['EBITDA (€M)'],
-        mode='lines+markers',
-        line=dict(color='rgba(0, 0, 0, 0.7)', width=2, dash='dot'),
-        showlegend=False
-    ))
-    
-    # Aggiungiamo una legenda manuale con div colorati
-    fig_reset.add_annotation(
-        x=0.02, y=1.12,
-        xref="paper", yref="paper",
-        text="<span style='color:rgb(65, 105, 225);'>■</span> Attuale &nbsp;&nbsp; <span style='color:rgb(220, 20, 60);'>■</span> Post-Reset &nbsp;&nbsp; <span style='color:rgb(46, 139, 87);'>■</span> Recupero",
-        showarrow=False,
-        font=dict(size=12),
-        align="left"
-    )
-    
-    # Evidenziamo il calo dal 2024 al 2025
-    fig_reset.add_shape(
-        type="line",
-        x0='2024E', y0=311,
-        x1='2025E', y1=225,
-        line=dict(color="red", width=2, dash="dot"),
-        xref='x', yref='y'
-    )
-    
-    # Aggiungiamo frecce e annotazioni
-    fig_reset.add_annotation(
-        x='2024E', y=311,
-        xshift=20,
-        text="€311M",
-        showarrow=False,
-        font=dict(size=12, color="navy")
-    )
-    
-    fig_reset.add_annotation(
-        x='2025E', y=225,
-        xshift=15, yshift=-25,
-        text="€225M<br><b>-28%</b>",
-        showarrow=True,
-        arrowhead=2,
-        arrowcolor="red",
-        arrowwidth=2,
-        arrowsize=1,
-        ax=-25, ay=30
-    )
-    
-    # Evidenziamo la crescita dal 2025 al 2029
-    fig_reset.add_annotation(
-        x='2027E', y=285,
-        text="Fase di Recupero",
-        showarrow=False,
-        font=dict(size=12, color="darkgreen")
-    )
-    
-    fig_reset.add_annotation(
-        x='2029E', y=361,
-        xshift=0, yshift=20,
-        text="€361M<br><b>+60%</b> vs 2025<br>CAGR +12.5%",
-        showarrow=True,
-        arrowhead=2,
-        arrowcolor="green",
-        arrowwidth=2,
-        arrowsize=1,
-        ax=0, ay=-40
-    )
-    
-    # Area evidenziata per periodo di recupero
-    fig_reset.add_vrect(
-        x0='2025E', x1='2029E',
-        fillcolor="rgba(50, 205, 50, 0.1)",
-        layer="below",
-        line_width=0,
-        annotation_text="Periodo di Recupero RP4",
-        annotation_position="top right",
-        annotation=dict(font_size=10, font_color="green")
-    )
-    
-    # Titolo e layout
-    fig_reset.update_layout(
-        title={
-            'text': "Impatto del Reset Regolatorio RP4 sull'EBITDA",
-            'font': {'size': 16}
-        },
-        xaxis_title="Anno",
-        yaxis_title="EBITDA (€M)",
-        yaxis=dict(
-            tickformat=",.0f",
-            gridcolor='rgba(0,0,0,0.1)'
-        ),
-        margin=dict(t=80, b=50, l=50, r=50)
-    )
-    
-    st.plotly_chart(fig_reset, use_container_width=True)
-    
-    # Aggiungiamo una spiegazione sotto il grafico
-    st.info("""
-    **Cosa mostra questo grafico:**
-    - **Barre blu**: EBITDA nel periodo attuale (2023-2024)
-    - **Barra rossa**: Calo dell'EBITDA a €225M nel 2025 (-28%) dovuto al reset regolatorio RP4
-    - **Barre verdi**: Fase di recupero con crescita costante (CAGR +12.5%) fino a superare i livelli pre-reset nel 2028-2029
-    
-    Questo calo temporaneo è pianificato e non influenzerà la politica dei dividendi della società.
-    """)
+def mostra_grafico(chiave, fig):
+    """st.plotly_chart con la misura del tempo di serializzazione verso il browser."""
+    with telemetria.misura("serializzazione", chiave):
+        st.plotly_chart(fig, use_container_width=True)
 
-# GRAFICO 6: Confronto Yield
-with col2:
-    fig_yield_comp = px.bar(
-        df_yield_comp,
-        x='Società',
-        y='Dividend Yield 2024E (%)',
-        title="Confronto Dividend Yield con altri Investimenti (2024E)",
-        text='Dividend Yield 2024E (%)',
-        color='Dividend Yield 2024E (%)',
-        color_continuous_scale=px.colors.sequential.Viridis
-    )
-    fig_yield_comp.update_traces(texttemplate='%{y:.1f}%', textposition="outside")
-    fig_yield_comp.update_layout(xaxis_title="Società/Benchmark", yaxis_title="Dividend Yield (%)")
-    st.plotly_chart(fig_yield_comp, use_container_width=True)
 
-st.caption("Fonte: Elaborazione su dati del Piano Industriale 2025-2029 e stime di mercato. Nonostante il reset regolatorio del 2025 che impatterà temporaneamente l'EBITDA, ENAV ha confermato la crescita costante del dividendo per azione. Il dividend yield di ENAV risulta tra i più elevati sia nel FTSE MIB che tra le utilities e infrastrutture europee.")
-st.markdown("---")
-
-# --- Evoluzione Business Regolamentato vs Non-regolamentato ---
-st.subheader("🏢 Evoluzione del Business e Crescita delle Attività Non Regolamentate")
-
-col1, col2 = st.columns(2)
-
-# GRAFICO 7: Composizione Ricavi Attuale
-with col1:
-    fig_rev_current = px.pie(
-        df_revenue_split_current,
-        values='Ricavi 2023 (%)',
-        names='Segmento',
-        title="Composizione Ricavi ENAV 2023",
-        color_discrete_sequence=px.colors.qualitative.Set2,
-        hole=0.4
-    )
-    fig_rev_current.update_traces(textposition='inside', textinfo='percent+label')
-    st.plotly_chart(fig_rev_current, use_container_width=True)
-
-# GRAFICO 8: Composizione Ricavi Futura
-with col2:
-    fig_rev_future = px.pie(
-        df_revenue_split_future,
-        values='Ricavi 2029E (%)',
-        names='Segmento',
-        title="Previsione Composizione Ricavi ENAV 2029",
-        color_discrete_sequence=px.colors.qualitative.Set2,
-        hole=0.4
-    )
-    fig_rev_future.update_traces(textposition='inside', textinfo='percent+label')
-    st.plotly_chart(fig_rev_future, use_container_width=True)
+def mostra_tabella(chiave, df):
+    with telemetria.misura("serializzazione", chiave):
+        st.dataframe(df, use_container_width=True)
 
-st.info("""
-**Focus sulle Attività Non Regolamentate**: ENAV punta a raddoppiare i ricavi da attività non regolamentate da €49M nel 2024 a €106M nel 2029, 
-raggiungendo circa il 9% dei ricavi totali. Questo business include:
 
-1. **Evoluzione del portfolio prodotti/servizi core** (67% dei ricavi non-regolati)
-   - Digital Towers, Digital Academy, nuove funzionalità per centri di controllo
+def grafico_aperto(chiave):
+    """In modalità pigra il toggle del grafico ``chiave``; senza rendering pigro sempre True."""
+    return not RENDER_PIGRO or st.toggle("📈 Mostra grafico", key=f"grafico_{chiave}")
 
-2. **Espansione geografica** (23% dei ricavi non-regolati)
-   - Nuovi uffici pianificati in India (2025), Brasile e Arabia Saudita (2026)
-   - Presenza in 87 paesi globalmente
 
-3. **Nuovi business** (10% dei ricavi non-regolati)
-   - **Droni**: certificazioni CISP e USSP uniche in Europa
-   - **Energy Service Company**: servizi di efficientamento energetico
-   - **Digital Academy**: piattaforma e-learning per formazione aeronautica
-""")
-st.markdown("---")
-
-# --- Target Piano Industriale 2025-2029 ---
-st.subheader("🎯 Obiettivi Finanziari Piano Industriale 2025-2029")
+def grafico_pigro(chiave, crea_figura):
+    """Mostra un grafico; in modalità pigra la figura è costruita solo su richiesta."""
+    if grafico_aperto(chiave):
+        mostra_grafico(chiave, crea_figura())
 
-# Visualizzazione dei target come tabella
-st.dataframe(df_targets.set_index('Metrica'), use_container_width=True)
-
-# Spiegazione degli investimenti
-st.markdown("""
-### Investimenti per la Crescita (2025-2029)
-
-ENAV ha pianificato investimenti per **€570 milioni** (+15% rispetto al periodo precedente) così suddivisi:
-- **Navigazione e sistemi ATM**: 50% degli investimenti
-- **Infrastrutture civili e sistemi**: 27% degli investimenti
-- **ICT e altro**: 23% degli investimenti
-
-Progetti strategici principali:
-- Consolidamento dei centri di controllo (da 4 a 2)
-- Implementazione di 26 torri remote digitali
-- Aggiornamento sistemi di monitoraggio meteorologico
-
-### Piano M&A
-
-ENAV ha definito un piano di acquisizioni selettivo con fondi disponibili fino a **€350 milioni**, con focus su:
-1. Licenze e servizi software
-2. Servizi tecnici e di ingegneria
-3. Consulenza avionica
-4. Meteorologia
-5. Tecnologie per droni e UTM (Unmanned Traffic Management)
-""")
+# --- Titolo e Header ---
+st.title(f"✈️ Analisi Dividendi: {NOME_SOCIETA} ({TICKER})")
+st.caption(f"Analisi aggiornata al: {datetime.now().strftime('%d/%m/%Y')}. Dati finanziari storici fino al 2023, stime 2024, e Piano Industriale 2025-2029.")
 st.markdown("---")
+telemetria.avvio("primo_contenuto", INIZIO_SCRIPT)
 
-# --- Punti di Forza e Rischi ---
-st.subheader("✅ Elementi Distintivi per l'Investitore a Dividendo")
-
-col1, col2 = st.columns(2)
+# --- Metriche Chiave Dividendo ---
+@st.fragment
+@telemetria.sezione
+def sezione_indicatori_chiave():
+    st.subheader("📊 Indicatori Chiave del Dividendo")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(
+            label=f"Ultimo DPS Pagato (Esercizio {ANNO_ULTIMO_DPS})",
+            value=f"€ {ULTIMO_DPS_PAGATO_VAL:.4f}",
+            help=f"Dividendo relativo all'esercizio {ANNO_ULTIMO_DPS}, pagato nel {ANNO_ULTIMO_DPS + 1}."
+        )
+    with col2:
+        st.metric(
+            label=f"Dividend Yield (Attuale)",
+            value=f"{YIELD_ATTUALE:.2f}%",
+            help=f"Basato sull'ultimo DPS (€{ULTIMO_DPS_PAGATO_VAL:.4f}) e un prezzo di riferimento di €{PREZZO_RIFERIMENTO_APPROX:.2f}."
+        )
+    with col3:
+        st.metric(
+            label="Politica di Payout",
+            value=POLITICA_PAYOUT,
+            help="Politica dichiarata dalla società per la distribuzione del free cash flow."
+        )
+    with col4:
+        st.metric(
+            label=f"DPS Proposto (Esercizio {ANNO_DPS_ATTESO})",
+            value=f"€ {DPS_ATTESO_VAL:.4f}",
+            delta=CRESCITA_ATTESA_DPS,
+            help=f"Dividendo proposto per l'esercizio {ANNO_DPS_ATTESO}, con un incremento del {kpi['crescita_dps']:.1f}% rispetto al {ANNO_ULTIMO_DPS}."
+        )
+    st.markdown("---")
 
-with col1:
-    st.markdown("### Punti di Forza")
-    for i, punto in enumerate(punti_forza):
-        st.markdown(f"**{i+1}.** {punto}")
 
-with col2:
-    st.markdown("### Rischi da Considerare")
-    for i, rischio in enumerate(rischi):
-        st.markdown(f"**{i+1}.** {rischio}")
+# --- Grafici Dividendi ---
+@st.fragment
+@telemetria.sezione
+def sezione_analisi_dividendo():
+    st.subheader("📈 Analisi del Dividendo")
+
+    # Layout a 2 colonne per i grafici
+    col1, col2 = st.columns(2)
+
+    # GRAFICO 1: Storico DPS - nella prima colonna - CORRETTO
+    with col1:
+        fig_dps = grafici.crea_fig_dps(df_dps, NOME_BREVE)
+        mostra_grafico('fig_dps', fig_dps)
+
+    # GRAFICO 2: Dividend Yield - nella seconda colonna
+    with col2:
+        # Con uno storico prezzi locale il rendimento è una serie continua, altrimenti i punti annuali
+        df_yield_ttm = dati.carica_yield_trailing(TICKER)
+        if df_yield_ttm is not None:
+            fig_yield = grafici.crea_fig_yield_trailing(df_yield_ttm)
+        else:
+            fig_yield = grafici.crea_fig_yield(df_yield)
+        mostra_grafico('fig_yield', fig_yield)
+        
+    st.caption("Fonte: Dati estratti dall'analisi e dalle relazioni finanziarie. Si nota la progressiva crescita del dividendo e del yield dopo la cancellazione dovuta alla pandemia.")
+    st.markdown("---")
 
-st.markdown("---")
 
-# --- Tabella Finanziaria Riassuntiva ---
-st.subheader("🔢 Tabella Finanziaria Riassuntiva")
-st.dataframe(df_fin.set_index('Metrica'), use_container_width=True)
-st.caption("Fonte: Dati estratti dai report finanziari. I dati 2024 sono stime basate sul piano industriale e sulle proiezioni di analisti.")
-st.markdown("---")
+# --- Sezione Sostenibilità del Dividendo ---
+@st.fragment
+@telemetria.sezione
+def sezione_sostenibilita():
+    st.subheader("📊 Sostenibilità e Proiezioni del Dividendo")
 
-# --- Conclusioni per l'Investitore ---
-st.subheader("📝 Conclusioni per l'Investitore orientato al Dividendo")
+    # Layout a 2 colonne per i grafici
+    col1, col2 = st.columns(2)
 
-st.markdown("""
-ENAV S.p.A. emerge come una società solida e cash-generative, con un ruolo essenziale nel sistema del traffico aereo italiano e una strategia ben definita per crescere nei prossimi anni. Per un investitore orientato ai dividendi, ENAV offre attualmente:
+    # GRAFICO 3: Payout Ratio migliorato - nella prima colonna
+    with col1:
+        grafico_pigro('fig_payout', lambda: grafici.crea_fig_payout(df_payout, NOME_BREVE))
+        
+        # Aggiungiamo una spiegazione più chiara sotto il grafico
+        st.info("""
+        **Note sul Payout Ratio:**
+        - ENAV ha una politica di dividendi basata sull'80% del Free Cash Flow (FCF)
+        - Il grafico mostra il dividendo come percentuale dell'Utile per Azione (EPS)
+        - È possibile visualizzare anche il ratio basato sul FCF attivandolo dalla legenda (solo per anni con FCF positivo)
+        - Nel 2021, il FCF era negativo a causa degli impatti COVID, ma la società ha comunque ripreso la distribuzione dei dividendi
+        """)
 
-- **Rendimento elevato**: Dividend yield di circa 7%, tra i più alti del FTSE MIB
-- **Crescita stabile**: Incremento programmato del dividendo di circa 4% annuo fino al 2029
-- **Sostenibilità**: La politica di payout dell'80% del FCF è supportata dalla generazione di cassa
-- **Visibilità**: Piano industriale chiaro fino al 2029 con obiettivi finanziari dettagliati
-- **Resilienza**: Modello di business regolato con protezioni incorporate contro inflazione e volatilità
 
-Il temporaneo calo dell'EBITDA previsto nel 2025 (dovuto al reset regolatorio) non dovrebbe impattare la politica dei dividendi grazie alla solida posizione finanziaria della società. Inoltre, l'espansione nelle attività non regolamentate offre un potenziale di crescita aggiuntivo senza compromettere la generazione di cassa destinata agli azionisti.
+    # GRAFICO 4: FCF vs Dividend Paid - nella seconda colonna
+    with col2:
+        grafico_pigro('fig_fcf_div', lambda: grafici.crea_fig_fcf_div(df_fcf_div))
 
-In un'ottica di lungo periodo, ENAV rappresenta una potenziale "yield play" interessante: un titolo difensivo, capace di offrire reddito ricorrente superiore alla media di mercato e con un moderato potenziale di crescita sia del dividendo sia del valore del capitale.
-""")
+    st.caption("Fonte: Elaborazione su dati finanziari. I grafici mostrano il payout ratio rispetto alla politica dichiarata (80% del FCF) e la capacità del FCF di coprire i dividendi distribuiti. Nel 2021 il FCF era negativo a causa degli impatti COVID, ma la società ha comunque ripreso la distribuzione dei dividendi con un approccio progressivo.")
+    st.markdown("---")
 
-st.markdown("---")
 
-# --- NUOVA SEZIONE: Analisi Completa di ENAV ---
-st.subheader("📑 Analisi Completa di ENAV S.p.A.")
-st.markdown("""
-Questa sezione contiene l'analisi completa ed approfondita di ENAV S.p.A. per gli investitori orientati al dividendo.
-Clicca su ciascuna sezione per visualizzare il contenuto dettagliato.
-""")
+# --- Proiezione Futura dei Dividendi ---
+@st.fragment
+@telemetria.sezione
+def sezione_proiezione_futura():
+    st.subheader("🔮 Proiezione Futura del Dividendo (Piano Industriale 2025-2029)")
+
+    # Simulazione Monte Carlo opzionale: bande p5/p50/p95 del DPS attorno al piano
+    bande_mc, condivisa = None, True
+    if st.toggle("🎲 Simulazione Monte Carlo del dividendo", key="mc_attiva"):
+        import simulazione
+        with st.expander("Parametri della simulazione"):
+            c1, c2, c3 = st.columns(3)
+            parametri = {
+                'prob_shock': c1.slider("Probabilità annua di shock sul traffico (%)", 0.0, 20.0, 3.0, 0.5) / 100,
+                'profondita_shock': c1.slider("Traffico perso nell'anno dello shock (%)", 0, 90, 50, 5) / 100,
+                'vol_traffico': c2.slider("Volatilità annua del traffico (%)", 0.0, 10.0, 3.0, 0.5) / 100,
+                'vol_reset': c2.slider("Incertezza sul FCF post-reset RP4 (%)", 0, 30, 10) / 100,
+                'sd_capex': float(c3.slider("Deviazione standard del capex (€M)", 0, 50, 15, 5)),
+            }
+            n_percorsi = c3.select_slider("Percorsi simulati", [100_000, 250_000, 500_000, 1_000_000], value=1_000_000)
+        bande_mc = dati.carica_simulazione_dps(TICKER, tuple(sorted(parametri.items())), n_percorsi)
+        # Ai valori di default la figura è la stessa per tutti i visitatori e può andare su disco
+        condivisa = n_percorsi == 1_000_000 and all(
+            np.isclose(valore, simulazione.PARAMETRI_DEFAULT[nome]) for nome, valore in parametri.items())
+        primo = bande_mc.iloc[0]
+        st.caption(
+            f"Politica: {POLITICA_PAYOUT}. Probabilità simulata di un DPS {int(primo['Anno'])} inferiore "
+            f"a quello proposto: {primo['prob_taglio']:.1%}. "
+            f"DPS {int(bande_mc['Anno'].iloc[-1])} mediano: €{bande_mc['p50'].iloc[-1]:.3f} "
+            f"(p5 €{bande_mc['p5'].iloc[-1]:.3f} - p95 €{bande_mc['p95'].iloc[-1]:.3f})."
+        )
 
-# Analisi completa - contenuto del file Analisi_ENAV_C.md
-with st.expander("**Executive Summary**", expanded=True):
-    st.markdown("""
-ENAV S.p.A., il gestore del traffico aereo italiano, presenta un profilo interessante per gli investitori focalizzati sul reddito. Con un dividend yield attuale di circa 7%, una politica di distribuzione chiara basata sull'80% del free cash flow, e un piano industriale 2025-2029 che prevede crescita costante dei dividendi, ENAV offre un'opportunità di investimento potenzialmente attraente per chi cerca flussi di cassa stabili e prevedibili nel lungo periodo.
+    crea_fig_proj = grafici.crea_fig_proj if condivisa else grafici.crea_fig_proj.solo_memoria
+    grafico_pigro('fig_proj', lambda: crea_fig_proj(df_dps_projection, bande_mc))
 
-Il titolo si distingue per una combinazione di caratteristiche difensive tipiche di un'utility regolamentata con prospettive di crescita moderata ma visibile.
+    # Aggiungiamo una spiegazione del reset regolatorio
+    st.info(f"""
+    **Reset Regolatorio RP4 (2025-2029)**: All'inizio del nuovo periodo regolatorio nel 2025, ENAV subirà un temporaneo calo dell'EBITDA ({RESET['calo_reset']:+.0%}), 
+    che è un fenomeno fisiologico dovuto all'azzeramento dei meccanismi di bilanciamento del traffico e al reset dei parametri economici. 
+    Nonostante questo, la società ha confermato che i dividendi continueranno a crescere anche durante questa fase,
+    grazie alla forte posizione di cassa e alla generazione di Free Cash Flow.
     """)
 
-with st.expander("**1. Storico dei Dividendi e Rendimento**"):
-    st.markdown("""
-ENAV ha ripristinato e incrementato progressivamente la distribuzione di dividendi dopo la pausa dovuta alla pandemia. Negli ultimi anni i dividendi per azione (DPS) sono cresciuti in modo significativo, accompagnati da rendimenti (dividend yield) interessanti per gli azionisti orientati al reddito.
-
-### Evoluzione recente dei dividendi:
-
-| Bilancio (anno)    | Dividendo per Azione (€) | Data Stacco    | Dividend Yield (circa) |
-|--------------------|--------------------------|----------------|---------------------------|
-| **2021** (pag. 2022)| 0,1081                   | 24 ott 2022    | ~2,7%                    |
-| **2022** (pag. 2023)| 0,1967                   | 23 ott 2023    | ~5%–6%                   |
-| **2023** (pag. 2024)| 0,2300                   | 27 mag 2024    | ~6,4%                    |
-| **2024** (proposto) | **0,2700**               | **23 giu 2025**| ~7% (stimato)            |
-
-Nel 2020 la distribuzione del dividendo fu cancellata a causa della crisi Covid-19, riprendendo poi nell'esercizio 2021. Il dividendo 2023 di €0,23 per azione (pagato nell'ottobre 2023) è risultato il più alto di sempre per ENAV, e il management ha proposto un ulteriore aumento a €0,27 per azione sul bilancio 2024.
+    col1, col2 = st.columns(2)
+
+    # GRAFICO 5: Reset Regolatorio e EBITDA - Versione corretta
+    with col1:
+        # A default le barre sono il Piano Industriale; il modello parametrico RP4 (regolazione.py)
+        # entra solo con parametri cambiati. Parametri, scenari e figura solo con il grafico aperto
+        df_reset, parametri_rp4, riepilogo_rp4 = df_ebitda_reset, (), None
+        if grafico_aperto('fig_reset'):
+            with st.expander("Parametri del modello regolatorio RP4"):
+                c1, c2 = st.columns(2)
+                default = regolazione.PARAMETRI_DEFAULT
+                parametri_rp4 = {
+                    'wacc_rp4': c1.slider("WACC regolatorio RP4 (%)", 3.0, 9.0, default['wacc_rp4'] * 100, 0.1, key="rp4_wacc") / 100,
+                    'traffico': c1.slider("Crescita annua delle unità di servizio (%)", -10.0, 8.0, default['traffico'] * 100, 0.5, key="rp4_traffico") / 100,
+                    'inflazione': c2.slider("Inflazione effettiva (%)", 0.0, 8.0, default['inflazione'] * 100, 0.25, key="rp4_inflazione") / 100,
+                    'efficienza': c2.slider("Efficienza sui costi riconosciuti (%/anno)", 0.0, 6.0, default['efficienza'] * 100, 0.25, key="rp4_efficienza") / 100,
+                    'bilanciamento_residuo': c1.slider("Bilanciamento RP3 smaltito dopo il reset (%)", -50.0, 50.0, default['bilanciamento_residuo'] * 100, 2.5, key="rp4_residuo") / 100,
+                }
+                con_scenari = c2.checkbox("Banda di incertezza (200.000 scenari)", key="rp4_scenari")
+            # Solo i parametri diversi dal default entrano nella chiave: a default il frame è quello della pagina
+            parametri_rp4 = tuple(sorted((nome, valore) for nome, valore in parametri_rp4.items() if not np.isclose(valore, default[nome])))
+            if parametri_rp4:
+                df_reset = dati.carica_ebitda_reset(TICKER, parametri=parametri_rp4)
+            bande_rp4, riepilogo_rp4 = dati.carica_scenari_rp4(TICKER, parametri_rp4) if con_scenari else (None, None)
+            # Con parametri o scenari dell'utente la figura resta in memoria, fuori dalla cache su disco
+            crea_fig_reset = grafici.crea_fig_reset.solo_memoria if parametri_rp4 or con_scenari else grafici.crea_fig_reset
+            mostra_grafico('fig_reset', crea_fig_reset(df_reset, bande_rp4))
+
+        percorso = dati.percorso_reset(df_reset)
+        reset = {nome: float(valore[0]) for nome, valore in regolazione.indicatori(percorso).items()}
+        anni_reset = df_reset['Anno'].to_numpy()[-len(percorso):]
+        superato = [anno for anno, valore in zip(anni_reset[1:], percorso[1:]) if valore >= percorso[0]]
+        if riepilogo_rp4 is not None:
+            st.caption(
+                f"Su 200.000 scenari (traffico, inflazione, efficienza, RAB e non regolamentato incerti): calo al reset "
+                f"{riepilogo_rp4['calo_reset_p50']:+.0%} mediano, CAGR di recupero tra {riepilogo_rp4['cagr_recupero_p5']:+.1%} "
+                f"e {riepilogo_rp4['cagr_recupero_p95']:+.1%} (p5-p95), livello pre-reset recuperato nel "
+                f"{riepilogo_rp4['prob_recupero']:.0%} dei casi."
+            )
 
-### Piano di crescita dei dividendi 2025-2029:
+        # Aggiungiamo una spiegazione sotto il grafico
+        st.info(f"""
+        **Cosa mostra questo grafico:**
+        - **Barre blu**: EBITDA nel periodo attuale ({anni_reset[0].rstrip('E')} e precedenti)
+        - **Barra rossa**: Calo dell'EBITDA a €{percorso[1]:.0f}M nel {dati.ANNO_RESET} ({reset['calo_reset']:+.0%}) dovuto al reset regolatorio RP4
+        - **Barre verdi**: Fase di recupero (CAGR {reset['cagr_recupero']:+.1%}) {f"fino a superare i livelli pre-reset nel {superato[0].rstrip('E')}" if superato else "senza tornare ai livelli pre-reset"}
+        - **Rombi**: EBITDA del Piano Industriale 2025-2029
+
+        {"Le barre sono calcolate dal modello regolatorio (RAB, WACC, unità di servizio, inflazione e bilanciamento) con i parametri scelti." if parametri_rp4 else "Le barre sono i valori del Piano Industriale; cambiando i parametri del modello regolatorio (RAB, WACC, unità di servizio, inflazione e bilanciamento) mostrano il percorso calcolato."}
+        """)
+
+    # GRAFICO 6: Screening dell'universo (classifica con filtri)
+    with col2:
+        # Indice, controlli e classifica solo con il grafico aperto
+        if grafico_aperto('fig_screening'):
+            import screening
+            indice = dati.carica_indice_screening()
+            c1, c2, c3 = st.columns([2, 1, 1])
+            criterio = c1.selectbox("Classifica per", list(screening.CRITERI), format_func=lambda c: screening.CRITERI[c][0], key="scr_criterio")
+            anni = indice.anni
+            anno = c2.selectbox("Esercizio", anni, index=anni.index(ANNO_DPS_ATTESO) if ANNO_DPS_ATTESO in anni else len(anni) - 1, key="scr_anno")
+            k = c3.number_input("Prime", 1, 50, 10, key="scr_k")
+            with st.expander("Filtri"):
+                payout_max = st.slider("Payout su FCF massimo (%)", 0, 150, 150, 5, key="scr_payout", help="150 = nessun limite")
+                copertura_min = st.slider("Copertura FCF minima (x)", 0.0, 3.0, 0.0, 0.1, key="scr_copertura", help="0 = nessun limite")
+                leva_max = st.slider("Leva massima (x)", 0.0, 6.0, 6.0, 0.5, key="scr_leva", help="6 = nessun limite")
+            # Un filtro al valore estremo non esclude nemmeno le righe senza dato
+            filtri = {'anno': (anno, anno)}
+            if payout_max < 150:
+                filtri['payout_fcf'] = (None, payout_max)
+            if copertura_min > 0:
+                filtri['copertura_fcf'] = (copertura_min, None)
+            if leva_max < 6:
+                filtri['leva'] = (None, leva_max)
+            risultati = indice.migliori(criterio, k, filtri)
+            etichetta = screening.CRITERI[criterio][0]
+            # I benchmark di mercato restano come riferimento sul dividend yield
+            riferimenti = df_yield_comp[df_yield_comp['Società'] != NOME_BREVE] if criterio == 'rendimento' else None
+            mostra_grafico('fig_screening', grafici.crea_fig_screening(risultati, criterio, etichetta, TICKER, riferimenti))
+            st.caption(f"{len(risultati)} su {len(indice.candidati(filtri))} emittenti che rispettano i filtri nell'esercizio {anno} "
+                       f"({len(indice)} coppie società × esercizio in archivio).")
+
+    st.caption("Fonte: Elaborazione su dati del Piano Industriale 2025-2029 e stime di mercato. Nonostante il reset regolatorio del 2025 che impatterà temporaneamente l'EBITDA, ENAV ha confermato la crescita costante del dividendo per azione. Lo screening confronta gli emittenti dell'archivio locale; le linee tratteggiate sono i rendimenti di riferimento di utilities, FTSE MIB, BTP 10 anni e infrastrutture europee.")
+    st.markdown("---")
+
+
+# --- Stress test del traffico ---
+@st.fragment
+@telemetria.sezione
+def sezione_stress():
+    st.subheader("🌪️ Stress Test del Traffico: Shock in Stile COVID-19 sul Dividendo")
+    # Opzionale come la Monte Carlo: il lotto di scenari si calcola solo su richiesta
+    if st.toggle("🌪️ Simulazione degli shock di traffico", key="str_attiva"):
+        import stress
+        import tabelle
+        profilo, da_storico = dati.profilo_traffico(TICKER)
+        with st.expander("Parametri degli shock"):
+            c1, c2, c3 = st.columns(3)
+            default = stress.PARAMETRI_DEFAULT
+            profondita = c1.slider("Traffico perso nell'anno dello shock (%)", 0, 90, (5, 70), 5, key="str_profondita")
+            durata = c1.slider("Anni per il recupero del traffico", 1, 8, (1, 5), key="str_durata")
+            parametri = {
+                'risparmio_costi': c2.slider("Costi evitati per € di ricavi persi (%)", 0, 50, int(default['risparmio_costi'] * 100), 5, key="str_risparmio") / 100,
+                'anni_recupero': c2.slider("Anni di recupero del bilanciamento in tariffa", 1, 7, default['anni_recupero'], key="str_recupero"),
+            }
+            n_scenari = c3.select_slider("Scenari simulati", [100_000, 250_000, 500_000, 1_000_000], value=500_000, key="str_scenari")
+        intervalli = (('durata', durata), ('profondita', (profondita[0] / 100, profondita[1] / 100)))
+        parametri = tuple(sorted((nome, valore) for nome, valore in parametri.items() if not np.isclose(valore, default[nome])))
+        riepilogo, _, per_profondita = dati.carica_stress(TICKER, intervalli, parametri, n_scenari)
+        replay = dati.carica_replay(TICKER, tuple(sorted(profilo.items())), parametri)
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Probabilità di taglio del DPS", f"{riepilogo['prob_taglio']:.0%}",
+                  help="Scenari con almeno un DPS inferiore all'anno prima, dato uno shock nel periodo di piano")
+        if riepilogo['prob_taglio'] > 0:
+            m2.metric("Taglio mediano", f"{riepilogo['taglio_mediano']:.0%}",
+                      f"p95 {riepilogo['taglio_p95']:.0%}", delta_color="off")
+        m3.metric("Almeno un anno senza dividendo", f"{riepilogo['prob_azzeramento']:.0%}")
+        m4.metric("Dividendi di piano persi (media)", f"{riepilogo['dividendi_persi_medi']:.0%}")
+
+        grafico_pigro('fig_stress', lambda: grafici.crea_fig_stress(per_profondita, profilo))
+        origine = "dallo storico delle unità di servizio" if da_storico else "ipotesi in assenza dello storico delle unità di servizio"
+        st.markdown(f"**Replay dello shock {profilo['anno']}** ({origine}): traffico -{profilo['profondita']:.0%}, "
+                    f"recupero a {profilo['forma']} in {profilo['durata']} anni, ripetuto in ogni anno di piano.")
+        mostra_tabella('tabella_replay', tabelle.tabella_replay(replay))
+        st.caption(f"Politica: {POLITICA_PAYOUT}, applicata meccanicamente al FCF di piano colpito dallo shock. "
+                   "I ricavi della società scendono con il traffico; la quota oltre la banda di rischio della società torna in tariffa "
+                   f"dopo {regolazione.RITARDO_BILANCIAMENTO} anni, per cui dopo lo shock il DPS può superare quello di piano. "
+                   f"Lo storico delle unità di servizio si aggiunge in `dati_finanziari/traffico_{TICKER}.csv` (vedi README).")
+    st.markdown("---")
+
+
+# --- Scenario What-If ---
+@st.fragment
+@telemetria.sezione
+def sezione_whatif():
+    import whatif
+
+    st.subheader("🧮 Scenario What-If sui Driver del Dividendo")
+    st.caption(
+        "Modifica i driver per l'esercizio proposto: ogni metrica viene ricalcolata solo se dipende "
+        "da un input cambiato (es. il prezzo aggiorna solo i rendimenti e il relativo grafico)."
+    )
+    # Il modello di base è condiviso dal processo; la sessione ne tiene una derivazione
+    # che copia solo i nodi toccati dagli input dell'utente
+    modello_base = dati.carica_modello_whatif(TICKER)
+    valori_base = {nome: modello_base[nome] for nome in whatif.INPUT}
+    chiave_modello = f"whatif_{TICKER}"
+    if chiave_modello not in st.session_state:
+        st.session_state[chiave_modello] = modello_base.deriva()
+    modello = st.session_state[chiave_modello]
+
+    c1, c2, c3, c4 = st.columns(4)
+    scelte = {
+        'prezzo': c1.number_input("Prezzo di riferimento (€)", 0.5, 20.0, valori_base['prezzo'], 0.05, key="wi_prezzo"),
+        'ultimo_dps': c1.number_input(f"Ultimo DPS {ANNO_ULTIMO_DPS} (€)", 0.0, 2.0, valori_base['ultimo_dps'], 0.01, format="%.4f", key="wi_ultimo_dps"),
+        'dps_atteso': c2.number_input(f"DPS {ANNO_DPS_ATTESO} (€)", 0.0, 2.0, valori_base['dps_atteso'], 0.01, format="%.4f", key="wi_dps_atteso"),
+        'eps': c2.number_input(f"EPS {ANNO_DPS_ATTESO} (€)", -2.0, 5.0, valori_base['eps'], 0.01, key="wi_eps"),
+        'fcf': c3.number_input(f"FCF {ANNO_DPS_ATTESO} (€M)", -1000.0, 2000.0, valori_base['fcf'], 5.0, key="wi_fcf"),
+        'azioni': c3.number_input("Azioni (milioni)", 1.0, 5000.0, valori_base['azioni'], 1.0, key="wi_azioni"),
+        'payout_politica': c4.slider("Payout politica (% del FCF)", 0, 100, int(round(valori_base['payout_politica'] * 100)), 5, key="wi_payout") / 100,
+    }
+    for chiave, valore in scelte.items():
+        modello.imposta(chiave, valore)
+
+    r = whatif.riepilogo(modello)
+    m1, m2, m3, m4, m5, m6 = st.columns(6)
+    m1.metric("Dividend Yield (Attuale)", f"{r['yield_attuale']:.2f}%")
+    m2.metric("Dividend Yield (Forward)", f"{r['yield_forward']:.2f}%")
+    m3.metric("Payout su EPS", f"{r['payout_eps']:.1f}%")
+    m4.metric("Payout su FCF", f"{r['payout_fcf']:.1f}%")
+    m5.metric("Copertura FCF", f"{r['copertura_fcf']:.2f}x")
+    m6.metric("DPS sostenibile da politica", f"€ {r['dps_sostenibile']:.4f}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        grafico_pigro('whatif_yield_comp', lambda: modello['fig_yield_comp'])
+    with col2:
+        grafico_pigro('whatif_payout', lambda: modello['fig_payout'])
+
+    st.markdown("---")
+
+
+# --- Sensibilità del Dividend Yield ---
+@st.fragment
+@telemetria.sezione
+def sezione_sensibilita_yield():
+    st.subheader("🌡️ Sensibilità del Dividend Yield a Prezzo e Dividendo")
+    c1, c2 = st.columns(2)
+    prezzo_min, prezzo_max = c1.slider("Intervallo di prezzo (€)", 1.0, 10.0, (2.0, 6.0), 0.1, key="sens_prezzi")
+    risoluzione = c2.select_slider("Punti della griglia per asse", [100, 250, 500, 1000, 2000], value=500, key="sens_risoluzione")
+
+    # Scenari di DPS: ultimo storico, proposto, primo e ultimo anno di piano
+    tipo = df_dps_projection['Tipo']
+    scenari = pd.concat([
+        df_dps_projection[tipo == 'Storico'].iloc[[-1]],
+        df_dps_projection[tipo == 'Proposto'],
+        df_dps_projection[tipo == 'Piano'].iloc[[0, -1]],
+    ])
+    scenari = pd.DataFrame({
+        'Scenario': [f"{tipo} {anno}" for tipo, anno in zip(scenari['Tipo'], scenari['Anno'])],
+        'DPS (€)': scenari['DPS (€)'].to_numpy()
+    })
 
-ENAV prevede di aumentare il dividendo per azione ogni anno fino al 2029. Partendo da €0,27 per azione sul 2024, il DPS è atteso salire a:
-- €0,28 nel 2025
-- €0,29 nel 2026
-- €0,30 nel 2027
-- €0,31 nel 2028
-- €0,32 per azione nel 2029
+    # La specifica della griglia la determina: è anche la chiave della figura, senza hash degli array
+    specifica = (prezzo_min, prezzo_max, risoluzione, 0.0, round(float(scenari['DPS (€)'].max()) * 1.5, 2), risoluzione)
+    griglia = dati.carica_griglia_rendimenti(*specifica)
+    grafico_pigro('fig_sensibilita', lambda: grafici.crea_fig_sensibilita_yield(*griglia, scenari, PREZZO_RIFERIMENTO_APPROX, chiave=specifica))
+    st.caption("Ogni cella è il rendimento DPS / prezzo; le linee tratteggiate indicano gli scenari di dividendo con il rendimento al prezzo di riferimento.")
+    st.markdown("---")
+
+
+# --- Valutazione DDM / FCFE ---
+@st.fragment
+@telemetria.sezione
+def sezione_valutazione():
+    import valutazione
+
+    st.subheader("💶 Valutazione: Dividend Discount Model e FCF to Equity")
+    c1, c2, c3 = st.columns(3)
+    metodo = c1.radio("Flussi scontati", ['DDM', 'FCFE'], horizontal=True, key="val_metodo",
+                      help="DDM: DPS proposto e di piano. FCFE: FCF per azione stimato e implicito nel piano.")
+    anni_transizione = c1.slider("Anni di transizione alla crescita terminale", 0, 15, 5, key="val_transizione")
+    ke_min, ke_max = c2.slider("Costo del capitale proprio (%)", 4.0, 15.0, (6.0, 12.0), 0.25, key="val_ke")
+    g_min, g_max = c2.slider("Crescita terminale (%)", -2.0, 4.0, (0.0, 3.0), 0.25, key="val_g")
+    risoluzione = c3.select_slider("Punti della griglia per asse", [50, 100, 200, 500, 1000], value=200, key="val_risoluzione")
+    ke_base = c3.number_input("Costo del capitale di riferimento (%)", 4.0, 15.0, 8.0, 0.25, key="val_ke_base") / 100
+    g_base = c3.number_input("Crescita terminale di riferimento (%)", -2.0, 4.0, 2.0, 0.25, key="val_g_base") / 100
+
+    specifica = (TICKER, metodo, ke_min / 100, ke_max / 100, risoluzione, g_min / 100, g_max / 100, risoluzione, anni_transizione)
+    ke, g, valori = dati.carica_griglia_valutazione(*specifica)
+    # Scenario di riferimento: la cella della griglia più vicina
+    riga, colonna = int(np.abs(g - g_base).argmin()), int(np.abs(ke - ke_base).argmin())
+    valore_base = float(valori[riga, colonna])
+    ke_atteso = valutazione.ke_implicito(ke, valori[[riga]], PREZZO_RIFERIMENTO_APPROX)[0]
+
+    m1, m2, m3 = st.columns(3)
+    m1.metric(f"Valore per azione (ke {ke[colonna]:.2%}, g {g[riga]:.2%})",
+              f"€ {valore_base:.2f}" if np.isfinite(valore_base) else "n.d.",
+              f"{valore_base / PREZZO_RIFERIMENTO_APPROX - 1:+.1%} sul prezzo" if np.isfinite(valore_base) else None)
+    m2.metric("Rendimento totale implicito nel prezzo",
+              f"{ke_atteso:.2%}" if np.isfinite(ke_atteso) else "fuori griglia",
+              help="Costo del capitale che eguaglia il valore al prezzo di riferimento, con la crescita terminale di riferimento")
+    m3.metric("Scenari nella griglia", f"{valori.size:,}".replace(",", "."),
+              f"{np.mean(valori[np.isfinite(valori)] > PREZZO_RIFERIMENTO_APPROX):.0%} sopra il prezzo", delta_color="off")
+
+    grafico_pigro('fig_valutazione', lambda: grafici.crea_fig_valutazione(ke, g, valori, PREZZO_RIFERIMENTO_APPROX, metodo, chiave=specifica))
+    st.caption("Flussi espliciti fino all'ultimo anno di piano, poi transizione lineare alla crescita terminale e valore "
+               "terminale di Gordon. Le celle con costo del capitale inferiore alla crescita più 0,5 punti non hanno valore finito.")
+    st.markdown("---")
+
+
+# --- Backtest del rendimento totale (TSR) ---
+@st.fragment
+@telemetria.sezione
+def sezione_tsr():
+    import rendimenti
+
+    st.subheader("🔁 Rendimento Totale Realizzato: Dividendi Reinvestiti o Incassati")
+    c1, c2 = st.columns(2)
+    con_ritenuta = c1.toggle("Ritenuta del 26% sui dividendi", value=True, key="tsr_ritenuta",
+                             help="Dividendi netti della ritenuta italiana per le persone fisiche")
+    anni = c2.slider("Anni di detenzione", 1.0, 8.0, 5.0, 0.25, key="tsr_anni")
+
+    backtest = dati.carica_tsr(TICKER, rendimenti.RITENUTA_ITALIA if con_ritenuta else 0.0)
+    if backtest is None:
+        st.info(f"Il backtest richiede lo storico prezzi giornaliero in `dati_finanziari/prezzi_{TICKER}.csv` "
+                "(vedi README): con il file la sezione calcola il TSR per ogni giorno di ingresso e durata.")
+        st.markdown("---")
+        return
+    ingressi, durate, reinvestito, incassato = backtest
+    dist_reinvestito = rendimenti.distribuzione(durate, reinvestito)
+    dist_incassato = rendimenti.distribuzione(durate, incassato)
+    riga = int(np.abs(durate - anni).argmin())
+    quota = dist_reinvestito.columns[-1]
+
+    m1, m2, m3, m4 = st.columns(4)
+    if dist_reinvestito['Ingressi'].iloc[riga] == 0:
+        st.warning(f"Lo storico prezzi non copre {durate[riga]:.2f} anni di detenzione.")
+    else:
+        m1.metric(f"TSR mediano a {durate[riga]:.2f} anni (reinvestiti)", f"{dist_reinvestito['P50'].iloc[riga]:.1f}%",
+                  f"{dist_reinvestito['P50'].iloc[riga] - dist_incassato['P50'].iloc[riga]:+.1f} pt vs incassati")
+        m2.metric("TSR mediano (incassati)", f"{dist_incassato['P50'].iloc[riga]:.1f}%")
+        m3.metric("Ingressi con TSR a doppia cifra", f"{dist_reinvestito[quota].iloc[riga]:.0f}%",
+                  help="Quota dei giorni di ingresso con TSR annuo reinvestito pari o superiore al 10%")
+        m4.metric("Peggior 5% degli ingressi", f"{dist_reinvestito['P5'].iloc[riga]:.1f}%",
+                  f"{dist_reinvestito['Ingressi'].iloc[riga]:,} ingressi".replace(",", "."), delta_color="off")
+
+    grafico_pigro('fig_tsr', lambda: grafici.crea_fig_tsr(dist_reinvestito, dist_incassato))
+    st.caption(f"Ingressi alla chiusura di ogni giorno dal {pd.Timestamp(ingressi[0]):%d/%m/%Y}, quando inizia lo storico del DPS; "
+               "dividendi per data di stacco (convenzionale a maggio se non in archivio), incluso il 2020 senza dividendo. "
+               "I dividendi incassati non maturano interessi.")
+    st.markdown("---")
 
-Si tratta di una crescita annua intorno al +4% composta, che garantirebbe che il potere d'acquisto del dividendo aumenti nel tempo (almeno in linea con l'inflazione moderata).
-    """)
 
-with st.expander("**2. Modello di Business e Stabilità dei Flussi di Cassa**"):
-    st.markdown("""
-La solidità del modello di business di ENAV è basata su un core business regolato (il controllo del traffico aereo nazionale) che genera ricavi stabili e prevedibili. L'azienda beneficia di un quadro regolatorio che le assicura la copertura dei costi e rendimenti predeterminati sulle attività core, riducendo la volatilità dei risultati.
+# --- Evoluzione Business Regolamentato vs Non-regolamentato ---
+@st.fragment
+@telemetria.sezione
+def sezione_business():
+    st.subheader("🏢 Evoluzione del Business e Crescita delle Attività Non Regolamentate")
 
-### Composizione dei ricavi:
+    col1, col2 = st.columns(2)
 
-Dai dati 2029 previsti nel piano industriale:
-- 75% En-route (sorvoli e traffico aereo)
-- 25% Terminal (servizi aeroportuali)
+    # GRAFICO 7: Composizione Ricavi Attuale
+    with col1:
+        grafico_pigro('fig_rev_current', lambda: grafici.crea_fig_revenue_split(df_revenue_split_current, 'Ricavi 2023 (%)', f"Composizione Ricavi {NOME_BREVE} 2023"))
 
-Il business è suddiviso in:
-- **Attività regolamentate**: rappresentano il core business, con ricavi prevedibili e protetti da meccanismi regolatori
-- **Attività non regolamentate**: in forte crescita, passeranno da €49M nel 2024 a €106M nel 2029 (CAGR +6%)
+    # GRAFICO 8: Composizione Ricavi Futura
+    with col2:
+        grafico_pigro('fig_rev_future', lambda: grafici.crea_fig_revenue_split(df_revenue_split_future, 'Ricavi 2029E (%)', f"Previsione Composizione Ricavi {NOME_BREVE} 2029"))
 
-### Solidità dei flussi di cassa:
+    st.info("""
+    **Focus sulle Attività Non Regolamentate**: ENAV punta a raddoppiare i ricavi da attività non regolamentate da €49M nel 2024 a €106M nel 2029, 
+    raggiungendo circa il 9% dei ricavi totali. Questo business include:
 
-ENAV adotta da anni una politica dei dividendi orientata al cash flow: almeno l'80% del Free Cash Flow normalizzato viene distribuito annualmente. Di fatto, oltre l'80% del free cash flow generato nel periodo 2015-2023 è stato restituito agli azionisti sotto forma di dividendi.
+    1. **Evoluzione del portfolio prodotti/servizi core** (67% dei ricavi non-regolati)
+       - Digital Towers, Digital Academy, nuove funzionalità per centri di controllo
 
-Nel 2024, la società ha generato:
-- Free Cash Flow: €199M (in crescita del 43% rispetto al 2023)
-- Debt/EBITDA ratio: 0,8x (in miglioramento rispetto a 1,1x del 2023)
+    2. **Espansione geografica** (23% dei ricavi non-regolati)
+       - Nuovi uffici pianificati in India (2025), Brasile e Arabia Saudita (2026)
+       - Presenza in 87 paesi globalmente
 
-La capacità di ENAV di sostenere un alto payout è confermata dai recenti risultati di cassa. Nel 2024 la società ha generato forti flussi di cassa che le hanno permesso sia di finanziare gli investimenti correnti sia di ridurre l'indebitamento finanziario netto di oltre €60 milioni.
+    3. **Nuovi business** (10% dei ricavi non-regolati)
+       - **Droni**: certificazioni CISP e USSP uniche in Europa
+       - **Energy Service Company**: servizi di efficientamento energetico
+       - **Digital Academy**: piattaforma e-learning per formazione aeronautica
     """)
+    st.markdown("---")
 
-with st.expander("**3. Piano Industriale 2025-2029 e Prospettive di Crescita**"):
-    st.markdown("""
-Il piano industriale 2025-2029 si fonda su quattro pilastri strategici:
-
-1. **Potenziamento del mercato regolato**:
-   - Modernizzazione delle infrastrutture di controllo
-   - Introduzione di torri di controllo digitali remote
-   - Consolidamento dei centri di controllo da 4 a 2 (Milano e Roma)
-
-2. **Espansione del mercato non regolato**:
-   - Ampliamento dell'offerta di servizi digitali
-   - Ingresso in nuovi mercati esteri (India 2025, Brasile e Arabia Saudita 2026)
-   - Sviluppo di nuovi business (droni, energy service company, digital academy)
-
-3. **Innovazione e sostenibilità**:
-   - Investimenti in soluzioni digitali e "green"
-   - Impegno per la decarbonizzazione (riduzione del 87,4% delle emissioni Scope 1 e 2 vs 2019)
 
-4. **Efficienza operativa e governance**:
-   - Riorganizzazione interna
-   - Ottimizzazione delle risorse
-
-### Investimenti e target finanziari:
+# --- Target Piano Industriale 2025-2029 ---
+@st.fragment
+@telemetria.sezione
+def sezione_target():
+    import tabelle
 
-Il piano prevede:
-- Investimenti totali: €570M entro il 2029
-- Crescita dei ricavi: da €1.037M (2024) a €1.200M (2029) - CAGR +3%
-- Aumento EBITDA: da €311M (2024) a €361M (2029) - CAGR +3%
-- Crescita utile netto: da €126M (2024) a €165M (2029) - CAGR +6%
-- FCF cumulato 2025-2029: circa €1 miliardo
+    st.subheader("🎯 Obiettivi Finanziari Piano Industriale 2025-2029")
 
-### Focus sul traffico aereo:
+    # Visualizzazione dei target come tabella
+    mostra_tabella('tabella_targets', tabelle.tabella_target(df_targets))
 
-Lo scenario atteso è di traffico aereo in crescita progressiva: per l'Italia si stima un CAGR del +2,5% annuo nel periodo 2025-2029, con un balzo di circa +6% nel 2025 secondo le ultime proiezioni Eurocontrol.
-    """)
-
-with st.expander("**4. Focus sulle Attività Non Regolamentate**"):
+    # Spiegazione degli investimenti
     st.markdown("""
-Le attività non regolamentate rappresentano un pilastro fondamentale della strategia di crescita di ENAV, con l'obiettivo di raddoppiare i ricavi da €49M nel 2024 a €106M nel 2029, raggiungendo circa il 9% dei ricavi totali.
-
-### Composizione del business non regolamentato (previsione 2029):
-
-- **Evoluzione del portfolio prodotti/servizi core** (67% dei ricavi non-regolati)
-  - Monetizzazione dell'expertise su Digital Towers
-  - Scale-up della Digital Academy anche verso terze parti
-  - Nuove funzionalità di prodotto per centri di controllo e torri
-  - Upgrade HW/SW per monitoraggio meteorologico
-
-- **Nuove geografie e mercati** (23% dei ricavi non-regolati)
-  - Nuovi uffici pianificati in mercati strategici:
-    - India (Q3 2025)
-    - Brasile (Q1 2026)
-    - Arabia Saudita (Q1 2026)
-  - Presenza in 87 paesi globalmente
-  - Focus su aree con alti investimenti aeroportuali previsti
-
-- **Nuovi business** (10% dei ricavi non-regolati)
-  - **Droni**: ENAV è l'unico player certificato sia CISP che USSP in Europa, posizionamento unico nell'ecosistema dei droni
-  - **Energy Service Company**: trasformazione dei costi operativi in opportunità di business
-  - **Digital Academy**: piattaforma di e-learning per formazione aeronautica
-
-### Business dei droni in dettaglio:
-
-Il piano industrisale evidenzia come ENAV abbia una posizione unica nel settore dei droni, con applicazioni in:
-- Monitoraggio di aree/infrastrutture critiche
-- Sistemi di rilevamento droni (DDS)
-- Consegne logistiche
-- Ispezioni infrastrutturali
-- Eventi (es. F1 GP Imola per rilevamento droni)
-
-ENAV offre una piattaforma "Drone as a Service" modulare e scalabile che include:
-- Fornitura di flotte di droni
-- Operazioni di volo
-- Gestione dei dati
-- Formazione specifica (Drone Academy)
-
-La società si avvantaggia del fatto che il mercato dei droni è in rapida crescita, con proiezioni di crescita a doppia cifra entro il 2030.
-
-### Energy Service Company e Digital Academy:
-
-ENAV sta inoltre sviluppando due nuove linee di business che non sono ancora state valorizzate nelle proiezioni finanziarie del piano industriale, rappresentando quindi un potenziale upside:
-
-- **Energy Service Company (ESCO)**:
-  - Servizi di consulenza e soluzioni chiavi in mano per aeroporti
-  - Valutazione energetica, studi di fattibilità, esecuzione e monitoraggio
-  - Inizialmente focalizzata sull'ottimizzazione dei consumi energetici interni di ENAV
-  - Espandibile al più ampio mercato aeroportuale e ad altri settori
-
-- **Digital Academy**:
-  - Piattaforma e-learning per formazione aeronautica
-  - Target: ANSP, gestori aeroportuali, operatori dell'aviazione, piloti di droni
-  - Valorizzazione del know-how di ENAV in formazione ATM (Air Traffic Management)
-    """)
-
-with st.expander("**5. Investimenti per la Crescita**"):
-    st.markdown("""
-ENAV ha pianificato investimenti significativi per sostenere la propria crescita nel periodo 2025-2029, con un impegno finanziario complessivo di €570 milioni, in aumento del 15% rispetto al periodo regolatorio precedente (€494 milioni nel 2020-2024).
-
-### Dettaglio degli investimenti previsti (2025-2029):
-
-- **Navigazione e sistemi ATM** (50% del totale):
-  - Software e piattaforme ATM per centri di controllo, approach e torri
-  - Sistemi di comunicazione radio centralizzati e remoti
-  - Sistemi di navigazione aerea, meteorologia e sorveglianza
-
-- **Infrastrutture civili e sistemi** (27% del totale):
-  - Conformità regolamentare delle infrastrutture civili
-  - Allineamento dei sistemi infrastrutturali all'innovazione tecnologica
-
-- **ICT e altro** (23% del totale):
-  - Sistemi operativi e piattaforme IT per supportare il core business
-  - Infrastrutture di rete nazionali
-  - Applicazioni gestionali
-  - Investimenti in sicurezza e safety
-
-### Iniziative strategiche specifiche:
-
-1. **Integrazione degli APP (Approach Units) nei ACC (Area Control Centers)** - completamento previsto nel 2027
-   - Trasferimento delle attività di gestione degli avvicinamenti ai Centri di Controllo d'Area
-
-2. **Consolidamento dei centri di controllo (ACC)** - completamento previsto nel 2030
-   - Riduzione da 4 a 2 centri (Milano e Roma)
-
-3. **Torri Remote** - completamento previsto nel 2033
-   - Digitalizzazione di 26 torri in 2 Remote Tower Control Centers
-
-4. **Monitoraggio meteorologico** - completamento previsto nel 2028
-   - Upgrade software e hardware per migliorare e automatizzare l'osservazione meteorologica
-
-5. **Piattaforma ATM** - completamento previsto nel 2030
-   - Nuova piattaforma di gestione del traffico aereo per il personale ATC
-
-Queste iniziative strategiche dovrebbero generare risparmi cumulati durante il periodo di piano di circa €21 milioni, aumentando a circa €47 milioni a regime.
-
-### Piano M&A e crescita esterna:
-
-ENAV ha definito un piano di acquisizioni selettivo con fondi disponibili fino a €350 milioni, che sarà finanziato attraverso nuovo debito senza intaccare la solidità finanziaria. Le aree di interesse per M&A includono:
-
-1. **Licenze e servizi software**
-   - Consolidamento del posizionamento come leader globale
-   - Espansione delle competenze complementari
-
-2. **Servizi tecnici e di ingegneria**
-   - Rafforzamento del know-how attuale
-   - Consolidamento dell'hub ingegneristico del Gruppo
-
-3. **Consulenza avionica**
-   - Scale-up delle attività di consulenza
-   - Espansione del portfolio clienti
-   - Valorizzazione del know-how
-
-4. **Meteorologia**
-   - Acquisizione di know-how e capacità
-   - Sviluppo di software innovativi
-
-5. **Droni/UTM (Unmanned Traffic Management)**
-   - Rafforzamento della posizione in un ambiente in crescita
-   - Sviluppo di servizi UTM nel mercato domestico
+    ### Investimenti per la Crescita (2025-2029)
+
+    ENAV ha pianificato investimenti per **€570 milioni** (+15% rispetto al periodo precedente) così suddivisi:
+    - **Navigazione e sistemi ATM**: 50% degli investimenti
+    - **Infrastrutture civili e sistemi**: 27% degli investimenti
+    - **ICT e altro**: 23% degli investimenti
+
+    Progetti strategici principali:
+    - Consolidamento dei centri di controllo (da 4 a 2)
+    - Implementazione di 26 torri remote digitali
+    - Aggiornamento sistemi di monitoraggio meteorologico
+
+    ### Piano M&A
+
+    ENAV ha definito un piano di acquisizioni selettivo con fondi disponibili fino a **€350 milioni**, con focus su:
+    1. Licenze e servizi software
+    2. Servizi tecnici e di ingegneria
+    3. Consulenza avionica
+    4. Meteorologia
+    5. Tecnologie per droni e UTM (Unmanned Traffic Management)
     """)
+    st.markdown("---")
 
-with st.expander("**6. Elementi Distintivi per l'Investitore a Dividendo**"):
-    st.markdown("""
-### Politica dei dividendi chiara e misurabile:
 
-Questa politica è stata confermata e rafforzata nel nuovo Piano Industriale, che prevede un payout medio attorno all'80% del FCF anche negli anni 2025-2029. Il management, e in particolare l'Amministratore Delegato, hanno sottolineato l'impegno a remunerare generosamente gli azionisti.
+# --- Punti di Forza e Rischi ---
+@st.fragment
+@telemetria.sezione
+def sezione_punti_forza_rischi():
+    st.subheader("✅ Elementi Distintivi per l'Investitore a Dividendo")
 
-Monti (CEO) ha dichiarato che "tutto il cash che si forma [dal core business regolato] deve andare a premiare i nostri azionisti", mentre le iniziative non regolate devono servire a creare ulteriore valore e saranno finanziate con debito per non intaccare i flussi destinabili ai dividendi.
+    col1, col2 = st.columns(2)
 
-### Rendimento competitivo:
+    with col1:
+        st.markdown("### Punti di Forza")
+        for i, punto in enumerate(punti_forza):
+            st.markdown(f"**{i+1}.** {punto}")
 
-Ai prezzi attuali di mercato, il titolo ENAV offre un rendimento da dividendo superiore al 6% annuo, collocandosi tra le società italiane con yield più elevati e stabili. Se i piani di ENAV si realizzano, un investitore di lungo periodo beneficerà non solo dei dividendi annuali elevati, ma anche di una possibile rivalutazione del capitale.
+    with col2:
+        st.markdown("### Rischi da Considerare")
+        for i, rischio in enumerate(rischi):
+            st.markdown(f"**{i+1}.** {rischio}")
 
-### Meccanismi di protezione regolatori:
+    st.markdown("---")
 
-Il nuovo periodo regolatorio **RP4 (2025-2029)** offre stabilità e protezione attraverso:
-- Meccanismi di protezione per inflazione e variazioni di traffico
-- Recupero dei costi operativi
-- Remunerazione del capitale investito (WACC più alto: ~6.7% vs 4.4% del periodo precedente)
-    """)
 
-with st.expander("**7. Analisi del Reset Regolatorio RP4**"):
-    st.markdown("""
-Un elemento importante da comprendere è l'impatto del "reset regolatorio" che avviene all'inizio di ogni periodo regolatorio quinquennale:
+# --- Tabella Finanziaria Riassuntiva ---
+@st.fragment
+@telemetria.sezione
+def sezione_tabella_finanziaria():
+    import tabelle
 
-- EBITDA 2024: €311M
-- EBITDA 2025: previsto calo a €225M (-28%) a causa del reset regolatorio
-- EBITDA 2029: previsto recupero a €361M (CAGR +12,5% dal 2025)
+    st.subheader("🔢 Tabella Finanziaria Riassuntiva")
+    mostra_tabella('tabella_finanziaria', tabelle.tabella_finanziaria(df_fin))
+    st.caption("Fonte: Dati estratti dai report finanziari. I dati 2024 sono stime basate sul piano industriale e sulle proiezioni di analisti.")
+    st.markdown("---")
 
-Questo calo temporaneo è un elemento fisiologico dovuto a:
-- Azzeramento dei meccanismi di bilanciamento del traffico
-- Reset dei parametri economici e finanziari
-- Rimozione del balance dalla formula RAB
 
-È importante notare che questo reset non compromette la sostenibilità del dividendo, che continuerà a crescere anche nel 2025-2026 grazie alla forte posizione di cassa e alla generazione di FCF.
-    """)
+# --- Conclusioni per l'Investitore ---
+@st.fragment
+@telemetria.sezione
+def sezione_conclusioni():
+    st.subheader("📝 Conclusioni per l'Investitore orientato al Dividendo")
 
-with st.expander("**8. Sostenibilità finanziaria e posizione di cassa**"):
     st.markdown("""
-Il piano industriale 2025-2029 evidenzia una forte sostenibilità finanziaria che supporta sia gli investimenti che la remunerazione degli azionisti:
-
-- **Capacità di generazione di cassa**: circa €1,6 miliardi di operating cash flow nel periodo 2025-2029
-- **Free Cash Flow previsto**: circa €1 miliardo dopo aver finanziato €568M di CAPEX
-- **Dividendi previsti**: circa €813M nel periodo di piano (80% del FCF)
-- **Posizione finanziaria netta**: previsto azzeramento del debito entro il 2029 (da €258M nel 2024 a €0 nel 2029)
-
-Il Net Debt/EBITDA passerà da 0,8x nel 2024 a 0,6x nel 2025 per poi azzerarsi entro il 2029, creando un headroom di circa €350M che potrebbe essere utilizzato per accelerare la crescita organica o per operazioni di M&A.
-    """)
+    ENAV S.p.A. emerge come una società solida e cash-generative, con un ruolo essenziale nel sistema del traffico aereo italiano e una strategia ben definita per crescere nei prossimi anni. Per un investitore orientato ai dividendi, ENAV offre attualmente:
 
-with st.expander("**9. Principali Rischi da Considerare**"):
-    st.markdown("""
-### Rischi regolatori:
-- Cambiamenti nei parametri regolatori potrebbero influenzare la redditività
-- Il reset regolatorio causa temporanea flessione dei risultati
+    - **Rendimento elevato**: Dividend yield di circa 7%, tra i più alti del FTSE MIB
+    - **Crescita stabile**: Incremento programmato del dividendo di circa 4% annuo fino al 2029
+    - **Sostenibilità**: La politica di payout dell'80% del FCF è supportata dalla generazione di cassa
+    - **Visibilità**: Piano industriale chiaro fino al 2029 con obiettivi finanziari dettagliati
+    - **Resilienza**: Modello di business regolato con protezioni incorporate contro inflazione e volatilità
 
-### Rischi di traffico:
-- Eventi straordinari (come accaduto con il COVID-19) possono impattare significativamente i volumi
-- Esistono tuttavia meccanismi di compensazione nel medio termine
+    Il temporaneo calo dell'EBITDA previsto nel 2025 (dovuto al reset regolatorio) non dovrebbe impattare la politica dei dividendi grazie alla solida posizione finanziaria della società. Inoltre, l'espansione nelle attività non regolamentate offre un potenziale di crescita aggiuntivo senza compromettere la generazione di cassa destinata agli azionisti.
 
-### Rischi esecutivi:
-- Execution risk nelle iniziative di crescita non regolamentate
-- Rischi legati alle acquisizioni (M&A) programmate fino a €350M
+    In un'ottica di lungo periodo, ENAV rappresenta una potenziale "yield play" interessante: un titolo difensivo, capace di offrire reddito ricorrente superiore alla media di mercato e con un moderato potenziale di crescita sia del dividendo sia del valore del capitale.
     """)
 
-with st.expander("**10. Valutazione e Prospettive per l'Investitore**"):
-    st.markdown("""
-### Metrics chiave:
-- P/E 2024: ~13x
-- EV/EBITDA 2024: ~8.5x
-- FCF Yield 2024: ~7-8%
-- Dividend Yield 2024: ~7.1%
-
-La valutazione riflette un profilo di basso rischio operativo e ottimo rendimento, tipico di un titolo "core" per investitori a dividendo. Il mercato sembra aver reagito positivamente ai piani di ENAV, con diversi broker come Intesa Sanpaolo (target €5,10) ed Equita SIM (target €4,50) che raccomandano l'acquisto.
-
-### Potenziale di apprezzamento:
+    st.markdown("---")
 
-Considerando:
-1. Un rendimento da dividendo stabile al 7-8%
-2. Una crescita annua del dividendo del 4%
-3. Un potenziale apprezzamento del capitale dovuto all'espansione delle attività non regolate
 
-ENAV potrebbe offrire un rendimento totale annuo (Total Shareholder Return) a doppia cifra nel lungo periodo.
-    """)
-
-with st.expander("**11. Conclusioni**"):
+# --- NUOVA SEZIONE: Analisi Completa di ENAV ---
+@st.fragment
+@telemetria.sezione
+def sezione_analisi_completa():
+    st.subheader("📑 Analisi Completa di ENAV S.p.A.")
     st.markdown("""
-ENAV S.p.A. emerge come una società solida e cash-generative, con un ruolo essenziale nel sistema del traffico aereo italiano e una strategia ben definita per crescere nei prossimi anni. Per un investitore orientato ai dividendi, ENAV offre attualmente un rendimento elevato e prospettive di incremento dei flussi cedolari, sostenuti da piani industriali credibili e da una disciplina finanziaria focalizzata sulla remunerazione degli azionisti.
-
-La politica dei dividendi di ENAV appare sostenibile nel lungo termine – circa l'80% del free cash flow atteso verrà distribuito annualmente – lasciando comunque margine per finanziare la crescita. Il significativo piano di investimenti di €570M e l'espansione nelle attività non regolate potrebbero creare ulteriore valore per gli azionisti senza compromettere la capacità di distribuzione dei dividendi.
-
-In un'ottica di lungo periodo, ENAV rappresenta una potenziale "yield play" interessante: un titolo difensivo, capace di offrire reddito ricorrente superiore alla media di mercato e con un moderato potenziale di crescita sia del dividendo sia del valore del capitale, man mano che il settore del trasporto aereo consolida la propria ripresa e le iniziative strategiche cominciano a generare risultati.
-
----
-
-*Nota: Questo documento è stato creato sulla base dei dati forniti nei file di analisi e nella presentazione del Piano Industriale 2025-2029 di ENAV. Gli investitori dovrebbero condurre ulteriori ricerche e consultare un consulente finanziario prima di prendere decisioni di investimento.*
+    Questa sezione contiene l'analisi completa ed approfondita di ENAV S.p.A. per gli investitori orientati al dividendo.
+    Clicca su ciascuna sezione per visualizzare il contenuto dettagliato.
     """)
 
-st.markdown("---")
+    # Analisi completa - testi in contenuti/analisi_completa/
+    for titolo, nome_file, aperta in SEZIONI_ANALISI_COMPLETA:
+        espansore_pigro(titolo, lambda nome_file=nome_file: st.markdown(dati.carica_contenuto(nome_file)),
+                        chiave=nome_file, aperto=aperta)
+
+    st.markdown("---")
+
+
+# --- Composizione della pagina ---
+# Ogni sezione è un fragment: un controllo al suo interno riesegue solo quella sezione
+sezione_indicatori_chiave()
+sezione_analisi_dividendo()
+sezione_sostenibilita()
+sezione_proiezione_futura()
+sezione_stress()
+sezione_whatif()
+sezione_sensibilita_yield()
+sezione_valutazione()
+sezione_tsr()
+sezione_business()
+sezione_target()
+sezione_punti_forza_rischi()
+sezione_tabella_finanziaria()
+sezione_conclusioni()
+sezione_analisi_completa()
 
 # Disclaimer aggiornato con formattazione migliore
 st.markdown("""
@@ -1194,3 +771,18 @@ st.markdown("""
     <p style="font-style: italic; color: #888;">Realizzazione a cura della Barba Sparlante</p>
 </div>
 """, unsafe_allow_html=True)
+
+# --- Pannello di debug (nascosto: solo con telemetria attiva e ?debug=1) ---
+telemetria.registra("pagina", "rerun", INIZIO_RERUN)
+telemetria.avvio("prima_pagina", INIZIO_SCRIPT)
+if telemetria.ATTIVA and st.query_params.get("debug") == "1":
+    with st.sidebar.expander("🛠️ Telemetria", expanded=True):
+        misure = telemetria.riepilogo()
+        if misure:
+            st.dataframe(pd.DataFrame(misure).set_index(['fase', 'nome']), use_container_width=True)
+        else:
+            st.caption("Nessuna misura registrata.")
+        st.download_button("Esporta JSON", telemetria.esporta_json(), file_name="telemetria.json", mime="application/json")
+        st.download_button("Esporta Prometheus", telemetria.esporta_prometheus(), file_name="metrics.txt", mime="text/plain")
+        if st.button("Azzera misure"):
+            telemetria.azzera()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Archivio colonnare dei dati finanziari (formato Arrow IPC, memory-mapped).
+
+I dati sono in formato lungo, uno per riga: societa × anno × metrica, con
+la fonte del dato (Storico, Stima, Proposto, Piano) e una nota opzionale.
+La sorgente modificabile è ``dati_finanziari/finanziari.csv``; da questa
+viene compilato un file Arrow non compresso e versionato, che viene aperto
+con ``pa.memory_map``: le colonne puntano direttamente alle pagine del file,
+per cui la lettura non copia la storia né gli emittenti che non servono.
+Le pagine di una società materializzano in pandas solo la sua fetta
+(estrai_societa); le pipeline sull'universo (metriche, KPI, screening)
+condividono un'unica copia dell'archivio intero, con società, metrica e
+fonte categoriche (``in_pandas(..., categorie=True)``), la cui memoria
+cresce con il numero di righe.
+
+Da riga di comando ricompila l'archivio: ``python archivio.py``.
+"""
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.ipc as ipc
+
+# Incrementare quando cambia lo schema: il file compilato cambia nome
+VERSIONE_ARCHIVIO = 1
+
+CARTELLA_ARCHIVIO = Path(__file__).parent / "dati_finanziari"
+SORGENTE_CSV = CARTELLA_ARCHIVIO / "finanziari.csv"
+FILE_ARCHIVIO = CARTELLA_ARCHIVIO / f"finanziari_v{VERSIONE_ARCHIVIO}.arrow"
+
+SCHEMA = pa.schema([
+    pa.field("societa", pa.dictionary(pa.int32(), pa.string())),
+    pa.field("anno", pa.int16()),
+    pa.field("metrica", pa.dictionary(pa.int32(), pa.string())),
+    pa.field("valore", pa.float64()),
+    pa.field("fonte", pa.dictionary(pa.int8(), pa.string())),
+    pa.field("nota", pa.string()),
+], metadata={
+    "versione": str(VERSIONE_ARCHIVIO),
+    "chiave": "societa,anno,metrica",
+})
+
+
+def compila_archivio(sorgente=SORGENTE_CSV, destinazione=FILE_ARCHIVIO):
+    """Converte il CSV sorgente nel file Arrow ordinato per (societa, anno, metrica)."""
+    tipi_lettura = {
+        "societa": pa.string(),
+        "anno": pa.int16(),
+        "metrica": pa.string(),
+        "valore": pa.float64(),
+        "fonte": pa.string(),
+        "nota": pa.string(),
+    }
+    tabella = pacsv.read_csv(
+        sorgente,
+        convert_options=pacsv.ConvertOptions(column_types=tipi_lettura, strings_can_be_null=True),
+    )
+    tabella = tabella.sort_by([("societa", "ascending"), ("anno", "ascending"), ("metrica", "ascending")])
+    tabella = tabella.cast(SCHEMA.remove_metadata()).replace_schema_metadata(SCHEMA.metadata)
+
+    # Scrittura atomica: più worker possono compilare in parallelo senza leggere file parziali
+    temporaneo = Path(destinazione).with_suffix(f".{os.getpid()}.tmp")
+    with pa.OSFile(str(temporaneo), "wb") as sink:
+        with ipc.new_file(sink, tabella.schema) as writer:
+            writer.write_table(tabella)
+    os.replace(temporaneo, destinazione)
+    return Path(destinazione)
+
+
+def _da_compilare(sorgente, destinazione):
+    return not destinazione.exists() or destinazione.stat().st_mtime_ns < sorgente.stat().st_mtime_ns
+
+
+def apri_archivio(percorso=FILE_ARCHIVIO, sorgente=SORGENTE_CSV):
+    """Tabella Arrow dell'archivio, letta zero-copy da un file memory-mapped.
+
+    Se il file compilato manca o è più vecchio del CSV sorgente viene
+    (ri)compilato prima dell'apertura.
+    """
+    percorso, sorgente = Path(percorso), Path(sorgente)
+    if sorgente.exists() and _da_compilare(sorgente, percorso):
+        compila_archivio(sorgente, percorso)
+    tabella = ipc.open_file(pa.memory_map(str(percorso), "r")).read_all()
+    versione = (tabella.schema.metadata or {}).get(b"versione", b"").decode()
+    if versione != str(VERSIONE_ARCHIVIO):
+        raise ValueError(f"Versione archivio {versione!r} non supportata (attesa {VERSIONE_ARCHIVIO})")
+    return tabella
+
+
+def societa_disponibili(tabella):
+    """Elenco ordinato dei ticker presenti nell'archivio."""
+    return sorted(pc.unique(tabella["societa"].combine_chunks().dictionary_decode()).to_pylist())
+
+
+COLONNE_DIZIONARIO = ("societa", "metrica", "fonte")
+
+
+def in_pandas(tabella, categorie=False):
+    """DataFrame pandas in formato lungo con le colonne dizionario decodificate.
+
+    Con ``categorie`` le colonne dizionario restano categoriche (un codice
+    intero per riga, le stringhe una volta sola), con le categorie in
+    ordine alfabetico come le stringhe: è il formato dell'universo intero.
+    """
+    df = tabella.to_pandas()
+    for colonna in COLONNE_DIZIONARIO:
+        if categorie:
+            df[colonna] = df[colonna].cat.set_categories(sorted(df[colonna].cat.categories))
+        else:
+            df[colonna] = df[colonna].astype(str)
+    return df
+
+
+def _maschera_societa(colonna, societa):
+    # Confronto sugli indici del dizionario di ogni blocco: la colonna non viene decodificata
+    return pa.chunked_array(
+        [pc.equal(blocco.indices, blocco.dictionary.index(societa).as_py()) for blocco in colonna.chunks],
+        type=pa.bool_(),
+    )
+
+
+def estrai_societa(tabella, societa):
+    """Righe di una sola società, come DataFrame pandas in formato lungo."""
+    return in_pandas(tabella.filter(_maschera_societa(tabella["societa"], societa)))
+
+
+def tabella_metriche(df_lungo, colonna="valore"):
+    """Pivot anno × metrica di una società (indice: anno)."""
+    return df_lungo.pivot(index="anno", columns="metrica", values=colonna).sort_index()
+
+
+if __name__ == "__main__":
+    print(f"Archivio compilato: {compila_archivio()}")
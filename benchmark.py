@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""Benchmark headless dei rerun di app.py, sezione per sezione.
+
+L'app viene eseguita con ``streamlit.testing.v1.AppTest`` (nessun browser
+né server) e misurata in due fasi:
+
+- freddo: cache dei dati e delle figure svuotate, sessione nuova;
+- caldo: rerun della stessa sessione con tutte le cache popolate.
+
+Per ogni fase vengono riportati p50/p95 del tempo totale e di ogni
+sezione (le funzioni ``@st.fragment`` di app.py), i byte dei messaggi
+inviati al browser per sezione e, in un passaggio separato con
+``tracemalloc`` (che rallenta l'esecuzione e non deve falsare i tempi),
+il picco di memoria allocata e i blocchi netti rimasti allocati.
+
+Con ``--avvio N`` misura anche l'avvio a freddo di N processi nuovi
+(import, primo contenuto, prima pagina completa e durata del processo),
+cioè il tempo dopo cui una replica appena avviata serve la prima pagina.
+
+La strumentazione non richiede modifiche all'app: ``st.fragment`` viene
+sostituito da una versione che cronometra la sezione, e l'invio dei
+messaggi viene contato nel ``ScriptRunContext``.
+
+Uso::
+
+    python benchmark.py                 # misura e confronta con la baseline
+    python benchmark.py --salva         # misura e aggiorna la baseline
+    python benchmark.py --scenario completo --caldi 50
+
+Con una regressione oltre la tolleranza il comando esce con codice 1,
+così può bloccare un deploy.
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import streamlit as st
+from streamlit.runtime.scriptrunner.script_run_context import ScriptRunContext
+from streamlit.testing.v1 import AppTest
+
+CARTELLA = Path(__file__).parent
+APP = CARTELLA / "app.py"
+FILE_BASELINE = CARTELLA / "benchmark_baseline.json"
+
+# Tutto ciò che l'app invia fuori dalle sezioni (titolo, sidebar, disclaimer)
+PAGINA = "(pagina)"
+TOTALE = "totale"
+
+# pigro: la pagina come la vede un utente all'apertura
+# completo: tutti i grafici e i testi generati, Monte Carlo e stress test attivi
+SCENARI = {
+    'pigro': {'ambiente': {}, 'stato': {}},
+    'completo': {'ambiente': {'ENAV_RENDER_PIGRO': '0'}, 'stato': {'mc_attiva': True, 'str_attiva': True}},
+}
+
+# Una misura è una regressione se supera la baseline di entrambe le soglie;
+# i rerun a freddo sono pochi e rumorosi, quindi hanno una tolleranza più larga
+TOLLERANZA_TEMPO = {'freddo': 0.50, 'caldo': 0.25}
+MINIMO_MS = 10.0
+TOLLERANZA_MEMORIA = 0.25
+TOLLERANZA_BYTE = 0.10
+MINIMO_BYTE = 1024
+MINIMO_KB = 256
+
+
+class Misuratore:
+    """Raccoglie tempi, byte e memoria per sezione durante i rerun."""
+
+    def __init__(self):
+        self.tempi = defaultdict(list)
+        self.byte = defaultdict(int)
+        self.memoria = {}
+        self._sezione = None
+
+    def azzera_byte(self):
+        self.byte.clear()
+
+    def fragment(self, originale):
+        """Sostituto di ``st.fragment`` che cronometra ogni esecuzione della sezione."""
+        misuratore = self
+
+        def fragment_misurato(func=None, **opzioni):
+            if func is None:
+                return lambda f: fragment_misurato(f, **opzioni)
+
+            @functools.wraps(func)
+            def sezione(*args, **kwargs):
+                misuratore._sezione = func.__name__
+                traccia = tracemalloc.is_tracing()
+                if traccia:
+                    corrente, _ = tracemalloc.get_traced_memory()
+                    tracemalloc.reset_peak()
+                    blocchi = sys.getallocatedblocks()
+                inizio = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    misuratore.tempi[func.__name__].append((time.perf_counter() - inizio) * 1000)
+                    if traccia:
+                        misuratore.memoria[func.__name__] = {
+                            'picco_kb': round((tracemalloc.get_traced_memory()[1] - corrente) / 1024, 1),
+                            'blocchi': sys.getallocatedblocks() - blocchi,
+                        }
+                    misuratore._sezione = None
+
+            return originale(sezione, **opzioni)
+
+        return fragment_misurato
+
+    def enqueue(self, originale):
+        """Sostituto di ``ScriptRunContext.enqueue`` che somma i byte per sezione."""
+        misuratore = self
+
+        @functools.wraps(originale)
+        def enqueue_misurato(ctx, msg):
+            misuratore.byte[misuratore._sezione or PAGINA] += msg.ByteSize()
+            return originale(ctx, msg)
+
+        return enqueue_misurato
+
+
+@contextmanager
+def strumentazione(misuratore):
+    """Installa le sonde su Streamlit per la durata del blocco."""
+    fragment_originale = st.fragment
+    enqueue_originale = ScriptRunContext.enqueue
+    st.fragment = misuratore.fragment(fragment_originale)
+    ScriptRunContext.enqueue = misuratore.enqueue(enqueue_originale)
+    try:
+        yield
+    finally:
+        st.fragment = fragment_originale
+        ScriptRunContext.enqueue = enqueue_originale
+
+
+@contextmanager
+def ambiente(variabili):
+    precedenti = {nome: os.environ.get(nome) for nome in variabili}
+    os.environ.update(variabili)
+    try:
+        yield
+    finally:
+        for nome, valore in precedenti.items():
+            if valore is None:
+                os.environ.pop(nome, None)
+            else:
+                os.environ[nome] = valore
+
+
+def svuota_cache():
+    """Riporta l'app allo stato di un processo appena avviato."""
+    import dati
+    import grafici
+    dati.invalida_cache()
+    grafici.svuota_cache_figure()
+
+
+def nuova_sessione(stato):
+    app = AppTest.from_file(str(APP), default_timeout=300)
+    for chiave, valore in stato.items():
+        app.session_state[chiave] = valore
+    return app
+
+
+def esegui(app, misuratore):
+    inizio = time.perf_counter()
+    app.run()
+    misuratore.tempi[TOTALE].append((time.perf_counter() - inizio) * 1000)
+    if app.exception:
+        raise RuntimeError(f"Eccezione nell'app: {app.exception[0].message}")
+
+
+def _percentili(valori):
+    p50, p95 = np.percentile(valori, [50, 95])
+    return {'p50_ms': round(float(p50), 2), 'p95_ms': round(float(p95), 2)}
+
+
+def _riepilogo(misuratore):
+    sezioni = {}
+    for nome in sorted(set(misuratore.tempi) | set(misuratore.byte)):
+        voce = _percentili(misuratore.tempi[nome]) if misuratore.tempi.get(nome) else {}
+        if nome != TOTALE:
+            voce['byte'] = misuratore.byte.get(nome, 0)
+        sezioni[nome] = voce
+    return sezioni
+
+
+def _memoria(scenario, fredda):
+    # Passaggio separato: tracemalloc rallenta l'esecuzione di un ordine di grandezza
+    misuratore = Misuratore()
+    with strumentazione(misuratore):
+        if fredda:
+            svuota_cache()
+        app = nuova_sessione(scenario['stato'])
+        if not fredda:
+            app.run()
+        tracemalloc.start()
+        try:
+            blocchi = sys.getallocatedblocks()
+            esegui(app, misuratore)
+            misuratore.memoria[TOTALE] = {
+                'picco_kb': round(tracemalloc.get_traced_memory()[1] / 1024, 1),
+                'blocchi': sys.getallocatedblocks() - blocchi,
+            }
+        finally:
+            tracemalloc.stop()
+    return dict(sorted(misuratore.memoria.items()))
+
+
+def misura_scenario(nome, freddi=5, caldi=20):
+    """Tempi p50/p95, byte e memoria per sezione di uno scenario, a freddo e a caldo."""
+    scenario = SCENARI[nome]
+    risultato = {}
+    with ambiente(scenario['ambiente']):
+        freddo = Misuratore()
+        with strumentazione(freddo):
+            for _ in range(freddi):
+                svuota_cache()
+                freddo.azzera_byte()
+                esegui(nuova_sessione(scenario['stato']), freddo)
+        risultato['freddo'] = _riepilogo(freddo)
+
+        caldo = Misuratore()
+        with strumentazione(caldo):
+            app = nuova_sessione(scenario['stato'])
+            app.run()
+            for _ in range(caldi):
+                caldo.azzera_byte()
+                esegui(app, caldo)
+        risultato['caldo'] = _riepilogo(caldo)
+
+        risultato['memoria'] = {'freddo': _memoria(scenario, True), 'caldo': _memoria(scenario, False)}
+    return risultato
+
+
+def _processo_avvio():
+    # Eseguito in un interprete nuovo: un solo rerun, con import e cache a freddo
+    sys.path.insert(0, str(CARTELLA))
+    app = nuova_sessione({})
+    app.run()
+    import telemetria
+    print(json.dumps(telemetria.tappe_avvio()))
+
+
+def misura_avvio(ripetizioni=3):
+    """p50/p95 delle tappe di avvio su ``ripetizioni`` processi nuovi."""
+    tappe = defaultdict(list)
+    for _ in range(ripetizioni):
+        inizio = time.perf_counter()
+        uscita = subprocess.run([sys.executable, __file__, "--processo-avvio"], capture_output=True, text=True, check=True)
+        tappe['processo'].append((time.perf_counter() - inizio) * 1000)
+        for tappa, ms in json.loads(uscita.stdout.strip().splitlines()[-1]).items():
+            tappe[tappa].append(ms)
+    return {tappa: _percentili(valori) for tappa, valori in tappe.items()}
+
+
+def confronta(attuale, baseline):
+    """Elenco delle regressioni di tempo (p50), byte e picco di memoria rispetto alla baseline."""
+    regressioni = []
+
+    def controlla(etichetta, valore, riferimento, tolleranza, minimo, unita):
+        if riferimento is not None and valore > riferimento * (1 + tolleranza) and valore - riferimento > minimo:
+            regressioni.append(f"{etichetta}: {valore:,.1f} {unita} (baseline {riferimento:,.1f})")
+
+    for tappa, voce in attuale.get('avvio', {}).items():
+        base = baseline.get('avvio', {}).get(tappa, {})
+        controlla(f"avvio/{tappa}", voce['p50_ms'], base.get('p50_ms'), TOLLERANZA_TEMPO['freddo'], MINIMO_MS, "ms")
+    for scenario, fasi in attuale['scenari'].items():
+        base_scenario = baseline.get('scenari', {}).get(scenario)
+        if base_scenario is None:
+            continue
+        for fase in ('freddo', 'caldo'):
+            for sezione, voce in fasi[fase].items():
+                base = base_scenario[fase].get(sezione, {})
+                etichetta = f"{scenario}/{fase}/{sezione}"
+                if 'p50_ms' in voce:
+                    controlla(etichetta, voce['p50_ms'], base.get('p50_ms'), TOLLERANZA_TEMPO[fase], MINIMO_MS, "ms")
+                if 'byte' in voce:
+                    controlla(etichetta, voce['byte'], base.get('byte'), TOLLERANZA_BYTE, MINIMO_BYTE, "byte")
+            for sezione, voce in fasi['memoria'][fase].items():
+                base = base_scenario['memoria'][fase].get(sezione, {})
+                controlla(f"{scenario}/memoria {fase}/{sezione}", voce['picco_kb'], base.get('picco_kb'),
+                          TOLLERANZA_MEMORIA, MINIMO_KB, "KB")
+    return regressioni
+
+
+def stampa(risultati):
+    if risultati.get('avvio'):
+        print("\n== Avvio a freddo (processi nuovi)")
+        for tappa, voce in risultati['avvio'].items():
+            print(f"{tappa:<30}{voce['p50_ms']:>12.1f}{voce['p95_ms']:>10.1f}")
+    for scenario, fasi in risultati['scenari'].items():
+        print(f"\n== Scenario: {scenario}")
+        print(f"{'sezione':<30}{'freddo p50':>12}{'p95':>10}{'caldo p50':>12}{'p95':>10}{'byte':>10}{'picco KB':>10}")
+        for sezione, freddo in fasi['freddo'].items():
+            caldo = fasi['caldo'].get(sezione, {})
+            memoria = fasi['memoria']['freddo'].get(sezione, {})
+            print(f"{sezione:<30}{freddo.get('p50_ms', 0):>12.1f}{freddo.get('p95_ms', 0):>10.1f}"
+                  f"{caldo.get('p50_ms', 0):>12.1f}{caldo.get('p95_ms', 0):>10.1f}"
+                  f"{caldo.get('byte', 0):>10,}{memoria.get('picco_kb', 0):>10,.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless dei rerun di app.py")
+    parser.add_argument("--scenario", choices=sorted(SCENARI), action="append",
+                        help="scenario da misurare (ripetibile; default: tutti)")
+    parser.add_argument("--freddi", type=int, default=5, help="rerun a cache vuote (default 5)")
+    parser.add_argument("--caldi", type=int, default=20, help="rerun a cache calde (default 20)")
+    parser.add_argument("--salva", action="store_true", help="scrive i risultati come nuova baseline")
+    parser.add_argument("--avvio", type=int, default=3, help="processi nuovi per l'avvio a freddo (default 3, 0 per saltare)")
+    parser.add_argument("--baseline", type=Path, default=FILE_BASELINE)
+    parser.add_argument("--processo-avvio", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.processo_avvio:
+        _processo_avvio()
+        return 0
+
+    sys.path.insert(0, str(CARTELLA))
+    risultati = {
+        'python': platform.python_version(),
+        'streamlit': st.__version__,
+        'avvio': misura_avvio(args.avvio) if args.avvio else {},
+        'scenari': {nome: misura_scenario(nome, args.freddi, args.caldi) for nome in args.scenario or SCENARI},
+    }
+    stampa(risultati)
+
+    if args.salva:
+        args.baseline.write_text(json.dumps(risultati, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nBaseline salvata in {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"\nNessuna baseline in {args.baseline}: eseguire con --salva")
+        return 0
+    regressioni = confronta(risultati, json.loads(args.baseline.read_text(encoding="utf-8")))
+    if regressioni:
+        print("\nRegressioni rispetto alla baseline:")
+        for riga in regressioni:
+            print(f"  - {riga}")
+        return 1
+    print("\nNessuna regressione rispetto alla baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""Cache su disco condivisa tra i processi, indicizzata per contenuto.
+
+La memoizzazione in memoria (``st.cache_resource``, cache delle figure)
+vale per un solo processo: ogni worker del server e ogni riavvio
+ricostruirebbero da capo figure e frame costosi. Qui i risultati
+serializzati (figure in JSON, frame in Arrow IPC) vengono salvati
+compressi con zlib in una cartella comune a tutti i processi dell'host,
+che deve essere scrivibile solo dall'utente del server:
+
+- la chiave è l'impronta SHA-256 del contenuto degli input e della
+  versione del codice che li produce, quindi una voce non può diventare
+  obsoleta (un codice o dati diversi producono una chiave diversa);
+- le scritture sono atomiche (file temporaneo e ``os.replace``): più
+  processi possono scrivere la stessa voce e nessuno legge file parziali;
+- la dimensione totale è limitata con uno sfratto LRU: ogni lettura
+  aggiorna la data di modifica del file, e quando un processo ha scritto
+  più di un decimo del limite i file usati meno di recente vengono
+  eliminati fino a tornare al 90% del limite.
+
+La cartella è ``dati_finanziari/cache/`` o ``ENAV_CACHE_DISCO``; il limite
+è ``ENAV_CACHE_DISCO_MB`` (default 512, 0 disattiva la cache). Il
+riscaldamento a ogni deploy è ``python report.py --riscalda``.
+
+Da riga di comando mostra occupazione e voci per spazio:
+``python cache_disco.py [--pulisci | --svuota]``.
+"""
+import argparse
+import functools
+import hashlib
+import inspect
+import io
+import os
+import shutil
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import telemetria
+
+CARTELLA_CACHE = Path(os.environ.get("ENAV_CACHE_DISCO", Path(__file__).parent / "dati_finanziari" / "cache"))
+LIMITE_BYTE = int(float(os.environ.get("ENAV_CACHE_DISCO_MB", "512")) * 1024 * 1024)
+ATTIVA = LIMITE_BYTE > 0
+
+# Livello zlib medio: oltre, il tempo di compressione cresce molto più del guadagno
+COMPRESSIONE = 6
+# Temporanei lasciati da processi interrotti durante la scrittura (secondi)
+ETA_MASSIMA_TEMPORANEI = 3600
+
+_LOCK = threading.Lock()
+_scritti_dalla_pulizia = 0
+_scrittore = None
+
+
+def _aggiorna_impronta(h, valore):
+    if isinstance(valore, pd.DataFrame):
+        h.update(repr(list(valore.columns)).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(valore, index=True).values.tobytes())
+    elif isinstance(valore, np.ndarray):
+        # repr() tronca gli array grandi: serve il contenuto completo
+        h.update(f"{valore.dtype}{valore.shape}".encode("utf-8"))
+        h.update(np.ascontiguousarray(valore).tobytes())
+    else:
+        h.update(repr(valore).encode("utf-8"))
+    h.update(b"|")
+
+
+def impronta(*args, **kwargs):
+    """Hash SHA-256 del contenuto degli argomenti (DataFrame e array NumPy inclusi)."""
+    h = hashlib.sha256()
+    for valore in args:
+        _aggiorna_impronta(h, valore)
+    for nome, valore in sorted(kwargs.items()):
+        h.update(nome.encode("utf-8"))
+        _aggiorna_impronta(h, valore)
+    return h.hexdigest()
+
+
+def versione_file(*percorsi):
+    """Impronta breve del contenuto dei file (moduli, dati sorgente) da cui dipende uno spazio.
+
+    Un file assente (es. sorgente CSV non distribuito) conta come vuoto.
+    """
+    h = hashlib.sha256()
+    for percorso in map(Path, percorsi):
+        h.update(percorso.read_bytes() if percorso.exists() else b"")
+        h.update(b"|")
+    return h.hexdigest()[:12]
+
+
+def _file(spazio, chiave):
+    return CARTELLA_CACHE / spazio / f"{chiave}.z"
+
+
+def leggi(spazio, chiave):
+    """Contenuto di una voce, o None se assente, illeggibile o con la cache disattiva."""
+    if not ATTIVA:
+        return None
+    percorso = _file(spazio, chiave)
+    try:
+        compresso = percorso.read_bytes()
+        # La data di modifica è l'ultimo uso: ordina lo sfratto LRU tra tutti i processi
+        os.utime(percorso)
+        return zlib.decompress(compresso)
+    except FileNotFoundError:
+        return None
+    except (OSError, zlib.error):
+        # Voce danneggiata (disco pieno, processo interrotto): si ricostruisce
+        percorso.unlink(missing_ok=True)
+        return None
+
+
+def scrivi(spazio, chiave, contenuto):
+    """Salva una voce in modo atomico; restituisce i byte occupati su disco."""
+    global _scritti_dalla_pulizia
+    if not ATTIVA:
+        return 0
+    percorso = _file(spazio, chiave)
+    compresso = zlib.compress(contenuto, COMPRESSIONE)
+    try:
+        percorso.parent.mkdir(parents=True, exist_ok=True)
+        temporaneo = percorso.with_name(f"{percorso.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temporaneo.write_bytes(compresso)
+        os.replace(temporaneo, percorso)
+    except OSError:
+        # La cache non deve mai far fallire una pagina: la voce verrà ricostruita
+        return 0
+    with _LOCK:
+        _scritti_dalla_pulizia += len(compresso)
+        da_pulire = _scritti_dalla_pulizia > LIMITE_BYTE // 10
+        if da_pulire:
+            _scritti_dalla_pulizia = 0
+    if da_pulire:
+        pulisci()
+    return len(compresso)
+
+
+def scrivi_in_background(spazio, chiave, produci):
+    """Come ``scrivi``, ma serializza (``produci()`` -> bytes) e scrive in un thread dedicato.
+
+    La serializzazione di una figura grande costa quanto la sua
+    costruzione: il rerun che l'ha costruita non deve aspettarla.
+    L'oggetto serializzato è condiviso e non viene modificato, per cui
+    può essere letto dal thread mentre la pagina lo usa.
+    """
+    global _scrittore
+    if not ATTIVA:
+        return
+    with _LOCK:
+        if _scrittore is None:
+            # Un solo thread: le scritture sono in ordine e il pool viene atteso all'uscita del processo
+            _scrittore = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache_disco")
+    _scrittore.submit(lambda: scrivi(spazio, chiave, produci()))
+
+
+def attendi_scritture():
+    """Attende le scritture in background accodate finora."""
+    if _scrittore is not None:
+        _scrittore.submit(lambda: None).result()
+
+
+def _voci():
+    # (ultimo uso, byte, percorso) di tutti i file della cache
+    if not CARTELLA_CACHE.exists():
+        return []
+    voci = []
+    for cartella in CARTELLA_CACHE.iterdir():
+        if not cartella.is_dir():
+            continue
+        for voce in os.scandir(cartella):
+            try:
+                stato = voce.stat()
+            except FileNotFoundError:
+                continue
+            voci.append((stato.st_mtime, stato.st_size, Path(voce.path)))
+    return voci
+
+
+def pulisci(limite=None):
+    """Sfratto LRU fino al 90% del limite; restituisce (voci, byte) rimasti."""
+    limite = LIMITE_BYTE if limite is None else limite
+    adesso = time.time()
+    voci = []
+    for ultimo_uso, dimensione, percorso in _voci():
+        if percorso.suffix == ".tmp":
+            if adesso - ultimo_uso > ETA_MASSIMA_TEMPORANEI:
+                percorso.unlink(missing_ok=True)
+            continue
+        voci.append((ultimo_uso, dimensione, percorso))
+    totale = sum(dimensione for _, dimensione, _ in voci)
+    rimaste = len(voci)
+    if totale > limite:
+        voci.sort()
+        for _, dimensione, percorso in voci:
+            if totale <= limite * 0.9:
+                break
+            # Un altro processo può averla già eliminata: conta comunque come liberata
+            percorso.unlink(missing_ok=True)
+            totale -= dimensione
+            rimaste -= 1
+    return rimaste, totale
+
+
+def elimina_spazi(prefisso, tranne):
+    """Rimuove gli spazi ``prefisso*`` diversi da ``tranne`` (versioni di codice superate)."""
+    if not CARTELLA_CACHE.exists():
+        return
+    for cartella in CARTELLA_CACHE.iterdir():
+        if cartella.is_dir() and cartella.name.startswith(prefisso) and cartella.name != tranne:
+            shutil.rmtree(cartella, ignore_errors=True)
+
+
+def svuota():
+    """Elimina l'intera cache su disco."""
+    shutil.rmtree(CARTELLA_CACHE, ignore_errors=True)
+
+
+def statistiche():
+    """Voci e byte compressi per spazio."""
+    spazi = {}
+    for _, dimensione, percorso in _voci():
+        voci, byte = spazi.get(percorso.parent.name, (0, 0))
+        spazi[percorso.parent.name] = (voci + 1, byte + dimensione)
+    return spazi
+
+
+def _frame_in_byte(df):
+    tabella = pa.Table.from_pandas(df)
+    sink = io.BytesIO()
+    with ipc.new_stream(sink, tabella.schema) as writer:
+        writer.write_table(tabella)
+    return sink.getvalue()
+
+
+def _frame_da_byte(contenuto):
+    return ipc.open_stream(contenuto).read_all().to_pandas()
+
+
+def frame_su_disco(spazio, versione):
+    """Decoratore che salva su disco il DataFrame restituito, indicizzato per argomenti.
+
+    ``versione`` identifica codice e dati sorgente: fa parte dello spazio,
+    così le voci di una versione superata non vengono più lette e
+    l'LRU le elimina. Un risultato None non viene salvato.
+    """
+    def decora(funzione):
+        firma = inspect.signature(funzione)
+        nome_spazio = f"{spazio}-{versione}"
+
+        @functools.wraps(funzione)
+        def wrapper(*args, **kwargs):
+            inizio = telemetria.orologio()
+            argomenti = firma.bind(*args, **kwargs)
+            argomenti.apply_defaults()
+            chiave = impronta(funzione.__name__, **argomenti.arguments)
+            contenuto = leggi(nome_spazio, chiave)
+            if contenuto is not None:
+                telemetria.registra("dati_disco", funzione.__name__, inizio)
+                return _frame_da_byte(contenuto)
+            df = funzione(*args, **kwargs)
+            if df is not None:
+                scrivi(nome_spazio, chiave, _frame_in_byte(df))
+            return df
+        return wrapper
+    return decora
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stato e manutenzione della cache su disco")
+    azione = parser.add_mutually_exclusive_group()
+    azione.add_argument("--pulisci", action="store_true", help="applica subito lo sfratto LRU al limite configurato")
+    azione.add_argument("--svuota", action="store_true", help="elimina tutte le voci")
+    args = parser.parse_args(argv)
+
+    if args.svuota:
+        svuota()
+    elif args.pulisci:
+        pulisci()
+    spazi = statistiche()
+    for spazio, (voci, byte) in sorted(spazi.items()):
+        print(f"{spazio:<32} {voci:>6} voci {byte / 1024:>10.1f} KB")
+    totale = sum(byte for _, byte in spazi.values())
+    print(f"{CARTELLA_CACHE}: {totale / 1024 / 1024:.1f} MB su {LIMITE_BYTE / 1024 / 1024:g} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
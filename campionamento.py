@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Riduzione lato server delle serie lunghe prima di costruire le figure.
+
+Un grafico largo qualche centinaio di pixel non può mostrare più di un
+paio di migliaia di punti distinti: inviare al browser l'intera serie
+(prezzi giornalieri di decenni, tick intraday, percorsi simulati) fa solo
+crescere il payload e il tempo di rendering. Qui le serie vengono ridotte
+a un numero fisso di punti conservandone la forma:
+
+- ``lttb`` (Largest-Triangle-Three-Buckets): per ogni bucket sceglie il
+  punto che forma il triangolo di area massima con il punto scelto nel
+  bucket precedente e con la media del successivo; mantiene picchi e
+  cambi di pendenza;
+- ``minmax``: minimo e massimo di ogni bucket, più veloce e adatto a
+  serie molto rumorose dove contano gli estremi.
+
+Le funzioni restituiscono posizioni, così il chiamante seleziona le righe
+del frame originale senza perdere dtype o indice.
+"""
+import numpy as np
+import pandas as pd
+
+# Punti massimi per figura dopo la riduzione (ordine di grandezza dei pixel di un grafico largo)
+MAX_PUNTI = 2000
+
+
+def _asse_numerico(indice):
+    # Le date diventano nanosecondi: all'algoritmo servono solo distanze relative
+    if isinstance(indice, pd.DatetimeIndex):
+        return indice.asi8.astype(np.float64)
+    return np.asarray(indice, dtype=np.float64)
+
+
+def indici_lttb(x, y, n_punti):
+    """Posizioni dei ``n_punti`` scelti con LTTB (primo e ultimo punto sempre inclusi)."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    if n_punti >= n or n_punti < 3:
+        return np.arange(n)
+
+    # n_punti - 2 bucket sui punti interni; le medie per bucket vengono dalle somme cumulate
+    bordi = np.linspace(1, n - 1, n_punti - 1).astype(np.int64)
+    larghezze = np.diff(bordi)
+    somme_x = np.concatenate(([0.0], np.cumsum(x)))
+    somme_y = np.concatenate(([0.0], np.cumsum(y)))
+    medie_x = np.append((somme_x[bordi[1:]] - somme_x[bordi[:-1]]) / larghezze, x[-1])
+    medie_y = np.append((somme_y[bordi[1:]] - somme_y[bordi[:-1]]) / larghezze, y[-1])
+
+    indici = np.empty(n_punti, dtype=np.int64)
+    indici[0], indici[-1] = 0, n - 1
+    a = 0
+    for i in range(n_punti - 2):
+        inizio, fine = bordi[i], bordi[i + 1]
+        cx, cy = medie_x[i + 1], medie_y[i + 1]
+        # Doppia area del triangolo (a, candidato, media del bucket successivo)
+        aree = np.abs((x[a] - cx) * (y[inizio:fine] - y[a]) - (x[a] - x[inizio:fine]) * (cy - y[a]))
+        a = inizio + int(np.argmax(aree))
+        indici[i + 1] = a
+    return indici
+
+
+def indici_minmax(y, n_punti):
+    """Posizioni di minimo e massimo per ``n_punti // 2`` bucket, in ordine crescente."""
+    y = np.asarray(y, dtype=np.float64)
+    n = y.size
+    n_bucket = n_punti // 2
+    if n_punti >= n or n_bucket < 1:
+        return np.arange(n)
+    passo = -(-n // n_bucket)
+    # Il riempimento ripete l'ultimo valore: non sposta minimi e massimi del bucket finale
+    blocchi = np.pad(y, (0, n_bucket * passo - n), mode='edge').reshape(n_bucket, passo)
+    base = np.arange(n_bucket) * passo
+    indici = np.concatenate((base + blocchi.argmin(axis=1), base + blocchi.argmax(axis=1), [0, n - 1]))
+    return np.unique(np.minimum(indici, n - 1))
+
+
+def riduci_serie(df, colonne=None, max_punti=MAX_PUNTI, metodo='lttb'):
+    """Righe di ``df`` sufficienti a disegnare ``colonne`` con al più ``max_punti`` punti.
+
+    Il budget è diviso tra le colonne e le posizioni scelte per ciascuna
+    vengono unite, così tutte le tracce condividono lo stesso asse x. I
+    valori mancanti non partecipano alla scelta. Un frame già più corto
+    del budget viene restituito così com'è.
+    """
+    if len(df) <= max_punti:
+        return df
+    colonne = list(df.columns if colonne is None else colonne)
+    budget = max(max_punti // len(colonne), 3)
+    x = _asse_numerico(df.index)
+    scelte = []
+    for colonna in colonne:
+        y = df[colonna].to_numpy(dtype=np.float64)
+        validi = np.flatnonzero(np.isfinite(y))
+        if metodo == 'lttb':
+            posizioni = indici_lttb(x[validi], y[validi], budget)
+        elif metodo == 'minmax':
+            posizioni = indici_minmax(y[validi], budget)
+        else:
+            raise ValueError(f"Metodo di riduzione sconosciuto: {metodo!r}")
+        scelte.append(validi[posizioni])
+    return df.iloc[np.unique(np.concatenate(scelte))]
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""Prova di carico di app.py con sessioni concorrenti su websocket.
+
+Avvia un'istanza locale dell'app (``streamlit run``) e vi collega N
+sessioni virtuali che parlano il protocollo del browser: ogni sessione
+apre il websocket ``/_stcore/stream``, chiede il primo rerun e poi ripete
+uno script di interazioni realistiche (grafici sotto la piega e capitoli
+dell'analisi aperti e chiusi, input del what-if, scenari di sensibilità e
+Monte Carlo) con una pausa di riflessione casuale tra un'azione e l'altra.
+Come nel browser, un controllo dentro una sezione fa rieseguire solo il
+suo fragment.
+
+Per ogni numero di sessioni vengono riportati:
+
+- rerun completati al secondo (throughput) ed errori;
+- latenza di rerun p50/p99, dall'invio dell'azione al messaggio di fine
+  script, e p50 del primo caricamento della pagina;
+- CPU del processo server (% di un core) e RSS di picco, con l'aumento di
+  RSS per sessione rispetto al server a riposo.
+
+Prima dei livelli una sessione non misurata carica la pagina, così import
+e cache a freddo del server non finiscono nel primo livello.
+
+Le sessioni di un livello restano collegate fino alla sua fine, quindi
+l'RSS include lo stato di sessione; il generatore gira in un solo thread
+asyncio, ma sulla stessa macchina sottrae comunque CPU al server: per
+misure di dimensionamento va eseguito su un'altra macchina con ``--url``
+(in quel caso CPU e RSS non sono disponibili).
+
+Uso::
+
+    python carico.py                               # 1, 5, 10, 20 sessioni, 30 s per livello
+    python carico.py --sessioni 1 10 25 50 --durata 60 --salva carico.json
+    python carico.py --interazioni whatif --pausa 0.5
+    python carico.py --url ws://host:8501 --sessioni 5 10
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.NumberInput_pb2 import NumberInput
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+CARTELLA = Path(__file__).parent
+APP = CARTELLA / "app.py"
+PERCORSO_WS = "/_stcore/stream"
+PERCORSO_SALUTE = "/_stcore/health"
+
+# Script di interazione: (chiave del widget in app.py, valori tra cui la sessione sceglie a caso).
+# Le chiavi dei grafici pigri sono grafico_<nome>, quelle dei capitoli pigro_<file>.
+INTERAZIONI = {
+    'lettore': [
+        ('grafico_fig_payout', (True,)),
+        ('grafico_fig_fcf_div', (True,)),
+        ('pigro_analisi_completa/01_storico_dividendi.md', (True,)),
+        ('grafico_fig_reset', (True,)),
+        ('pigro_analisi_completa/07_reset_regolatorio.md', (True,)),
+        ('grafico_fig_payout', (False,)),
+        ('pigro_analisi_completa/01_storico_dividendi.md', (False,)),
+        ('grafico_fig_screening', (True,)),
+        ('grafico_fig_fcf_div', (False,)),
+        ('grafico_fig_reset', (False,)),
+        ('pigro_analisi_completa/07_reset_regolatorio.md', (False,)),
+        ('grafico_fig_screening', (False,)),
+    ],
+    'whatif': [
+        ('grafico_whatif_payout', (True,)),
+        ('wi_payout', ([60.0], [70.0], [80.0], [90.0], [100.0])),
+        ('wi_dps_atteso', (0.25, 0.27, 0.30, 0.33)),
+        ('wi_prezzo', (3.5, 4.0, 4.5, 5.0)),
+        ('grafico_whatif_yield_comp', (True, False)),
+        ('wi_fcf', (150.0, 199.0, 250.0)),
+    ],
+    'scenari': [
+        ('grafico_fig_sensibilita', (True,)),
+        ('sens_prezzi', ([2.0, 6.0], [3.0, 5.0], [2.5, 7.5])),
+        # Indice tra le risoluzioni [100, 250, 500, 1000, 2000]
+        ('sens_risoluzione', ([1.0], [2.0], [3.0])),
+        ('mc_attiva', (True,)),
+        ('grafico_fig_proj', (True,)),
+        ('mc_attiva', (False,)),
+        ('grafico_fig_sensibilita', (False,)),
+        ('grafico_fig_reset', (True,)),
+        ('rp4_traffico', ([-5.0], [2.0], [5.0])),
+        ('rp4_wacc', ([6.0], [6.7], [7.5])),
+        ('grafico_fig_reset', (False,)),
+        ('grafico_fig_valutazione', (True,)),
+        ('val_ke', ([6.0, 12.0], [7.0, 10.0], [5.0, 14.0])),
+        # Indice tra le risoluzioni [50, 100, 200, 500, 1000]
+        ('val_risoluzione', ([3.0], [4.0], [2.0])),
+        ('val_transizione', ([0.0], [5.0], [10.0])),
+        ('grafico_fig_valutazione', (False,)),
+        ('str_attiva', (True,)),
+        ('grafico_fig_stress', (True,)),
+        ('str_profondita', ([10.0, 40.0], [5.0, 70.0], [30.0, 90.0])),
+        ('str_risparmio', ([0.0], [15.0], [30.0])),
+        ('grafico_fig_stress', (False,)),
+        ('str_attiva', (False,)),
+    ],
+}
+
+TIPI_WIDGET = ('checkbox', 'number_input', 'slider')
+FINE_RIUSCITA = (ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY)
+
+
+class SessioneVirtuale:
+    """Una scheda del browser: websocket, widget visti e loro stato corrente."""
+
+    def __init__(self, url):
+        self.url = url
+        self.widget = {}
+        self.stati = {}
+        self._ws = None
+
+    async def connetti(self):
+        self._ws = await websocket_connect(self.url, subprotocols=["streamlit"], max_message_size=256 * 1024 * 1024)
+
+    def chiudi(self):
+        if self._ws is not None:
+            self._ws.close()
+
+    def _registra(self, messaggio):
+        # I widget renderizzati: chiave utente -> (id, tipo, fragment, proto)
+        if messaggio.WhichOneof('type') != 'delta' or messaggio.delta.WhichOneof('type') != 'new_element':
+            return
+        elemento = messaggio.delta.new_element
+        tipo = elemento.WhichOneof('type')
+        if tipo in TIPI_WIDGET:
+            proto = getattr(elemento, tipo)
+            chiave = proto.id.split('-', 2)[-1]
+            self.widget[chiave] = (proto.id, tipo, messaggio.delta.fragment_id, proto)
+
+    async def rerun(self, fragment_id=""):
+        """Invia un rerun con lo stato corrente dei widget; restituisce (secondi, byte ricevuti)."""
+        richiesta = BackMsg()
+        richiesta.rerun_script.widget_states.widgets.extend(self.stati.values())
+        richiesta.rerun_script.fragment_id = fragment_id
+        inizio = time.perf_counter()
+        await self._ws.write_message(richiesta.SerializeToString(), binary=True)
+        ricevuti = 0
+        while True:
+            dati = await self._ws.read_message()
+            if dati is None:
+                raise ConnectionError("websocket chiuso dal server")
+            ricevuti += len(dati)
+            messaggio = ForwardMsg.FromString(dati)
+            self._registra(messaggio)
+            if messaggio.WhichOneof('type') == 'script_finished':
+                if messaggio.script_finished in FINE_RIUSCITA:
+                    return time.perf_counter() - inizio, ricevuti
+                if messaggio.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("errore di compilazione dello script")
+
+    async def interagisci(self, chiave, valore):
+        """Cambia un widget e attende il rerun; None se il widget non è sulla pagina."""
+        if chiave not in self.widget:
+            return None
+        id_widget, tipo, fragment_id, proto = self.widget[chiave]
+        stato = WidgetState(id=id_widget)
+        if tipo == 'checkbox':
+            stato.bool_value = valore
+        elif tipo == 'number_input' and proto.data_type == NumberInput.INT:
+            stato.int_value = int(valore)
+        elif tipo == 'number_input':
+            stato.double_value = valore
+        else:
+            stato.double_array_value.data.extend(valore)
+        self.stati[id_widget] = stato
+        return await self.rerun(fragment_id)
+
+
+class Risorse:
+    """CPU e RSS di un processo da /proc (Linux), campionati in background."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self._tick = os.sysconf("SC_CLK_TCK")
+
+    def cpu_secondi(self):
+        campi = Path(f"/proc/{self.pid}/stat").read_text().rsplit(")", 1)[1].split()
+        # utime e stime sono i campi 14 e 15 di /proc/<pid>/stat (11 e 12 dopo il nome)
+        return (int(campi[11]) + int(campi[12])) / self._tick
+
+    def rss_mb(self):
+        for riga in Path(f"/proc/{self.pid}/status").read_text().splitlines():
+            if riga.startswith("VmRSS:"):
+                return int(riga.split()[1]) / 1024
+        return 0.0
+
+    async def campiona(self, picco, intervallo=0.25):
+        while True:
+            picco[0] = max(picco[0], self.rss_mb())
+            await asyncio.sleep(intervallo)
+
+
+async def _utente(url, interazioni, rng, fine, pausa, esito):
+    sessione = SessioneVirtuale(url)
+    try:
+        await sessione.connetti()
+        secondi, _ = await sessione.rerun()
+        esito['caricamenti'].append(secondi)
+        for chiave, valori in itertools.cycle(interazioni):
+            # Pausa di riflessione tra 0.5x e 1.5x quella media
+            await asyncio.sleep(pausa * rng.uniform(0.5, 1.5))
+            if time.perf_counter() >= fine:
+                break
+            risultato = await sessione.interagisci(chiave, rng.choice(valori))
+            if risultato is None:
+                esito['saltate'] += 1
+            else:
+                esito['rerun'].append(risultato[0])
+                esito['byte'] += risultato[1]
+    except Exception as errore:  # una sessione caduta è un dato della prova, non la interrompe
+        esito['errori'].append(f"{type(errore).__name__}: {errore}")
+    finally:
+        sessione.chiudi()
+
+
+async def riscalda(url):
+    """Un caricamento non misurato: import e cache del server non pesano sul primo livello."""
+    sessione = SessioneVirtuale(url)
+    await sessione.connetti()
+    try:
+        await sessione.rerun()
+    finally:
+        sessione.chiudi()
+
+
+async def misura_livello(url, sessioni, durata, pausa, interazioni, seed=0, risorse=None):
+    """Una prova con ``sessioni`` utenti concorrenti per ``durata`` secondi."""
+    esito = {'caricamenti': [], 'rerun': [], 'byte': 0, 'saltate': 0, 'errori': []}
+    nomi = list(INTERAZIONI) if interazioni == 'misto' else [interazioni]
+    picco = [risorse.rss_mb() if risorse else 0.0]
+    rss_riposo, cpu_inizio = (risorse.rss_mb(), risorse.cpu_secondi()) if risorse else (None, None)
+    campionatore = asyncio.ensure_future(risorse.campiona(picco)) if risorse else None
+
+    inizio = time.perf_counter()
+    fine = inizio + durata
+    utenti = []
+    for i in range(sessioni):
+        rng = random.Random(seed * 10_000 + i)
+        utenti.append(_utente(url, INTERAZIONI[nomi[i % len(nomi)]], rng, fine, pausa, esito))
+        # Arrivi distribuiti sulla prima pausa: niente picco artificiale di caricamenti simultanei
+        await asyncio.sleep(pausa / max(sessioni, 1))
+    await asyncio.gather(*utenti)
+    trascorso = time.perf_counter() - inizio
+
+    livello = {
+        'sessioni': sessioni,
+        'secondi': round(trascorso, 1),
+        'rerun': len(esito['rerun']),
+        'rerun_al_secondo': round(len(esito['rerun']) / trascorso, 2),
+        'kb_al_secondo': round(esito['byte'] / 1024 / trascorso, 1),
+        'azioni_saltate': esito['saltate'],
+        'errori': len(esito['errori']),
+    }
+    if esito['rerun']:
+        p50, p99 = np.percentile(esito['rerun'], [50, 99]) * 1000
+        livello.update({'p50_ms': round(float(p50), 1), 'p99_ms': round(float(p99), 1)})
+    if esito['caricamenti']:
+        livello['caricamento_p50_ms'] = round(float(np.median(esito['caricamenti'])) * 1000, 1)
+    if risorse:
+        campionatore.cancel()
+        livello.update({
+            'cpu_percento': round((risorse.cpu_secondi() - cpu_inizio) / trascorso * 100, 1),
+            'rss_picco_mb': round(picco[0], 1),
+            'rss_per_sessione_mb': round((picco[0] - rss_riposo) / sessioni, 2),
+        })
+    if esito['errori']:
+        livello['primi_errori'] = esito['errori'][:3]
+    return livello
+
+
+def _porta_libera():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def avvia_server(porta, ambiente=None, attesa=120):
+    """Avvia ``streamlit run app.py`` in un processo figlio e attende che risponda."""
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(APP),
+         "--server.headless=true", f"--server.port={porta}", "--server.address=127.0.0.1",
+         "--server.fileWatcherType=none", "--browser.gatherUsageStats=false"],
+        cwd=CARTELLA, env={**os.environ, **(ambiente or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    scadenza = time.monotonic() + attesa
+    while time.monotonic() < scadenza:
+        if processo.poll() is not None:
+            raise RuntimeError(f"il server è terminato all'avvio (codice {processo.returncode})")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{porta}{PERCORSO_SALUTE}", timeout=2) as risposta:
+                if risposta.status == 200:
+                    return processo
+        except OSError:
+            time.sleep(0.5)
+    processo.terminate()
+    raise TimeoutError(f"il server non risponde dopo {attesa} s")
+
+
+def capacita(livelli, obiettivo_p99):
+    """Massimo numero di sessioni misurato con p99 entro l'obiettivo e nessun errore."""
+    entro = [voce['sessioni'] for voce in livelli
+             if voce.get('p99_ms', float('inf')) <= obiettivo_p99 and not voce['errori']]
+    return max(entro, default=0)
+
+
+def stampa(livelli):
+    print(f"{'sessioni':>8}{'rerun/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'carica ms':>11}"
+          f"{'errori':>8}{'CPU %':>8}{'RSS MB':>9}{'MB/sess':>9}")
+    for voce in livelli:
+        print(f"{voce['sessioni']:>8}{voce['rerun_al_secondo']:>9.2f}{voce.get('p50_ms', 0):>9.1f}"
+              f"{voce.get('p99_ms', 0):>9.1f}{voce.get('caricamento_p50_ms', 0):>11.1f}{voce['errori']:>8}"
+              f"{voce.get('cpu_percento', float('nan')):>8.1f}{voce.get('rss_picco_mb', float('nan')):>9.1f}"
+              f"{voce.get('rss_per_sessione_mb', float('nan')):>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prova di carico di app.py con sessioni websocket concorrenti")
+    parser.add_argument("--sessioni", type=int, nargs="+", default=[1, 5, 10, 20], help="livelli di sessioni concorrenti")
+    parser.add_argument("--durata", type=float, default=30.0, help="secondi per livello (default 30)")
+    parser.add_argument("--pausa", type=float, default=2.0, help="pausa media tra due azioni di una sessione (default 2 s)")
+    parser.add_argument("--interazioni", choices=['misto', *INTERAZIONI], default='misto',
+                        help="script di interazione (misto: a rotazione tra le sessioni)")
+    parser.add_argument("--obiettivo-p99", type=float, default=1000.0, help="p99 accettabile in ms per la stima di capacità")
+    parser.add_argument("--url", help="websocket di un'istanza già avviata (es. ws://host:8501); default: avvia l'app in locale")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--salva", type=Path, help="scrive i risultati in JSON")
+    args = parser.parse_args(argv)
+
+    processo = risorse = None
+    if args.url:
+        url = args.url.rstrip("/") + PERCORSO_WS
+    else:
+        porta = _porta_libera()
+        processo = avvia_server(porta)
+        risorse = Risorse(processo.pid)
+        url = f"ws://127.0.0.1:{porta}{PERCORSO_WS}"
+    try:
+        asyncio.run(riscalda(url))
+        livelli = []
+        for sessioni in args.sessioni:
+            print(f"... {sessioni} sessioni per {args.durata:.0f} s", file=sys.stderr, flush=True)
+            livelli.append(asyncio.run(misura_livello(
+                url, sessioni, args.durata, args.pausa, args.interazioni, args.seed, risorse
+            )))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    stampa(livelli)
+    massimo = capacita(livelli, args.obiettivo_p99)
+    print(f"\nSessioni sostenute con p99 <= {args.obiettivo_p99:.0f} ms: {massimo or 'nessun livello'}")
+    if args.salva:
+        risultati = {'durata_s': args.durata, 'pausa_s': args.pausa, 'interazioni': args.interazioni,
+                     'obiettivo_p99_ms': args.obiettivo_p99, 'capacita_sessioni': massimo, 'livelli': livelli}
+        args.salva.write_text(json.dumps(risultati, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,717 @@
+# -*- coding: utf-8 -*-
+"""Livello dati dell'analisi dividendi ENAV.
+
+Ogni DataFrame usato dall'app viene costruito da un builder memoizzato con
+``st.cache_resource``: la chiave di cache e' l'hash degli argomenti (la
+``versione`` dei dati), per cui a cache calda un rerun non costruisce alcun
+DataFrame e tutte le sessioni ricevono lo stesso oggetto condiviso.
+
+I dati finanziari per società e anno provengono dall'archivio colonnare
+(vedi archivio.py); qui vengono solo rimodellati nei frame usati dai grafici.
+
+I frame restituiti vanno trattati in sola lettura. Con il copy-on-write di
+pandas attivo, qualsiasi modifica fatta dal chiamante produce una copia
+locale e non altera l'oggetto in cache; gli array NumPy condivisi sono
+marcati non scrivibili. Anche il modello what-if di base è condiviso: le
+sessioni ne usano una derivazione e copiano solo ciò che l'utente cambia.
+
+I frame costosi (simulazione Monte Carlo, yield trailing dallo storico
+prezzi) sono salvati anche nella cache su disco condivisa tra i processi
+(vedi cache_disco.py), così un worker nuovo o un riavvio non li ricalcola.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import archivio
+import cache_disco
+import metriche
+import prezzi
+import regolazione
+import rendimenti
+import simulazione
+import telemetria
+import valutazione
+import whatif
+
+# screening e stress sono importati nei builder che li usano: servono solo a
+# sezioni pigre o su richiesta e non devono pesare sull'avvio a freddo
+
+# I frame in cache sono condivisi: ogni scrittura deve generare una copia
+pd.set_option("mode.copy_on_write", True)
+
+# Incrementare quando cambiano i dati sorgente: invalida automaticamente la cache
+VERSIONE_DATI = "2025.1"
+
+TICKER = "ENAV.MI"
+
+# Moduli che calcolano i frame: la stessa lista vale per la cache su disco e per i report
+MODULI_FRAME = (
+    __file__, archivio.__file__, metriche.__file__, prezzi.__file__, regolazione.__file__, rendimenti.__file__, simulazione.__file__,
+)
+
+# Frame su disco: validi finché non cambiano il codice che li calcola o i dati sorgente
+VERSIONE_FRAME = cache_disco.versione_file(
+    *MODULI_FRAME, archivio.SORGENTE_CSV, archivio.CARTELLA_ARCHIVIO / "anagrafica.csv",
+)
+SPAZI_FRAME = ("simulazione", "yield_trailing")
+
+# Primo anno del periodo regolatorio RP4 (reset dell'EBITDA)
+ANNO_RESET = regolazione.ANNO_BASE + 1
+
+# Righe della tabella finanziaria riassuntiva: (metrica in archivio, etichetta)
+METRICHE_TABELLA = [
+    ('ricavi', 'Ricavi Totali (€M)'),
+    ('ebitda', 'EBITDA (€M)'),
+    ('utile_netto', 'Utile Netto (€M)'),
+    ('eps', 'EPS Diluito (€)'),
+    ('cfo', 'Cash Flow Operativo (CFO, €M)'),
+    ('capex', 'Capex (€M)'),
+    ('fcf', 'Free Cash Flow (FCF, €M)'),
+    ('leva', 'Debito Netto / EBITDA (Leva)'),
+    ('dps', 'Dividendo per Azione (DPS, €)'),
+]
+
+# Unità delle metriche (default €M): guidano la formattazione in tabelle.py
+UNITA_METRICHE = {'eps': '€', 'dps': '€', 'leva': 'x'}
+
+# Qualificatori della leva (nota in archivio): cassa netta (nessun valore) o valore massimo
+QUALIFICATORI_LEVA = ['cassa_netta', 'inferiore']
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_archivio(versione=VERSIONE_DATI):
+    """Tabella Arrow memory-mapped con i dati di tutte le società."""
+    return archivio.apri_archivio()
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_serie(societa=TICKER, versione=VERSIONE_DATI):
+    """Dati di una società in formato lungo (anno, metrica, valore, fonte, nota)."""
+    return archivio.estrai_societa(carica_archivio(versione), societa)
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_anagrafica(versione=VERSIONE_DATI):
+    """Anagrafica degli emittenti (nome, settore, prezzo di riferimento, politica di payout)."""
+    return pd.read_csv(archivio.CARTELLA_ARCHIVIO / "anagrafica.csv").set_index('societa')
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def societa_disponibili(versione=VERSIONE_DATI):
+    """Ticker presenti sia nell'archivio sia nell'anagrafica."""
+    in_archivio = archivio.societa_disponibili(carica_archivio(versione))
+    return [t for t in in_archivio if t in carica_anagrafica(versione).index]
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_universo(versione=VERSIONE_DATI):
+    """Archivio intero in formato lungo, con società, metrica e fonte categoriche.
+
+    Materializzato una sola volta e condiviso dalle pipeline sull'universo.
+    """
+    return archivio.in_pandas(carica_archivio(versione), categorie=True)
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_metriche_universo(versione=VERSIONE_DATI):
+    """Metriche (payout, copertura, dividendi pagati) per tutte le coppie società × anno."""
+    df_lungo = carica_universo(versione)
+    return metriche.calcola_metriche(metriche.tabella_larga(df_lungo))
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_kpi_universo(versione=VERSIONE_DATI):
+    """Indicatori chiave del dividendo per tutte le società, in un solo passaggio."""
+    df_lungo = carica_universo(versione)
+    return metriche.kpi_dividendo(df_lungo, carica_anagrafica(versione))
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_indice_screening(versione=VERSIONE_DATI):
+    """Indice ordinato dello screening su tutte le coppie società × esercizio (vedi screening.py)."""
+    import screening
+
+    df_lungo = carica_universo(versione)
+    tabella = screening.tabella_screening(df_lungo, metriche.tabella_larga(df_lungo), carica_anagrafica(versione))
+    return screening.IndiceScreening(tabella)
+
+
+def carica_kpi(societa=TICKER, versione=VERSIONE_DATI):
+    """Indicatori chiave di una società, uniti alla sua anagrafica."""
+    kpi = carica_kpi_universo(versione).loc[societa]
+    return pd.concat([carica_anagrafica(versione).loc[societa], kpi.drop('prezzo_riferimento')])
+
+
+def _metrica(df_lungo, metrica, anni=None):
+    righe = df_lungo[df_lungo['metrica'] == metrica].set_index('anno').sort_index()
+    if anni is not None:
+        righe = righe.loc[righe.index.isin(anni)]
+    return righe
+
+
+def _etichetta_anno(anno, fonte):
+    # Gli anni non consuntivi sono marcati con "E" (stima)
+    return f"{anno}E" if fonte in ('Stima', 'Piano') else str(anno)
+
+
+def _anni_consuntivo(df_lungo):
+    # Anni con conto economico completo (storici e stima dell'anno in corso)
+    return _metrica(df_lungo, 'ricavi').index.tolist()
+
+
+def _categorie(valori, categorie=None):
+    # Etichette ripetute (tipo, fase, nota) come categorical: un codice intero per riga
+    return pd.Categorical(valori, categories=categorie)
+
+
+def _importo(testo):
+    """Importo in €M da un valore numerico o da un testo come '€813M', '€1 Mld', 'N/A'."""
+    if isinstance(testo, (int, float)):
+        return float(testo)
+    testo = testo.replace('€', '').replace(' ', '')
+    if testo.upper() == 'N/A':
+        return np.nan
+    if testo.endswith('Mld'):
+        return float(testo[:-3]) * 1000
+    return float(testo.removesuffix('M'))
+
+
+def _variazione(testo):
+    """(valore, tipo, nota) da un testo come '+3% (+13% dal 2025)', '€200M/anno medio', '-0.8x'."""
+    testo, _, nota = testo.partition(' (')
+    if testo.endswith('%'):
+        return float(testo[:-1]), 'CAGR', nota.rstrip(')')
+    if testo.endswith('x'):
+        return float(testo[:-1]), 'Differenza', nota.rstrip(')')
+    return _importo(testo.split('/')[0]), 'Media annua', nota.rstrip(')')
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_dps(societa=TICKER, versione=VERSIONE_DATI):
+    # Dati storici Dividendo Per Azione (DPS), incluso il proposto
+    serie = carica_serie(societa, versione)
+    dps = _metrica(serie, 'dps', _anni_consuntivo(serie))
+    return pd.DataFrame({
+        'Anno Esercizio': dps.index.astype(int),
+        'DPS (€)': dps['valore'].to_numpy(),
+        'Nota': _categorie(dps['nota'].fillna('')),
+        'Tipo': _categorie(['Proposto' if f == 'Proposto' else 'Storico' for f in dps['fonte']], ['Storico', 'Proposto'])
+    })
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_fin(societa=TICKER, versione=VERSIONE_DATI):
+    """Dati finanziari chiave in formato lungo tipizzato, una riga per metrica e anno.
+
+    Colonne: ``Metrica`` (categorical ordinato come METRICHE_TABELLA),
+    ``Anno`` (int16), ``Stima`` (anno non consuntivo), ``Valore``
+    (float32, NaN se mancante), ``Unità`` e ``Qualificatore`` della leva
+    (``cassa_netta``, ``inferiore``). Etichette e formati di
+    visualizzazione sono applicati solo al rendering (vedi tabelle.py).
+    """
+    serie = carica_serie(societa, versione)
+    anni = _anni_consuntivo(serie)
+    stimati = _metrica(serie, 'ricavi')['fonte'].isin(['Stima', 'Piano'])
+    metriche_tabella = [metrica for metrica, _ in METRICHE_TABELLA]
+    righe = serie[serie['metrica'].isin(metriche_tabella) & serie['anno'].isin(anni)]
+    righe = righe.assign(metrica=pd.Categorical(righe['metrica'], categories=metriche_tabella, ordered=True))
+    righe = righe.sort_values(['metrica', 'anno'])
+    return pd.DataFrame({
+        'Metrica': righe['metrica'].cat.rename_categories(dict(METRICHE_TABELLA)).array,
+        'Anno': righe['anno'].to_numpy(dtype=np.int16),
+        'Stima': stimati.reindex(righe['anno']).to_numpy(),
+        'Valore': righe['valore'].to_numpy(dtype=np.float32),
+        'Unità': _categorie(righe['metrica'].map(lambda m: UNITA_METRICHE.get(m, '€M')).astype(str), ['€M', '€', 'x']),
+        'Qualificatore': _categorie(righe['nota'].where(righe['metrica'] == 'leva'), QUALIFICATORI_LEVA),
+    })
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_fin_clean(societa=TICKER, versione=VERSIONE_DATI):
+    # DataFrame più pulito per grafici finanziari
+    serie = carica_serie(societa, versione)
+    anni = _anni_consuntivo(serie)
+    ricavi = _metrica(serie, 'ricavi')
+    return pd.DataFrame({
+        'Anno': [_etichetta_anno(a, f) for a, f in ricavi['fonte'].items()],
+        'Ricavi (€M)': ricavi['valore'].to_numpy(),
+        'EBITDA (€M)': _metrica(serie, 'ebitda', anni)['valore'].to_numpy(),
+        'Utile Netto (€M)': _metrica(serie, 'utile_netto', anni)['valore'].to_numpy(),
+        'EPS (€)': _metrica(serie, 'eps', anni)['valore'].to_numpy(),
+        'FCF (€M)': _metrica(serie, 'fcf', anni)['valore'].to_numpy(),
+        'DPS (€)': _metrica(serie, 'dps', anni)['valore'].to_numpy()
+    })
+
+
+def _metriche_societa(societa, versione, anni):
+    return carica_metriche_universo(versione).loc[societa].loc[anni]
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_payout(societa=TICKER, versione=VERSIONE_DATI):
+    # Payout ratio (DPS/EPS e DPS/FCF), dalla pipeline di metriche dell'universo
+    m = _metriche_societa(societa, versione, _anni_consuntivo(carica_serie(societa, versione)))
+    return pd.DataFrame({
+        'Anno': m.index.astype(int),
+        'EPS (€)': m['eps'].to_numpy(),
+        'DPS (€)': m['dps'].to_numpy(),
+        'FCF per Share (€)': m['fcf_per_azione'].to_numpy(),
+        'Payout Ratio (% di EPS)': m['payout_eps'].to_numpy(),
+        'Payout Ratio (% di FCF)': m['payout_fcf'].to_numpy()  # 0 con FCF negativo o nullo
+    })
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_fcf_div(societa=TICKER, versione=VERSIONE_DATI, anno_inizio=2021):
+    # Dividendi totali pagati (DPS * numero azioni) e copertura FCF, dalla ripresa post-Covid
+    anni = [a for a in _anni_consuntivo(carica_serie(societa, versione)) if a >= anno_inizio]
+    m = _metriche_societa(societa, versione, anni)
+    return pd.DataFrame({
+        'Anno': m.index.astype(int),
+        'FCF (€M)': m['fcf'].to_numpy(),
+        'Dividendi Totali Pagati (€M)': m['dividendi_pagati'].to_numpy(),
+        'Copertura FCF': m['copertura_fcf'].to_numpy()  # solo per gli anni con FCF positivo
+    })
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_dps_projection(societa=TICKER, versione=VERSIONE_DATI):
+    # Proiezione dividendi futuri basata sul piano industriale
+    dps = _metrica(carica_serie(societa, versione), 'dps')
+    return pd.DataFrame({
+        'Anno': dps.index.astype(int),
+        'DPS (€)': dps['valore'].to_numpy(),
+        'Nota': _categorie(dps['nota'].fillna('')),
+        'Tipo': _categorie(dps['fonte'], ['Storico', 'Proposto', 'Piano'])
+    })
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_yield(societa=TICKER, versione=VERSIONE_DATI):
+    # Dati Yield annuale
+    dy = _metrica(carica_serie(societa, versione), 'dividend_yield')
+    return pd.DataFrame({
+        'Anno': [_etichetta_anno(a, f) for a, f in dy['fonte'].items()],
+        'Dividend Yield (%)': dy['valore'].to_numpy(),
+    })
+
+
+@st.cache_resource(show_spinner="Simulazione Monte Carlo in corso...", max_entries=32)
+@telemetria.cronometra("dati")
+@cache_disco.frame_su_disco(SPAZI_FRAME[0], VERSIONE_FRAME)
+def carica_simulazione_dps(societa=TICKER, parametri=(), n_percorsi=1_000_000, seed=0, versione=VERSIONE_DATI):
+    """Bande percentili del DPS simulato, in cache per società e set di parametri.
+
+    ``parametri`` è una tupla ordinata di coppie (nome, valore) che
+    sovrascrive simulazione.PARAMETRI_DEFAULT.
+    """
+    parametri = dict(parametri)
+    serie = carica_serie(societa, versione)
+    azioni = _metrica(serie, 'azioni_mln')['valore'].iloc[-1]
+    payout = parametri.get('payout', simulazione.PARAMETRI_DEFAULT['payout'])
+    fcf_base = simulazione.fcf_di_piano(carica_dps_projection(societa, versione), azioni, payout)
+    dps_iniziale = carica_kpi(societa, versione)['dps_atteso']
+    return simulazione.simula_dps(fcf_base, azioni, dps_iniziale, n_percorsi, seed, **parametri)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+@telemetria.cronometra("dati")
+def carica_griglia_rendimenti(prezzo_min, prezzo_max, n_prezzi, dps_min, dps_max, n_dps):
+    """Griglia (prezzi, dps, yield %) in cache per specifica della griglia."""
+    prezzi = np.linspace(prezzo_min, prezzo_max, n_prezzi, dtype=np.float32)
+    dps = np.linspace(dps_min, dps_max, n_dps, dtype=np.float32)
+    griglia = prezzi, dps, metriche.griglia_rendimenti(prezzi, dps)
+    # Condivisi tra le sessioni: una scrittura accidentale solleva un errore invece di propagarsi
+    for array in griglia:
+        array.flags.writeable = False
+    return griglia
+
+
+def flussi_valutazione(societa=TICKER, metodo='DDM', versione=VERSIONE_DATI):
+    """Flussi espliciti per azione della valutazione, dal DPS proposto all'ultimo anno di piano.
+
+    DDM: il DPS proposto e di piano. FCFE: il FCF per azione stimato
+    nell'anno del DPS proposto e, negli anni di piano, il FCF implicito nel
+    DPS e nella politica di payout (lo stesso della simulazione Monte Carlo).
+    """
+    proiezione = carica_dps_projection(societa, versione)
+    espliciti = proiezione[proiezione['Tipo'] != 'Storico']
+    if metodo == 'DDM':
+        return pd.Series(espliciti['DPS (€)'].to_numpy(), index=espliciti['Anno'].to_numpy())
+    if metodo != 'FCFE':
+        raise ValueError(f"Metodo di valutazione sconosciuto: {metodo!r}")
+    serie = carica_serie(societa, versione)
+    azioni = _metrica(serie, 'azioni_mln')['valore'].iloc[-1]
+    kpi = carica_kpi(societa, versione)
+    piano = simulazione.fcf_di_piano(proiezione, azioni, kpi['quota_payout']) / azioni
+    proposti = espliciti.loc[espliciti['Tipo'] == 'Proposto', 'Anno']
+    stimati = _metrica(serie, 'fcf_per_azione', proposti.tolist())['valore']
+    return pd.concat([stimati, piano]).sort_index()
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+@telemetria.cronometra("dati")
+def carica_griglia_valutazione(societa, metodo, ke_min, ke_max, n_ke, g_min, g_max, n_g,
+                               anni_transizione=valutazione.ANNI_TRANSIZIONE, versione=VERSIONE_DATI):
+    """Griglia (ke, g, valore per azione) in cache per società, metodo e specifica della griglia.
+
+    I tassi sono decimali; il valore è una matrice float32 ``n_g × n_ke``.
+    """
+    ke = np.linspace(ke_min, ke_max, n_ke)
+    g = np.linspace(g_min, g_max, n_g)
+    valori = valutazione.valori_multistadio(flussi_valutazione(societa, metodo, versione), ke, g, anni_transizione)
+    griglia = ke.astype(np.float32), g.astype(np.float32), valori.astype(np.float32)
+    # Condivisi tra le sessioni: una scrittura accidentale solleva un errore invece di propagarsi
+    for array in griglia:
+        array.flags.writeable = False
+    return griglia
+
+
+@st.cache_resource(show_spinner="Lettura dello storico prezzi...", max_entries=8)
+@telemetria.cronometra("dati")
+@cache_disco.frame_su_disco(SPAZI_FRAME[1], VERSIONE_FRAME)
+def _leggi_yield_trailing(societa, percorso, mtime, versione):
+    df_dps = carica_dps(societa, versione)
+    return prezzi.carica_yield_trailing(societa, percorso, _stacchi(societa, versione), rendimenti.inizio_copertura(df_dps))
+
+
+def _stacchi(societa, versione):
+    """Dividendi per data di stacco dal DPS in archivio (rendimenti.stacchi), comuni a yield trailing e TSR."""
+    return rendimenti.stacchi(carica_dps(societa, versione), prezzi.carica_dividendi(societa))
+
+
+def _mtime_prezzi(percorso):
+    return percorso.stat().st_mtime_ns, prezzi.FILE_DIVIDENDI.stat().st_mtime_ns
+
+
+def carica_yield_trailing(societa=TICKER, versione=VERSIONE_DATI):
+    """Dividend yield trailing 12 mesi giornaliero; None se manca il file prezzi.
+
+    I dividendi sono quelli del DPS in archivio per data di stacco, come
+    nel backtest del TSR; prima di un anno completo di storico il rendimento
+    è NaN. La cache è legata anche alla data di modifica del file prezzi e
+    dei dividendi, quindi un nuovo export viene riletto automaticamente.
+    """
+    percorso = prezzi.file_prezzi(societa)
+    if not percorso.exists():
+        return None
+    return _leggi_yield_trailing(societa, str(percorso), _mtime_prezzi(percorso), versione)
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+@telemetria.cronometra("dati")
+def _calcola_tsr(societa, ritenuta, anni_min, anni_max, n_durate, passo, mtime, versione):
+    percorso = prezzi.file_prezzi(societa)
+    chiusure = _leggi_yield_trailing(societa, str(percorso), mtime, versione)['Prezzo (€)']
+    df_dps = carica_dps(societa, versione)
+    chiusure = chiusure[chiusure.index >= rendimenti.inizio_copertura(df_dps)]
+    dividendi = _stacchi(societa, versione)
+    anni = np.linspace(anni_min, anni_max, n_durate)
+    risultato = rendimenti.tsr(chiusure, dividendi, anni, ritenuta, passo)
+    # Condivisi tra le sessioni: una scrittura accidentale solleva un errore invece di propagarsi
+    for array in risultato:
+        array.flags.writeable = False
+    return risultato
+
+
+def carica_tsr(societa=TICKER, ritenuta=0.0, anni_min=1.0, anni_max=8.0, n_durate=29, passo=1, versione=VERSIONE_DATI):
+    """Backtest del TSR annuo (ingressi, anni, reinvestito, incassato); None se manca il file prezzi.
+
+    Combina le chiusure giornaliere con lo storico del DPS di
+    ``carica_dps`` (2020 senza dividendo incluso), vedi rendimenti.tsr.
+    """
+    percorso = prezzi.file_prezzi(societa)
+    if not percorso.exists():
+        return None
+    return _calcola_tsr(societa, ritenuta, anni_min, anni_max, n_durate, passo, _mtime_prezzi(percorso), versione)
+
+
+def _fase_reset(anno):
+    if anno < ANNO_RESET:
+        return 'Attuale'
+    return 'Post-Reset' if anno == ANNO_RESET else 'Recupero'
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+@telemetria.cronometra("dati")
+def carica_ebitda_reset(societa=TICKER, versione=VERSIONE_DATI, anno_inizio=2023, parametri=()):
+    """EBITDA attorno al reset RP4: consuntivi e Piano Industriale, o il modello di regolazione.py.
+
+    Senza ``parametri`` gli anni di piano sono i valori del Piano
+    Industriale in archivio: il modello a default li approssima soltanto
+    (vedi i residui di calibrazione in regolazione.py). ``parametri`` è una
+    tupla ordinata di coppie (nome, valore) che sovrascrive
+    regolazione.PARAMETRI_DEFAULT; il modello parte dall'EBITDA in archivio
+    dell'ultimo anno prima del reset. ``EBITDA Piano (€M)`` è il valore
+    del Piano Industriale, per confronto.
+    """
+    ebitda = _metrica(carica_serie(societa, versione), 'ebitda')
+    ebitda = ebitda[ebitda.index >= anno_inizio]
+    valori = ebitda['valore']
+    if parametri:
+        modello = regolazione.percorsi_ebitda(ebitda.loc[regolazione.ANNO_BASE, 'valore'], **dict(parametri))[0]
+        valori = pd.Series(modello, index=regolazione.ANNI).reindex(ebitda.index).fillna(valori)
+    return pd.DataFrame({
+        'Anno': [_etichetta_anno(a, f) for a, f in ebitda['fonte'].items()],
+        'EBITDA (€M)': valori.to_numpy(),
+        'EBITDA Piano (€M)': ebitda['valore'].where(ebitda.index >= ANNO_RESET).to_numpy(),
+        'Fase': _categorie([_fase_reset(a) for a in ebitda.index], ['Attuale', 'Post-Reset', 'Recupero'])
+    })
+
+
+def percorso_reset(df_ebitda_reset):
+    """EBITDA dall'ultimo anno prima del reset in poi (input di regolazione.indicatori)."""
+    inizio = int(np.argmax(df_ebitda_reset['Fase'].to_numpy() == 'Post-Reset')) - 1
+    return df_ebitda_reset['EBITDA (€M)'].to_numpy()[max(inizio, 0):]
+
+
+@st.cache_resource(show_spinner="Scenari del modello RP4...", max_entries=32)
+@telemetria.cronometra("dati")
+def carica_scenari_rp4(societa=TICKER, parametri=(), n_scenari=200_000, seed=0, versione=VERSIONE_DATI):
+    """Lotto di scenari casuali del modello RP4 attorno ai ``parametri``: (bande, riepilogo).
+
+    ``bande`` ha i percentili dell'EBITDA per anno (etichette come
+    carica_ebitda_reset); ``riepilogo`` mediana e percentili degli
+    indicatori del reset e la probabilità di tornare al livello pre-reset
+    nell'ultimo anno.
+    """
+    serie = carica_serie(societa, versione)
+    ebitda = _metrica(serie, 'ebitda')
+    scenari = regolazione.scenari_casuali(n_scenari, seed, **dict(parametri))
+    percorsi = regolazione.percorsi_ebitda(ebitda.loc[regolazione.ANNO_BASE, 'valore'], **scenari)
+    bande = regolazione.bande(percorsi)
+    bande['Anno'] = [_etichetta_anno(a, f) for a, f in ebitda['fonte'].reindex(regolazione.ANNI).items()]
+    indicatori = regolazione.indicatori(percorsi)
+    riepilogo = pd.Series({
+        **{f'{nome}_p{q}': valore for nome, valori in indicatori.items()
+           for q, valore in zip(regolazione.PERCENTILI, np.nanpercentile(valori, regolazione.PERCENTILI))},
+        'prob_recupero': float(np.mean(percorsi[:, -1] >= percorsi[:, 0])),
+    })
+    return bande, riepilogo
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+@telemetria.cronometra("dati")
+def _leggi_profilo_traffico(percorso, mtime):
+    import stress
+
+    return stress.profilo_storico(stress.carica_traffico(percorso))
+
+
+def profilo_traffico(societa=TICKER):
+    """Profilo dello shock da ripetere e se viene dallo storico: (profilo, da_storico).
+
+    Con lo storico delle unità di servizio in
+    ``dati_finanziari/traffico_<ticker>.csv`` è il suo calo più profondo
+    (stress.profilo_storico, riletto quando il file cambia), altrimenti
+    stress.PROFILO_COVID.
+    """
+    import stress
+
+    percorso = stress.file_traffico(societa)
+    profilo = _leggi_profilo_traffico(str(percorso), percorso.stat().st_mtime_ns) if percorso.exists() else None
+    return (profilo, True) if profilo else (stress.PROFILO_COVID, False)
+
+
+def input_stress(societa, versione):
+    """FCF e ricavi di piano (€M), azioni (milioni), ultimo DPS noto e DPS di piano per lo stress test."""
+    import stress
+
+    serie = carica_serie(societa, versione)
+    azioni = _metrica(serie, 'azioni_mln')['valore'].iloc[-1]
+    proiezione = carica_dps_projection(societa, versione)
+    fcf_piano = simulazione.fcf_di_piano(proiezione, azioni, stress.PARAMETRI_DEFAULT['payout'])
+    ricavi = stress.ricavi_di_piano(_metrica(serie, 'ricavi')['valore'], fcf_piano.index)
+    dps_piano = proiezione.loc[proiezione['Tipo'] == 'Piano', 'DPS (€)'].to_numpy()
+    return fcf_piano, ricavi, azioni, carica_kpi(societa, versione)['dps_atteso'], dps_piano
+
+
+@st.cache_resource(show_spinner="Stress test del traffico in corso...", max_entries=16)
+@telemetria.cronometra("dati")
+def carica_stress(societa=TICKER, intervalli=(), parametri=(), n_scenari=500_000, seed=0, versione=VERSIONE_DATI):
+    """Lotto di shock di traffico casuali sul piano: (riepilogo, per_anno, per_profondita) di stress.py.
+
+    ``intervalli`` e ``parametri`` sono tuple ordinate di coppie (nome,
+    valore) che sovrascrivono stress.INTERVALLI_DEFAULT e
+    stress.PARAMETRI_DEFAULT; i blocchi di scenari girano in processo.
+    """
+    import stress
+
+    fcf_piano, ricavi, azioni, dps_iniziale, dps_piano = input_stress(societa, versione)
+    risultati = stress.simula(fcf_piano, ricavi, azioni, dps_iniziale, dps_piano, n_scenari, seed,
+                              intervalli=dict(intervalli), **dict(parametri))
+    return (
+        stress.riepilogo(risultati),
+        stress.per_anno(risultati, fcf_piano.index, dps_iniziale),
+        stress.per_profondita(risultati, {**stress.INTERVALLI_DEFAULT, **dict(intervalli)}['profondita']),
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+@telemetria.cronometra("dati")
+def carica_replay(societa=TICKER, profilo=(), parametri=(), versione=VERSIONE_DATI):
+    """DPS del piano con il ``profilo`` di shock ripetuto in ogni anno (stress.replay).
+
+    ``profilo`` e ``parametri`` sono tuple ordinate di coppie (nome, valore).
+    """
+    import stress
+
+    return stress.replay(dict(profilo), *input_stress(societa, versione), **dict(parametri))
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_yield_comp(versione=VERSIONE_DATI):
+    # Dividend yield di riferimento (benchmark di mercato), con ENAV in prima riga
+    return pd.DataFrame({
+        'Società': ['ENAV', 'Media Utilities IT', 'FTSE MIB', 'BTP 10Y', 'Media Infrastr. UE'],
+        'Dividend Yield 2024E (%)': [7.0, 5.2, 4.5, 3.8, 4.1]
+    })
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_revenue_split(versione=VERSIONE_DATI):
+    # Composizione ricavi (regolati vs non regolati): attuale e prevista
+    segmenti = ['Attività Regolamentate (En-route)', 'Attività Regolamentate (Terminal)', 'Attività Non Regolamentate']
+    corrente = pd.DataFrame({'Segmento': segmenti, 'Ricavi 2023 (%)': [65, 30, 5]})
+    futura = pd.DataFrame({'Segmento': segmenti, 'Ricavi 2029E (%)': [60, 31, 9]})
+    return corrente, futura
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_targets(versione=VERSIONE_DATI):
+    """Target del Piano 2025-2029 tipizzati: importi in €M (o multipli per la leva).
+
+    Le colonne ``2024`` e ``2029 Target`` sono float32 (NaN per 'N/A'); la
+    variazione è scomposta in valore, tipo (CAGR %, media annua €M,
+    differenza x) e nota. La formattazione è in tabelle.py.
+    """
+    # Dati per impatto target 2025-2029, come riportati nel piano
+    metriche = ['Ricavi', 'EBITDA', 'Utile Netto', 'FCF Cumulato', 'Dividendi Cumulati', 'Debt/EBITDA']
+    valori_2024 = [1037, 311, 126, 'N/A', 'N/A', 0.8]
+    target_2029 = [1200, 361, 165, '€1 Mld', '€813M', 0.0]
+    variazioni = ['+3%', '+3% (+13% dal 2025)', '+6%', '€200M/anno medio', '€160M/anno medio', '-0.8x']
+
+    valore, tipo, nota = zip(*map(_variazione, variazioni))
+    return pd.DataFrame({
+        'Metrica': _categorie(metriche, metriche),
+        'Unità': _categorie(['€M'] * 5 + ['x'], ['€M', '€', 'x']),
+        '2024': np.array([_importo(v) for v in valori_2024], dtype=np.float32),
+        '2029 Target': np.array([_importo(v) for v in target_2029], dtype=np.float32),
+        'Variazione': np.array(valore, dtype=np.float32),
+        'Tipo Variazione': _categorie(tipo, ['CAGR', 'Media annua', 'Differenza']),
+        'Nota': nota,
+    })
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def carica_modello_whatif(societa=TICKER, versione=VERSIONE_DATI):
+    """Modello what-if con i valori correnti della società, già valutato.
+
+    Condiviso da tutte le sessioni in sola lettura: ogni sessione lavora
+    su ``modello.deriva()``.
+    """
+    kpi = carica_kpi(societa, versione)
+    base = carica_metriche_universo(versione).loc[societa].loc[int(kpi['anno_dps_atteso'])]
+    return whatif.crea_modello(
+        prezzo=float(kpi['prezzo_riferimento']),
+        ultimo_dps=float(kpi['ultimo_dps']),
+        dps_atteso=float(kpi['dps_atteso']),
+        eps=float(base['eps']),
+        fcf=float(base['fcf']),
+        azioni=float(base['azioni_mln']),
+        payout_politica=float(kpi['quota_payout']),
+        df_payout=carica_payout(societa, versione),
+        df_yield_comp=carica_yield_comp(versione),
+        nome=kpi['nome_breve'],
+    )
+
+
+# Testi lunghi dell'analisi, esternalizzati in file markdown
+CARTELLA_CONTENUTI = Path(__file__).parent / "contenuti"
+
+
+@st.cache_resource(show_spinner=False)
+@telemetria.cronometra("dati")
+def _leggi_contenuto(percorso, mtime):
+    return Path(percorso).read_text(encoding="utf-8")
+
+
+def carica_contenuto(nome_file):
+    """Testo markdown di ``contenuti/<nome_file>``, in cache finché il file non cambia."""
+    percorso = CARTELLA_CONTENUTI / nome_file
+    return _leggi_contenuto(str(percorso), percorso.stat().st_mtime_ns)
+
+
+BUILDERS = (
+    carica_archivio,
+    carica_serie,
+    carica_anagrafica,
+    societa_disponibili,
+    carica_universo,
+    carica_metriche_universo,
+    carica_kpi_universo,
+    carica_indice_screening,
+    carica_dps,
+    carica_fin,
+    carica_fin_clean,
+    carica_payout,
+    carica_fcf_div,
+    carica_dps_projection,
+    carica_yield,
+    carica_ebitda_reset,
+    carica_scenari_rp4,
+    carica_simulazione_dps,
+    _leggi_profilo_traffico,
+    carica_stress,
+    carica_replay,
+    carica_griglia_rendimenti,
+    carica_griglia_valutazione,
+    _leggi_yield_trailing,
+    _calcola_tsr,
+    carica_yield_comp,
+    carica_revenue_split,
+    carica_targets,
+    carica_modello_whatif,
+    _leggi_contenuto,
+)
+
+
+@st.cache_resource(show_spinner=False)
+def elimina_spazi_superati(spazio_figure):
+    """Una volta per processo: rimuove dalla cache su disco gli spazi delle versioni di codice superate.
+
+    Figure e frame di un codice precedente non verranno più letti, ma finché
+    restano su disco contano nel limite della cache (cache_disco.LIMITE_BYTE).
+    """
+    cache_disco.elimina_spazi("figure-", tranne=spazio_figure)
+    for spazio in SPAZI_FRAME:
+        cache_disco.elimina_spazi(f"{spazio}-", tranne=f"{spazio}-{VERSIONE_FRAME}")
+
+
+def invalida_cache():
+    """Svuota la cache di tutti i builder (es. dopo un aggiornamento dei dati)."""
+    for builder in BUILDERS:
+        builder.clear()
+
@@ -0,0 +1,910 @@
+# -*- coding: utf-8 -*-
+"""Costruttori delle figure Plotly dell'app, con cache indirizzata per contenuto.
+
+Ogni ``crea_fig_*`` riceve i DataFrame di input e restituisce la figura
+completa (tracce, annotazioni, shape, vrect). Il decoratore
+``figura_memoizzata`` indicizza la figura finita con l'hash del contenuto
+degli input: finche' i dati non cambiano, un rerun costa un hash e una
+lookup in un dizionario invece di una costruzione Plotly completa.
+
+Le figure restituite sono condivise tra rerun e sessioni: non vanno
+modificate dal chiamante.
+
+Le serie lunghe vengono ridotte con ``campionamento.riduci_serie`` prima di
+diventare tracce, e oltre ``SOGLIA_WEBGL`` punti le linee usano
+``go.Scattergl``: payload e tempo di rendering nel browser restano limitati
+qualunque sia la lunghezza della storia.
+
+Per un avvio rapido ``plotly.express`` (da solo circa un terzo del tempo
+di import dell'app) viene importato solo alla prima figura che lo usa.
+Sotto la cache in memoria c'è la cache su disco condivisa tra i processi
+(vedi cache_disco.py): ogni figura costruita vi viene salvata, e un
+processo nuovo, un altro worker o il primo rerun dopo un deploy
+riscaldato con ``python report.py --riscalda`` la leggono invece di
+ricostruirla. Le voci sono indicizzate dalla stessa impronta degli input
+e dalla versione di questo modulo, quindi non possono diventare obsolete.
+Le figure guidate dagli slider e quelle degli scenari what-if restano
+solo in memoria (``persistente=False``, ``.solo_memoria``).
+"""
+import functools
+import importlib
+import inspect
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import cache_disco
+import campionamento
+import regolazione
+import telemetria
+
+
+class _ImportPigro:
+    """Modulo importato al primo accesso a un suo attributo."""
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+
+    def __getattr__(self, attributo):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nome)
+        return getattr(self._modulo, attributo)
+
+
+px = _ImportPigro("plotly.express")
+
+# Le figure salvate su disco valgono solo per il codice che le ha prodotte
+MODULI_FIGURE = (__file__, campionamento.__file__, regolazione.__file__)
+VERSIONE_CODICE = cache_disco.versione_file(*MODULI_FIGURE)
+SPAZIO_FIGURE = f"figure-{VERSIONE_CODICE}"
+
+# Oltre questo numero di punti per traccia il rendering SVG rallenta: si passa a WebGL
+SOGLIA_WEBGL = 1000
+
+# Le figure degli scenari utente (what-if) sono tutte diverse: la cache in memoria
+# è un LRU limitato, così non cresce con il numero di sessioni
+MAX_FIGURE_IN_MEMORIA = 512
+
+_CACHE_FIGURE = OrderedDict()
+_LOCK_CACHE = threading.Lock()
+
+
+def figura_memoizzata(builder=None, *, persistente=True):
+    """Memoizza un costruttore di figure sull'impronta dei suoi input.
+
+    Con ``persistente=False`` la figura resta nella sola cache in memoria:
+    è il caso delle figure guidate dagli slider, quasi tutte diverse tra
+    le sessioni, che occuperebbero la cache su disco senza essere rilette.
+    Ogni costruttore ha anche la variante ``.solo_memoria``, per i
+    chiamanti che passano input di un solo utente (es. what-if).
+
+    Il chiamante può passare ``chiave=...``, i parametri scalari che
+    generano gli array di input (es. la specifica di una griglia): gli
+    array non entrano allora nell'impronta e la figura non va su disco.
+    """
+    if builder is None:
+        return functools.partial(figura_memoizzata, persistente=persistente)
+    firma = inspect.signature(builder)
+
+    def memoizza(su_disco):
+        @functools.wraps(builder)
+        def wrapper(*args, chiave=None, **kwargs):
+            inizio = telemetria.orologio()
+            # Argomenti normalizzati per nome e con i default: f(df) e f(df, None) sono la stessa figura
+            argomenti = firma.bind(*args, **kwargs)
+            argomenti.apply_defaults()
+            if chiave is None:
+                impronta = cache_disco.impronta(**argomenti.arguments)
+            else:
+                # Gli array sono determinati da ``chiave``: niente hash del loro contenuto
+                impronta = cache_disco.impronta(chiave, **{
+                    nome: valore for nome, valore in argomenti.arguments.items() if not isinstance(valore, np.ndarray)
+                })
+            chiave_cache = (builder.__name__, impronta)
+            with _LOCK_CACHE:
+                fig = _CACHE_FIGURE.get(chiave_cache)
+                if fig is not None:
+                    _CACHE_FIGURE.move_to_end(chiave_cache)
+            if fig is not None:
+                telemetria.registra("figura_cache", builder.__name__, inizio)
+                return fig
+            disco = su_disco and chiave is None
+            fig = _leggi_da_disco(chiave_cache) if disco else None
+            if fig is not None:
+                telemetria.registra("figura_disco", builder.__name__, inizio)
+            else:
+                fig = builder(*args, **kwargs)
+                telemetria.registra("figura", builder.__name__, inizio)
+                if disco:
+                    _salva_su_disco(chiave_cache, fig)
+            with _LOCK_CACHE:
+                fig = _CACHE_FIGURE.setdefault(chiave_cache, fig)
+                while len(_CACHE_FIGURE) > MAX_FIGURE_IN_MEMORIA:
+                    _CACHE_FIGURE.popitem(last=False)
+            return fig
+        return wrapper
+
+    wrapper = memoizza(persistente)
+    wrapper.solo_memoria = memoizza(False)
+    return wrapper
+
+
+def svuota_cache_figure():
+    """Invalida tutte le figure in cache."""
+    with _LOCK_CACHE:
+        _CACHE_FIGURE.clear()
+
+
+def _leggi_da_disco(chiave):
+    nome, impronta_input = chiave
+    contenuto = cache_disco.leggi(SPAZIO_FIGURE, f"{nome}_{impronta_input}")
+    if contenuto is None:
+        return None
+    # JSON e non pickle: una cartella di cache scrivibile non deve poter eseguire codice.
+    # Il dizionario è stato prodotto da una figura già valida: la validazione si può saltare
+    return go.Figure(json.loads(contenuto), _validate=False)
+
+
+def _salva_su_disco(chiave, fig):
+    nome, impronta_input = chiave
+    # JSON prodotto qui e non nel thread di scrittura: plotly carica il suo motore JSON (orjson)
+    # a ogni chiamata, e un primo import concorrente con st.plotly_chart fallisce
+    contenuto = fig.to_json().encode("utf-8")
+    cache_disco.scrivi_in_background(SPAZIO_FIGURE, f"{nome}_{impronta_input}", lambda: contenuto)
+
+
+def traccia_linea(x, y, **kwargs):
+    """Traccia a linee: ``go.Scatter`` o, oltre ``SOGLIA_WEBGL`` punti, ``go.Scattergl``."""
+    classe = go.Scattergl if len(y) > SOGLIA_WEBGL else go.Scatter
+    return classe(x=x, y=y, **kwargs)
+
+
+def _come_testo(df, colonna):
+    # Plotly Express raggruppa per colore: sulle categoriche pandas avvisa per observed=False
+    return df.astype({colonna: str}) if isinstance(df[colonna].dtype, pd.CategoricalDtype) else df
+
+
+def _eventi_dps(df_dps):
+    """Righe da annotare con la nota in archivio: (posizione, colore, ax, ay).
+
+    Per ogni taglio del DPS: l'anno prima, l'anno del taglio e il primo
+    anno di ripresa. Gli anni senza nota non vengono annotati.
+    """
+    dps = df_dps['DPS (€)'].to_numpy()
+    eventi = {}
+    for taglio in np.flatnonzero(dps[1:] < dps[:-1]) + 1:
+        eventi.setdefault(taglio - 1, ('navy', -20, -20))
+        eventi[taglio] = ('red', -20, -30)
+        ripresa = np.flatnonzero(dps[taglio + 1:] > dps[taglio:-1])
+        if ripresa.size:
+            eventi.setdefault(taglio + 1 + ripresa[0], (None, 20, -30))
+    note = df_dps['Nota'].astype(str).to_numpy()
+    return [(riga, *stile) for riga, stile in sorted(eventi.items()) if note[riga]]
+
+
+@figura_memoizzata
+def crea_fig_dps(df_dps, nome="ENAV"):
+    """Storico DPS con le note dell'archivio sui tagli e sulla ripresa del dividendo."""
+    fig_dps = px.bar(
+        _come_testo(df_dps, 'Tipo'),
+        x='Anno Esercizio',
+        y='DPS (€)',
+        title=f"Evoluzione del Dividendo per Azione {nome} ({df_dps['Anno Esercizio'].min()}-{df_dps['Anno Esercizio'].max()})",
+        text='DPS (€)',
+        color='Tipo',
+        color_discrete_map={'Storico': 'royalblue', 'Proposto': 'green'},
+        barmode='group'
+    )
+
+    # Annotazioni dalla nota in archivio della società, non da eventi fissi
+    for riga, colore, ax, ay in _eventi_dps(df_dps):
+        fig_dps.add_annotation(
+            x=df_dps['Anno Esercizio'].iloc[riga], y=df_dps['DPS (€)'].iloc[riga],
+            text=str(df_dps['Nota'].iloc[riga]).replace(' (', '<br>('),
+            showarrow=True,
+            font=dict(size=10, color=colore),
+            arrowhead=2,
+            arrowsize=1,
+            arrowwidth=1,
+            ax=ax, ay=ay
+        )
+
+    fig_dps.update_traces(texttemplate='€%{y:.4f}', textposition="outside")
+    fig_dps.update_layout(
+        xaxis_title="Anno Esercizio Fiscale", 
+        yaxis_title="Dividendo per Azione (€)",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig_dps
+
+
+@figura_memoizzata
+def crea_fig_yield(df_yield):
+    """Andamento del dividend yield annuale."""
+    fig_yield = px.bar(
+        df_yield,
+        x='Anno',
+        y='Dividend Yield (%)',
+        title="Andamento del Dividend Yield",
+        text='Dividend Yield (%)',
+        color='Dividend Yield (%)',
+        color_continuous_scale=px.colors.sequential.Viridis
+    )
+    fig_yield.update_traces(texttemplate='%{y:.1f}%', textposition="outside")
+    fig_yield.update_layout(xaxis_title="Anno", yaxis_title="Dividend Yield (%)")
+    return fig_yield
+
+
+@figura_memoizzata
+def crea_fig_yield_trailing(df_yield_ttm, max_punti=campionamento.MAX_PUNTI):
+    """Dividend yield trailing 12 mesi giornaliero, con il prezzo su asse secondario."""
+    df = campionamento.riduci_serie(df_yield_ttm, ['Dividend Yield TTM (%)', 'Prezzo (€)'], max_punti)
+    fig = go.Figure()
+    fig.add_trace(traccia_linea(
+        df.index,
+        df['Dividend Yield TTM (%)'],
+        name='Dividend Yield TTM',
+        mode='lines',
+        line=dict(color='seagreen', width=2),
+        hovertemplate='%{x|%d/%m/%Y}: %{y:.2f}%<extra></extra>'
+    ))
+    fig.add_trace(traccia_linea(
+        df.index,
+        df['Prezzo (€)'],
+        name='Prezzo',
+        mode='lines',
+        line=dict(color='rgba(65, 105, 225, 0.5)', width=1),
+        yaxis='y2',
+        hovertemplate='%{x|%d/%m/%Y}: €%{y:.3f}<extra></extra>'
+    ))
+    fig.update_layout(
+        title="Andamento del Dividend Yield (trailing 12 mesi)",
+        xaxis_title="Data",
+        yaxis_title="Dividend Yield (%)",
+        yaxis2=dict(title="Prezzo (€)", overlaying="y", side="right", showgrid=False),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+
+@figura_memoizzata
+def crea_fig_payout(df_payout, nome="ENAV"):
+    """Payout ratio su EPS e (da legenda) su FCF, con target di policy."""
+    # Grafico combinato che mostra entrambi i tipi di payout ratio
+    fig_payout = go.Figure()
+
+    # Filtriamo gli anni con dividendi positivi
+    df_payout_filtered = df_payout[df_payout['DPS (€)'] > 0]
+
+    # Aggiungiamo barre per il payout ratio rispetto all'EPS
+    fig_payout.add_trace(go.Bar(
+        x=df_payout_filtered['Anno'],
+        y=df_payout_filtered['Payout Ratio (% di EPS)'],
+        name='% dell\'EPS',
+        text=df_payout_filtered['Payout Ratio (% di EPS)'].round(1).astype(str) + '%',
+        textposition="outside",
+        marker_color='rgba(0, 128, 0, 0.7)',
+    ))
+
+    # Aggiungiamo barre per il payout ratio rispetto al FCF dove FCF è positivo
+    df_payout_fcf = df_payout_filtered[df_payout_filtered['FCF per Share (€)'] > 0]
+    fig_payout.add_trace(go.Bar(
+        x=df_payout_fcf['Anno'],
+        y=df_payout_fcf['Payout Ratio (% di FCF)'],
+        name='% del FCF',
+        text=df_payout_fcf['Payout Ratio (% di FCF)'].round(1).astype(str) + '%',
+        textposition="outside",
+        marker_color='rgba(65, 105, 225, 0.7)',
+        visible='legendonly'  # Inizialmente nascosto, attivabile dalla legenda
+    ))
+
+    # Aggiungiamo linea target policy (80% del FCF)
+    fig_payout.add_shape(
+        type="line",
+        x0=df_payout_filtered['Anno'].min()-0.5,
+        x1=df_payout_filtered['Anno'].max()+0.5,
+        y0=80,
+        y1=80,
+        line=dict(color="red", width=2, dash="dash"),
+    )
+
+    fig_payout.add_annotation(
+        x=df_payout_filtered['Anno'].max(),
+        y=85,
+        text="Target Payout: 80% del FCF",
+        showarrow=False,
+        font=dict(color="red")
+    )
+
+    # Aggiungiamo annotazione per spiegare il payout ratio alto nel 2021
+    if df_payout_filtered['Anno'].min() <= 2021 <= df_payout_filtered['Anno'].max():
+        eps_2021 = df_payout_filtered.loc[df_payout_filtered['Anno'] == 2021, 'Payout Ratio (% di EPS)'].values[0]
+        if eps_2021 > 70:  # Solo se è un valore alto
+            fig_payout.add_annotation(
+                x=2021,
+                y=eps_2021,
+                text="EPS impattato<br>dal COVID",
+                showarrow=True,
+                arrowhead=2,
+                arrowsize=1,
+                arrowwidth=1,
+                arrowcolor="green",
+                ax=25,
+                ay=-30
+            )
+
+    fig_payout.update_layout(
+        title={
+            'text': f"Payout Ratio di {nome}",
+            'font': {'size': 16}
+        },
+        xaxis_title="Anno",
+        yaxis_title="Payout Ratio (%)",
+        barmode='group',
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        yaxis=dict(
+            range=[0, max(df_payout_filtered['Payout Ratio (% di EPS)'].max(), 
+                          df_payout_fcf['Payout Ratio (% di FCF)'].max() if not df_payout_fcf.empty else 0) * 1.15]
+        )
+    )
+    return fig_payout
+
+
+@figura_memoizzata
+def crea_fig_fcf_div(df_fcf_div):
+    """Free cash flow contro dividendi pagati, con copertura FCF su asse secondario."""
+    # Copertura FCF calcolata solo per gli anni con FCF positivo
+    mask = df_fcf_div['FCF (€M)'] > 0
+
+    fig_fcf_div = go.Figure()
+    fig_fcf_div.add_trace(go.Bar(
+        x=df_fcf_div['Anno'],
+        y=df_fcf_div['FCF (€M)'],
+        name='Free Cash Flow',
+        marker_color='royalblue'
+    ))
+    fig_fcf_div.add_trace(go.Bar(
+        x=df_fcf_div['Anno'],
+        y=df_fcf_div['Dividendi Totali Pagati (€M)'],
+        name='Dividendi Pagati',
+        marker_color='darkgreen'
+    ))
+
+    # Aggiungiamo la linea di Copertura FCF solo per gli anni con FCF positivo
+    y_values = df_fcf_div['Copertura FCF'] * 100  # Scala per visualizzazione
+    fig_fcf_div.add_trace(go.Scatter(
+        x=df_fcf_div.loc[mask, 'Anno'],
+        y=y_values[mask],
+        name='Copertura FCF (volte)',
+        mode='lines+markers+text',
+        text=df_fcf_div.loc[mask, 'Copertura FCF'],
+        textposition="top center",
+        yaxis='y2',
+        line=dict(color='red', width=2)
+    ))
+
+    fig_fcf_div.update_layout(
+        title="Free Cash Flow vs Dividendi Pagati",
+        barmode='group',
+        xaxis_title="Anno",
+        yaxis_title="Milioni di €",
+        yaxis2=dict(
+            title="Copertura FCF (volte)",
+            overlaying="y",
+            side="right",
+            range=[0, 3],
+            showgrid=False
+        ),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+
+    # Annotazione a metà barra per gli anni con FCF negativo
+    negativi = df_fcf_div[df_fcf_div['FCF (€M)'] < 0]
+    for anno, fcf in zip(negativi['Anno'], negativi['FCF (€M)']):
+        fig_fcf_div.add_annotation(
+            x=anno, y=fcf / 2,
+            text="FCF negativo",
+            showarrow=True,
+            font=dict(color="white"),
+            arrowhead=2,
+            arrowsize=1,
+            arrowwidth=1,
+            ax=40, ay=0
+        )
+    return fig_fcf_div
+
+
+@figura_memoizzata
+def crea_fig_proj(df_dps_projection, bande=None):
+    """DPS storico e proiezione del Piano Industriale 2025-2029.
+
+    Con ``bande`` (output di simulazione.simula_dps) aggiunge la banda
+    p5-p95 e la mediana della simulazione Monte Carlo.
+    """
+    fig_proj = px.line(
+        _come_testo(df_dps_projection, 'Tipo'),
+        x='Anno',
+        y='DPS (€)',
+        title="Dividendo per Azione: Storico e Proiezione Piano Industriale",
+        markers=True,
+        text='DPS (€)',
+        color='Tipo',
+        color_discrete_map={'Storico': 'royalblue', 'Proposto': 'green', 'Piano': 'orange'}
+    )
+    fig_proj.update_traces(texttemplate='€%{y:.4f}', textposition="top center")
+
+    if bande is not None:
+        # Banda p5-p95: prima il bordo superiore, poi quello inferiore riempito fino al precedente
+        fig_proj.add_trace(go.Scatter(
+            x=bande['Anno'], y=bande['p95'],
+            mode='lines', line=dict(width=0),
+            hoverinfo='skip', showlegend=False
+        ))
+        fig_proj.add_trace(go.Scatter(
+            x=bande['Anno'], y=bande['p5'],
+            mode='lines', line=dict(width=0),
+            fill='tonexty', fillcolor='rgba(255, 165, 0, 0.2)',
+            name='Monte Carlo p5-p95',
+            hovertemplate='p5-p95: €%{y:.4f}<extra></extra>'
+        ))
+        fig_proj.add_trace(go.Scatter(
+            x=bande['Anno'], y=bande['p50'],
+            mode='lines', line=dict(color='darkorange', dash='dash'),
+            name='Monte Carlo mediana',
+            hovertemplate='Mediana: €%{y:.4f}<extra></extra>'
+        ))
+
+    # Periodo di piano e note dell'archivio sugli anni di piano (es. il reset regolatorio)
+    piano = df_dps_projection[df_dps_projection['Tipo'] == 'Piano']
+    if not piano.empty:
+        anni = piano['Anno'].to_numpy()
+        fig_proj.add_vrect(
+            x0=anni[0] - 0.5, x1=anni[-1] + 0.5,
+            fillcolor="lightgreen", opacity=0.2,
+            line_width=0
+        )
+        centro = piano.iloc[len(piano) // 2]
+        fig_proj.add_annotation(
+            x=centro['Anno'], y=centro['DPS (€)'],
+            text=f"Piano Industriale<br>{anni[0]}-{anni[-1]}",
+            showarrow=True,
+            arrowhead=2,
+            arrowcolor="green",
+            arrowwidth=2,
+            arrowsize=1,
+            ax=0,
+            ay=-40
+        )
+        for anno, dps, nota in zip(anni, piano['DPS (€)'], piano['Nota'].astype(str)):
+            if not nota or anno == centro['Anno']:
+                continue
+            fig_proj.add_annotation(
+                x=anno, y=dps,
+                text=f"{nota}<br>inizio {anno}",
+                showarrow=True,
+                arrowhead=2,
+                arrowcolor="red",
+                arrowwidth=2,
+                arrowsize=1,
+                ax=-40,
+                ay=30
+            )
+
+    fig_proj.update_layout(xaxis_title="Anno", yaxis_title="Dividendo per Azione (€)")
+    return fig_proj
+
+
+@figura_memoizzata
+def crea_fig_reset(df_ebitda_reset, bande=None):
+    """Impatto del reset regolatorio RP4 sull'EBITDA.
+
+    Barre e annotazioni (calo al reset, recupero e CAGR) vengono da
+    ``EBITDA (€M)``: il Piano Industriale o, con parametri cambiati, il
+    modello di regolazione.py (vedi dati.carica_ebitda_reset); i punti
+    sono il Piano Industriale. Con
+    ``bande`` (output di dati.carica_scenari_rp4) aggiunge la banda p5-p95
+    di un lotto di scenari.
+    """
+    # Invece di usare barre per fase, usiamo un approccio più semplice con colori per fase
+    # Questo evita i problemi di visualizzazione con le barre raggruppate
+
+    # Mappatura dei colori per ogni fase
+    color_map = {
+        'Attuale': 'rgb(65, 105, 225)',      # Blu
+        'Post-Reset': 'rgb(220, 20, 60)',    # Rosso
+        'Recupero': 'rgb(46, 139, 87)'       # Verde
+    }
+
+    # Creiamo un array di colori basato sulla fase di ogni punto dati
+    colors = [color_map[fase] for fase in df_ebitda_reset['Fase']]
+
+    # Creiamo un grafico a barre semplice con colori diversi per ogni barra
+    fig_reset = go.Figure()
+
+    # Aggiungiamo le barre dell'EBITDA con colori personalizzati
+    fig_reset.add_trace(go.Bar(
+        x=df_ebitda_reset['Anno'],
+        y=df_ebitda_reset['EBITDA (€M)'],
+        marker_color=colors,
+        text=df_ebitda_reset['EBITDA (€M)'].round().astype(int).astype(str) + "M€",
+        textposition='auto',
+        width=0.6,
+        showlegend=False
+    ))
+
+    # Aggiungiamo la linea di tendenza
+    fig_reset.add_trace(go.Scatter(
+        x=df_ebitda_reset['Anno'],
+        y=df_ebitda_reset['EBITDA (€M)'],
+        mode='lines+markers',
+        line=dict(color='rgba(0, 0, 0, 0.7)', width=2, dash='dot'),
+        showlegend=False
+    ))
+
+    # Aggiungiamo una legenda manuale con div colorati
+    fig_reset.add_annotation(
+        x=0.02, y=1.12,
+        xref="paper", yref="paper",
+        text="<span style='color:rgb(65, 105, 225);'>■</span> Attuale &nbsp;&nbsp; <span style='color:rgb(220, 20, 60);'>■</span> Post-Reset &nbsp;&nbsp; <span style='color:rgb(46, 139, 87);'>■</span> Recupero",
+        showarrow=False,
+        font=dict(size=12),
+        align="left"
+    )
+
+    # Anni chiave e indicatori calcolati dal percorso del modello
+    fasi = df_ebitda_reset['Fase'].to_numpy()
+    i_reset = int(np.argmax(fasi == 'Post-Reset'))
+    anni = df_ebitda_reset['Anno'].to_numpy()
+    valori = df_ebitda_reset['EBITDA (€M)'].to_numpy()
+    indicatori = {nome: float(v[0]) for nome, v in regolazione.indicatori(valori[i_reset - 1:]).items()}
+    anno_prima, anno_reset, anno_ultimo = anni[i_reset - 1], anni[i_reset], anni[-1]
+    prima, reset, ultimo = valori[i_reset - 1], valori[i_reset], valori[-1]
+
+    if 'EBITDA Piano (€M)' in df_ebitda_reset:
+        fig_reset.add_trace(go.Scatter(
+            x=anni, y=df_ebitda_reset['EBITDA Piano (€M)'],
+            mode='markers', marker=dict(symbol='diamond', size=10, color='black'),
+            name='Piano Industriale', hovertemplate='Piano: €%{y:.0f}M<extra></extra>'
+        ))
+
+    if bande is not None:
+        # Banda p5-p95: prima il bordo superiore, poi quello inferiore riempito fino al precedente
+        fig_reset.add_trace(go.Scatter(
+            x=bande['Anno'], y=bande['p95'],
+            mode='lines', line=dict(width=0),
+            hoverinfo='skip', showlegend=False
+        ))
+        fig_reset.add_trace(go.Scatter(
+            x=bande['Anno'], y=bande['p5'],
+            mode='lines', line=dict(width=0),
+            fill='tonexty', fillcolor='rgba(128, 128, 128, 0.2)',
+            name='Scenari p5-p95',
+            hovertemplate='p5: €%{y:.0f}M<extra></extra>'
+        ))
+
+    # Evidenziamo il calo al reset
+    fig_reset.add_shape(
+        type="line",
+        x0=anno_prima, y0=prima,
+        x1=anno_reset, y1=reset,
+        line=dict(color="red", width=2, dash="dot"),
+        xref='x', yref='y'
+    )
+
+    # Aggiungiamo frecce e annotazioni
+    fig_reset.add_annotation(
+        x=anno_prima, y=prima,
+        xshift=20,
+        text=f"€{prima:.0f}M",
+        showarrow=False,
+        font=dict(size=12, color="navy")
+    )
+
+    fig_reset.add_annotation(
+        x=anno_reset, y=reset,
+        xshift=15, yshift=-25,
+        text=f"€{reset:.0f}M<br><b>{indicatori['calo_reset']:+.0%}</b>",
+        showarrow=True,
+        arrowhead=2,
+        arrowcolor="red",
+        arrowwidth=2,
+        arrowsize=1,
+        ax=-25, ay=30
+    )
+
+    # Evidenziamo la crescita fino all'ultimo anno
+    centro = (i_reset + len(anni) - 1) // 2
+    fig_reset.add_annotation(
+        x=anni[centro], y=valori[centro] * 0.9,
+        text="Fase di Recupero",
+        showarrow=False,
+        font=dict(size=12, color="darkgreen")
+    )
+
+    fig_reset.add_annotation(
+        x=anno_ultimo, y=ultimo,
+        xshift=0, yshift=20,
+        text=f"€{ultimo:.0f}M<br><b>{indicatori['recupero']:+.0%}</b> vs {anno_reset.rstrip('E')}<br>CAGR {indicatori['cagr_recupero']:+.1%}",
+        showarrow=True,
+        arrowhead=2,
+        arrowcolor="green",
+        arrowwidth=2,
+        arrowsize=1,
+        ax=0, ay=-40
+    )
+
+    # Area evidenziata per periodo di recupero
+    fig_reset.add_vrect(
+        x0=anno_reset, x1=anno_ultimo,
+        fillcolor="rgba(50, 205, 50, 0.1)",
+        layer="below",
+        line_width=0,
+        annotation_text="Periodo di Recupero RP4",
+        annotation_position="top right",
+        annotation=dict(font_size=10, font_color="green")
+    )
+
+    # Titolo e layout
+    fig_reset.update_layout(
+        title={
+            'text': "Impatto del Reset Regolatorio RP4 sull'EBITDA",
+            'font': {'size': 16}
+        },
+        xaxis_title="Anno",
+        yaxis_title="EBITDA (€M)",
+        yaxis=dict(
+            tickformat=",.0f",
+            gridcolor='rgba(0,0,0,0.1)'
+        ),
+        legend=dict(orientation="h", yanchor="bottom", y=-0.3),
+        margin=dict(t=80, b=50, l=50, r=50)
+    )
+    return fig_reset
+
+
+@figura_memoizzata
+def crea_fig_yield_comp(df_yield_comp):
+    """Confronto del dividend yield con altri investimenti."""
+    fig_yield_comp = px.bar(
+        df_yield_comp,
+        x='Società',
+        y='Dividend Yield 2024E (%)',
+        title="Confronto Dividend Yield con altri Investimenti (2024E)",
+        text='Dividend Yield 2024E (%)',
+        color='Dividend Yield 2024E (%)',
+        color_continuous_scale=px.colors.sequential.Viridis
+    )
+    fig_yield_comp.update_traces(texttemplate='%{y:.1f}%', textposition="outside")
+    fig_yield_comp.update_layout(xaxis_title="Società/Benchmark", yaxis_title="Dividend Yield (%)")
+    return fig_yield_comp
+
+
+@figura_memoizzata(persistente=False)
+def crea_fig_screening(risultati, criterio, etichetta, societa=None, riferimenti=None):
+    """Classifica dello screening (output di IndiceScreening.migliori) a barre orizzontali.
+
+    Le barre sono i valori della colonna ``criterio``; la ``societa`` della
+    pagina è evidenziata e ogni riga di ``riferimenti`` (colonne Società e
+    valore, es. i benchmark di yield) diventa una linea verticale.
+    """
+    voci = risultati['nome_breve'].astype(str) + " " + risultati['anno'].astype(str)
+    valori = risultati[criterio]
+    colori = np.where(risultati['societa'] == societa, 'darkorange', 'royalblue')
+    fig = go.Figure(go.Bar(
+        x=valori, y=voci, orientation='h',
+        marker_color=colori, text=valori, texttemplate='%{x:.2f}', textposition='outside',
+        customdata=risultati[['posizione']],
+        hovertemplate='#%{customdata[0]} %{y}: %{x:.2f}<extra></extra>'
+    ))
+    if riferimenti is not None:
+        for nome, valore in riferimenti.itertuples(index=False):
+            fig.add_vline(x=valore, line_dash="dot", line_color="gray",
+                          annotation_text=nome, annotation_position="top", annotation_textangle=-90)
+    fig.update_layout(
+        title=f"Screening dell'Universo: {etichetta}",
+        xaxis_title=etichetta,
+        # La prima posizione in alto
+        yaxis=dict(autorange="reversed", type='category'),
+        height=max(350, 120 + 28 * len(risultati)),
+        showlegend=False
+    )
+    return fig
+
+
+@figura_memoizzata(persistente=False)
+def crea_fig_sensibilita_yield(prezzi, dps, rendimenti, scenari, prezzo_riferimento, max_celle=250):
+    """Heatmap del dividend yield su una griglia prezzo × DPS.
+
+    La griglia completa resta nel livello dati; qui viene campionata con
+    passo costante fino a ``max_celle`` per asse, così il payload inviato
+    al browser non cresce con la risoluzione della griglia.
+    ``scenari`` ha le colonne 'Scenario' e 'DPS (€)' (linee orizzontali).
+    """
+    passo_x = max(1, -(-len(prezzi) // max_celle))
+    passo_y = max(1, -(-len(dps) // max_celle))
+    fig = go.Figure(go.Heatmap(
+        x=prezzi[::passo_x],
+        y=dps[::passo_y],
+        z=rendimenti[::passo_y, ::passo_x],
+        colorscale='Viridis',
+        colorbar=dict(title="Yield (%)"),
+        hovertemplate='Prezzo €%{x:.2f}<br>DPS €%{y:.4f}<br>Yield %{z:.2f}%<extra></extra>'
+    ))
+
+    # Scenari di DPS: storico, proposto e piano
+    for _, riga in scenari.iterrows():
+        fig.add_hline(
+            y=riga['DPS (€)'],
+            line=dict(color='white', width=1, dash='dot'),
+            annotation_text=f"{riga['Scenario']}: {riga['DPS (€)'] / prezzo_riferimento * 100:.1f}%",
+            annotation_position="top left",
+            annotation_font=dict(size=9, color='white')
+        )
+
+    fig.add_vline(
+        x=prezzo_riferimento,
+        line=dict(color='red', width=2, dash='dash'),
+        annotation_text=f"Prezzo di riferimento €{prezzo_riferimento:.2f}",
+        annotation_position="top right",
+        annotation_font=dict(color='red')
+    )
+    fig.update_layout(
+        title="Sensibilità del Dividend Yield a Prezzo e DPS",
+        xaxis_title="Prezzo dell'azione (€)",
+        yaxis_title="Dividendo per Azione (€)",
+        height=550
+    )
+    return fig
+
+
+@figura_memoizzata(persistente=False)
+def crea_fig_valutazione(ke, g, valori, prezzo, metodo='DDM', max_celle=250):
+    """Heatmap del valore per azione su costo del capitale × crescita terminale.
+
+    I colori sono centrati sul ``prezzo``: verde dove il valore lo supera.
+    La linea tratteggiata unisce le combinazioni in cui valore e prezzo
+    coincidono. Come per la sensibilità del yield, la griglia viene
+    campionata fino a ``max_celle`` per asse.
+    """
+    passo_x = max(1, -(-len(ke) // max_celle))
+    passo_y = max(1, -(-len(g) // max_celle))
+    x = ke[::passo_x] * 100
+    y = g[::passo_y] * 100
+    z = valori[::passo_y, ::passo_x]
+    fig = go.Figure(go.Heatmap(
+        x=x, y=y, z=z,
+        colorscale='RdYlGn', zmid=prezzo,
+        colorbar=dict(title="Valore (€)"),
+        hovertemplate='Costo del capitale %{x:.2f}%<br>Crescita terminale %{y:.2f}%<br>Valore €%{z:.2f}<extra></extra>'
+    ))
+    fig.add_trace(go.Contour(
+        x=x, y=y, z=z,
+        contours=dict(start=prezzo, end=prezzo, size=1, coloring='none'),
+        line=dict(color='black', width=2, dash='dash'),
+        showscale=False, hoverinfo='skip', name=f"Valore = prezzo (€{prezzo:.2f})", showlegend=True
+    ))
+    fig.update_layout(
+        title=f"Valore per Azione ({metodo} a tre stadi) al variare di Costo del Capitale e Crescita",
+        xaxis_title="Costo del capitale proprio (%)",
+        yaxis_title="Crescita terminale (%)",
+        legend=dict(orientation="h", yanchor="bottom", y=-0.25),
+        height=550
+    )
+    return fig
+
+
+@figura_memoizzata
+def crea_fig_tsr(dist_reinvestito, dist_incassato, soglia=10.0):
+    """Distribuzione del TSR annuo realizzato per durata dell'investimento.
+
+    Per ciascuna strategia (output di rendimenti.distribuzione): banda
+    p5-p95, banda p25-p75 e mediana sugli ingressi dello storico.
+    """
+    fig = go.Figure()
+    strategie = (
+        ('Dividendi reinvestiti', dist_reinvestito, 'rgba(46, 139, 87, {})'),
+        ('Dividendi incassati', dist_incassato, 'rgba(65, 105, 225, {})'),
+    )
+    for nome, dist, colore in strategie:
+        for basso, alto, opacita in (('P5', 'P95', 0.12), ('P25', 'P75', 0.25)):
+            # Prima il bordo superiore, poi quello inferiore riempito fino al precedente
+            fig.add_trace(go.Scatter(
+                x=dist['Anni'], y=dist[alto], mode='lines', line=dict(width=0),
+                legendgroup=nome, hoverinfo='skip', showlegend=False
+            ))
+            fig.add_trace(go.Scatter(
+                x=dist['Anni'], y=dist[basso], mode='lines', line=dict(width=0),
+                fill='tonexty', fillcolor=colore.format(opacita),
+                legendgroup=nome, hoverinfo='skip', showlegend=False
+            ))
+        fig.add_trace(go.Scatter(
+            x=dist['Anni'], y=dist['P50'], mode='lines+markers',
+            line=dict(color=colore.format(1)), legendgroup=nome,
+            name=f"{nome} (mediana, bande p25-p75 e p5-p95)",
+            customdata=dist[['P5', 'P95', 'Ingressi']],
+            hovertemplate='%{x:.2f} anni: mediana %{y:.1f}%<br>p5 %{customdata[0]:.1f}% / p95 %{customdata[1]:.1f}%<br>%{customdata[2]} ingressi<extra></extra>'
+        ))
+    fig.add_hline(y=soglia, line_dash="dot", line_color="gray",
+                  annotation_text=f"TSR {soglia:.0f}% annuo", annotation_position="top left")
+    fig.update_layout(
+        title="TSR Annuo Realizzato per Durata dell'Investimento (tutti gli ingressi dello storico)",
+        xaxis_title="Anni di detenzione",
+        yaxis_title="TSR annuo (%)",
+        legend=dict(orientation="h", yanchor="bottom", y=-0.3),
+        height=500
+    )
+    return fig
+
+
+@figura_memoizzata(persistente=False)
+def crea_fig_stress(per_profondita, profilo=None):
+    """Effetto degli shock di traffico sul dividendo per profondità dello shock.
+
+    Da ``stress.per_profondita``: una linea dei dividendi di piano persi per
+    ogni forma del recupero, più taglio mediano e probabilità di un anno
+    senza dividendo dalle righe calcolate su tutte le forme insieme
+    (``Forma`` "Tutte", stress.TUTTE_LE_FORME). Il ``profilo`` ripetuto
+    (dict di stress.py) è una linea verticale.
+    """
+    fig = go.Figure()
+    colori = {'V': 'seagreen', 'U': 'darkorange', 'L': 'firebrick'}
+    insieme = per_profondita['Forma'] == 'Tutte'
+    for forma, gruppo in per_profondita[~insieme].groupby('Forma', sort=False):
+        fig.add_trace(go.Scatter(
+            x=gruppo['Profondità (%)'], y=gruppo['Dividendi persi (%)'], mode='lines+markers',
+            line=dict(color=colori.get(forma)), name=f"Dividendi di piano persi, recupero a {forma}",
+            customdata=gruppo[['Scenari', 'Probabilità taglio (%)']],
+            hovertemplate='Shock %{x:.1f}%: %{y:.1f}% dei dividendi persi<br>'
+                          'Taglio in %{customdata[1]:.0f}% di %{customdata[0]:,} scenari<extra></extra>'
+        ))
+    tutte = per_profondita[insieme]
+    for colonna, nome, tratto in (('Taglio mediano (%)', 'Taglio mediano del DPS', 'dash'),
+                                  ('Probabilità azzeramento (%)', 'Probabilità di un anno senza dividendo', 'dot')):
+        fig.add_trace(go.Scatter(
+            x=tutte['Profondità (%)'], y=tutte[colonna], mode='lines',
+            line=dict(color='gray', dash=tratto), name=f"{nome} (tutte le forme)",
+            hovertemplate=f'Shock %{{x:.1f}}%: {nome.lower()} %{{y:.1f}}%<extra></extra>'
+        ))
+    if profilo is not None:
+        fig.add_vline(x=profilo['profondita'] * 100, line_dash="dot", line_color="black",
+                      annotation_text=f"Shock {profilo['anno']}: -{profilo['profondita']:.0%}", annotation_position="top")
+    fig.update_layout(
+        title="Stress Test del Traffico: Effetto degli Shock sul Dividendo",
+        xaxis_title="Traffico perso nell'anno dello shock (%)",
+        yaxis_title="%",
+        legend=dict(orientation="h", yanchor="bottom", y=-0.4),
+        height=500
+    )
+    return fig
+
+
+@figura_memoizzata
+def crea_fig_revenue_split(df_revenue_split, colonna_valori, titolo):
+    """Composizione percentuale dei ricavi per segmento (grafico a ciambella)."""
+    fig = px.pie(
+        df_revenue_split,
+        values=colonna_valori,
+        names='Segmento',
+        title=titolo,
+        color_discrete_sequence=px.colors.qualitative.Set2,
+        hole=0.4
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
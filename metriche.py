@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Pipeline delle metriche sui dividendi per un intero universo di emittenti.
+
+Tutte le funzioni lavorano sull'archivio completo in un solo passaggio
+vettoriale (una pivot e operazioni per colonna, nessun ciclo per società):
+la pagina di un singolo ticker è poi una semplice selezione sul risultato,
+che ``dati.py`` tiene in cache.
+"""
+import numpy as np
+import pandas as pd
+
+
+def tabella_larga(df_lungo):
+    """Pivot dell'archivio: indice (societa, anno), una colonna per metrica."""
+    larga = df_lungo.pivot_table(index=['societa', 'anno'], columns='metrica', values='valore', aggfunc='first', observed=True)
+    larga.columns.name = None
+    return larga.sort_index()
+
+
+def _rapporto(numeratore, denominatore, riempimento):
+    # Rapporto elemento per elemento con denominatore strettamente positivo.
+    # Denominatore nullo o negativo -> riempimento; input NaN -> NaN; mai inf.
+    numeratore = np.asarray(numeratore, dtype=float)
+    denominatore = np.asarray(denominatore, dtype=float)
+    out = np.full(np.broadcast(numeratore, denominatore).shape, riempimento, dtype=float)
+    np.divide(numeratore, denominatore, out=out, where=denominatore > 0)
+    out[np.isnan(numeratore) | np.isnan(denominatore)] = np.nan
+    return out
+
+
+def kernel_payout(dps, eps, fcf_per_azione, fcf, azioni, riempimento=0.0):
+    """Payout e copertura del dividendo su array NumPy di qualsiasi forma.
+
+    Gli input si combinano con il broadcasting NumPy: per uno screening
+    sull'universo basta passare matrici società × anni e il calcolo resta
+    una manciata di operazioni vettoriali, senza lavoro per frame pandas.
+
+    Politica sui valori non definiti:
+    - denominatore (EPS, FCF per azione, dividendi pagati) nullo o negativo:
+      il rapporto vale ``riempimento`` (default 0, come nei grafici)
+    - un input NaN produce NaN
+    - il risultato non contiene mai ±inf
+
+    Restituisce un dict con ``payout_eps`` e ``payout_fcf`` (in %),
+    ``dividendi_pagati`` (DPS × azioni, arrotondato a 0.1) e
+    ``copertura_fcf`` (FCF / dividendi pagati, arrotondato a 0.01).
+    """
+    dividendi_pagati = np.round(np.asarray(dps, dtype=float) * np.asarray(azioni, dtype=float), 1)
+    fcf = np.asarray(fcf, dtype=float)
+    # Con FCF nullo o negativo la copertura non è definita
+    copertura = np.where(fcf <= 0, riempimento, _rapporto(fcf, dividendi_pagati, riempimento))
+    return {
+        'payout_eps': _rapporto(dps, eps, riempimento) * 100,
+        'payout_fcf': _rapporto(dps, fcf_per_azione, riempimento) * 100,
+        'dividendi_pagati': dividendi_pagati,
+        'copertura_fcf': np.round(copertura, 2),
+    }
+
+
+def calcola_metriche(larga):
+    """Aggiunge payout su EPS e FCF, dividendi pagati e copertura FCF per (societa, anno)."""
+    risultati = kernel_payout(
+        larga['dps'].to_numpy(),
+        larga['eps'].to_numpy(),
+        larga['fcf_per_azione'].to_numpy(),
+        larga['fcf'].to_numpy(),
+        larga['azioni_mln'].to_numpy(),
+    )
+    return larga.assign(**risultati)
+
+
+def kpi_dividendo(df_lungo, anagrafica):
+    """Indicatori chiave del dividendo, una riga per società.
+
+    - ultimo DPS storico e relativo esercizio
+    - DPS proposto (o, in mancanza, primo DPS di piano) e crescita rispetto all'ultimo
+    - dividend yield attuale e forward al prezzo di riferimento dell'anagrafica
+    """
+    dps = df_lungo[df_lungo['metrica'] == 'dps']
+
+    storico = dps[dps['fonte'] == 'Storico']
+    ultimo = storico.loc[storico.groupby('societa', observed=True)['anno'].idxmax(), ['societa', 'anno', 'valore']]
+    ultimo = ultimo.set_index('societa').rename(columns={'anno': 'anno_ultimo_dps', 'valore': 'ultimo_dps'})
+
+    futuri = dps[dps['fonte'] != 'Storico']
+    # In ordine decrescente "Proposto" precede "Piano": a parità di società vince il DPS proposto
+    futuri = futuri.sort_values(['societa', 'fonte', 'anno'], ascending=[True, False, True])
+    atteso = futuri.groupby('societa', observed=True).first()[['anno', 'valore']]
+    atteso = atteso.rename(columns={'anno': 'anno_dps_atteso', 'valore': 'dps_atteso'})
+
+    kpi = ultimo.join(atteso, how='left').join(anagrafica[['prezzo_riferimento']], how='left')
+    kpi['crescita_dps'] = (kpi['dps_atteso'] / kpi['ultimo_dps'] - 1) * 100
+    kpi['yield_attuale'] = (kpi['ultimo_dps'] / kpi['prezzo_riferimento'] * 100).round(2)
+    kpi['yield_forward'] = (kpi['dps_atteso'] / kpi['prezzo_riferimento'] * 100).round(2)
+    return kpi
+
+
+def griglia_rendimenti(prezzi, dps):
+    """Dividend yield (%) per ogni coppia DPS × prezzo, con un solo broadcast.
+
+    Restituisce una matrice float32 ``len(dps) × len(prezzi)``: le righe sono
+    i DPS (asse y della heatmap) e le colonne i prezzi (asse x).
+    """
+    prezzi = np.asarray(prezzi, dtype=np.float32)
+    dps = np.asarray(dps, dtype=np.float32)
+    return dps[:, None] / prezzi[None, :] * np.float32(100)
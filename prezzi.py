@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Ingestione a blocchi di storici di prezzo e dividend yield trailing 12 mesi.
+
+Il file dei prezzi (giornaliero o intraday, CSV con una colonna data/ora e
+una di prezzo) viene letto a blocchi da una pipeline di generatori: ogni
+blocco viene subito ridotto all'ultima quotazione di ogni giorno, per cui in
+memoria resta solo la serie giornaliera (circa 250 righe per anno) e mai il
+file grezzo. La serie viene poi unita alle date di stacco del dividendo e il
+rendimento trailing è calcolato con una finestra mobile di 365 giorni.
+"""
+from pathlib import Path
+
+import pandas as pd
+
+import archivio
+
+FILE_DIVIDENDI = archivio.CARTELLA_ARCHIVIO / "dividendi.csv"
+
+# Nomi di colonna riconosciuti nei file di prezzo (il primo trovato vince)
+COLONNE_DATA = ('data', 'Data', 'date', 'Date', 'Datetime', 'timestamp')
+COLONNE_PREZZO = ('chiusura', 'Chiusura', 'close', 'Close', 'Adj Close', 'prezzo', 'Price')
+
+RIGHE_PER_BLOCCO = 500_000
+
+
+def file_prezzi(societa):
+    """Percorso atteso del file prezzi di una società: dati_finanziari/prezzi_<ticker>.csv."""
+    return archivio.CARTELLA_ARCHIVIO / f"prezzi_{societa}.csv"
+
+
+def _scegli_colonna(intestazione, candidati, percorso):
+    for nome in candidati:
+        if nome in intestazione:
+            return nome
+    raise ValueError(f"{percorso}: nessuna colonna tra {candidati}")
+
+
+def leggi_a_blocchi(percorso, righe_per_blocco=RIGHE_PER_BLOCCO):
+    """Genera blocchi (data, prezzo) del file, senza caricarlo per intero."""
+    intestazione = pd.read_csv(percorso, nrows=0).columns
+    colonna_data = _scegli_colonna(intestazione, COLONNE_DATA, percorso)
+    colonna_prezzo = _scegli_colonna(intestazione, COLONNE_PREZZO, percorso)
+    lettore = pd.read_csv(
+        percorso,
+        usecols=[colonna_data, colonna_prezzo],
+        dtype={colonna_prezzo: 'float64'},
+        chunksize=righe_per_blocco,
+    )
+    for blocco in lettore:
+        yield pd.DataFrame({
+            'data': pd.to_datetime(blocco[colonna_data], format='ISO8601', utc=True).dt.tz_localize(None),
+            'prezzo': blocco[colonna_prezzo].to_numpy(),
+        })
+
+
+def chiusure_giornaliere(blocchi):
+    """Riduce ogni blocco all'ultima quotazione valida di ciascun giorno."""
+    for blocco in blocchi:
+        blocco = blocco.dropna().sort_values('data', kind='stable')
+        giorno = blocco['data'].dt.normalize()
+        yield blocco.groupby(giorno)['prezzo'].last()
+
+
+def serie_giornaliera(percorso, righe_per_blocco=RIGHE_PER_BLOCCO):
+    """Serie delle chiusure giornaliere dell'intero file, indicizzata per data."""
+    giornaliere = pd.concat(chiusure_giornaliere(leggi_a_blocchi(percorso, righe_per_blocco)))
+    # Un giorno spezzato tra due blocchi compare due volte: vale l'ultima quotazione letta
+    giornaliere = giornaliere[~giornaliere.index.duplicated(keep='last')].sort_index()
+    giornaliere.index.name = 'data'
+    return giornaliere.rename('prezzo')
+
+
+def carica_dividendi(societa, percorso=FILE_DIVIDENDI):
+    """Dividendi per data di stacco di una società (colonne: data_stacco, dps, esercizio)."""
+    dividendi = pd.read_csv(percorso, parse_dates=['data_stacco'])
+    return dividendi[dividendi['societa'] == societa].drop(columns='societa').sort_values('data_stacco')
+
+
+def dps_giornaliero(prezzi, dividendi):
+    """DPS staccato in ciascun giorno di quotazione (0 nei giorni senza stacco).
+
+    Ogni dividendo viene attribuito al primo giorno di quotazione dalla data
+    di stacco in poi; quelli staccati dopo l'ultima quotazione sono ignorati.
+    """
+    giorni = prezzi.index.to_frame(index=False, name='data')
+    stacchi = pd.merge_asof(
+        dividendi[['data_stacco', 'dps']].rename(columns={'data_stacco': 'data'}),
+        giorni.assign(giorno=giorni['data']),
+        on='data', direction='forward',
+    ).dropna(subset=['giorno'])
+    return stacchi.groupby('giorno')['dps'].sum().reindex(prezzi.index, fill_value=0.0)
+
+
+def yield_trailing(prezzi, dividendi, finestra='365D', inizio=None):
+    """Dividend yield trailing (%) giorno per giorno.
+
+    La somma mobile sulla ``finestra`` del DPS staccato dà i dividendi
+    degli ultimi 12 mesi, divisa per il prezzo del giorno. I giorni la cui
+    finestra comincia prima dello storico prezzi o di ``inizio`` (la data da
+    cui i ``dividendi`` sono completi) sono NaN, non somme parziali.
+    """
+    dps_12m = dps_giornaliero(prezzi, dividendi).rolling(finestra).sum()
+    coperto = max(prezzi.index[0], pd.Timestamp(inizio)) if inizio is not None else prezzi.index[0]
+    dps_12m = dps_12m.where(prezzi.index >= coperto + pd.Timedelta(finestra))
+    return pd.DataFrame({
+        'Prezzo (€)': prezzi,
+        'DPS 12M (€)': dps_12m,
+        'Dividend Yield TTM (%)': dps_12m / prezzi * 100,
+    })
+
+
+def carica_yield_trailing(societa, percorso_prezzi=None, dividendi=None, inizio=None, righe_per_blocco=RIGHE_PER_BLOCCO):
+    """Pipeline completa per una società; None se il file prezzi non esiste.
+
+    ``dividendi`` (colonne data_stacco e dps) sono di default quelli di
+    ``carica_dividendi``; ``inizio`` come in ``yield_trailing``.
+    """
+    percorso = Path(percorso_prezzi) if percorso_prezzi else file_prezzi(societa)
+    if not percorso.exists():
+        return None
+    if dividendi is None:
+        dividendi = carica_dividendi(societa)
+    return yield_trailing(serie_giornaliera(percorso, righe_per_blocco), dividendi, inizio=inizio)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Modello parametrico dell'EBITDA regolato nel reset del periodo RP4 (2025-2029).
+
+L'EBITDA di ogni anno è la somma delle componenti della tariffa:
+
+- remunerazione del capitale: WACC regolatorio (RP3 fino al 2024, RP4 dal
+  2025) per la RAB, che cresce al netto di investimenti e ammortamenti;
+- ammortamenti riconosciuti in tariffa, proporzionali alla RAB;
+- margine sui costi operativi: i costi riconosciuti crescono con
+  l'inflazione prevista e con l'obiettivo di efficienza, quelli effettivi
+  con l'inflazione effettiva;
+- rischio traffico: la tariffa unitaria è fissata sulle unità di servizio
+  previste; lo scostamento effettivo resta alla società entro la banda
+  morta, oltre è condiviso fino al limite e il resto torna agli utenti;
+- bilanciamento: quote di traffico e scostamenti di inflazione
+  (trasferimento all'inflazione) sono recuperate in tariffa con due anni di
+  ritardo; il saldo del periodo RP3, che nel 2024 include il recupero
+  degli anni COVID, viene azzerato dal reset salvo una quota residua
+  smaltita in pochi anni;
+- margine delle attività non regolamentate.
+
+Il 2024 è ancorato all'EBITDA in archivio: il bilanciamento RP3 è ciò che
+resta dopo le altre componenti. I valori di default sono una calibrazione
+sul percorso del Piano Industriale 2025-2029 (scarto quadratico medio di
+circa 1,5 €M, trovato valutando un lotto di combinazioni con questo
+stesso modello), non dati regolatori ufficiali.
+
+Tre grandezze sono residui di calibrazione, senza un riscontro regolatorio
+diretto: il bilanciamento RP3 del 2024 (il resto dell'EBITDA in archivio),
+``bilanciamento_residuo`` (7,5%) ed ``efficienza`` (3,25% l'anno), scelti
+per avvicinare il Piano. Anche così il modello non lo riproduce (223, 246,
+284, 324 e 364 €M contro 225, 246, 285, 325 e 361 €M del Piano): a default
+l'app mostra i valori del Piano e il modello solo con parametri cambiati
+(vedi dati.carica_ebitda_reset).
+
+Ogni parametro può essere uno scalare o un array di ``n`` scenari: tutte
+le componenti sono matrici scenari × anni calcolate in un solo passaggio
+vettoriale (un milione di scenari in circa un secondo).
+"""
+import numpy as np
+import pandas as pd
+
+ANNO_BASE = 2024
+ANNI = np.arange(ANNO_BASE, 2030)
+
+# Anni tra lo scostamento e il suo recupero in tariffa
+RITARDO_BILANCIAMENTO = 2
+
+PARAMETRI_DEFAULT = {
+    'rab': 1150.0,                      # RAB 2024 (€M)
+    'crescita_rab': 0.03,               # Crescita annua della RAB (investimenti netti)
+    'wacc_rp3': 0.044,                  # WACC regolatorio del periodo RP3
+    'wacc_rp4': 0.067,                  # WACC regolatorio del periodo RP4
+    'ammortamenti': 90.0,               # Ammortamenti riconosciuti 2024 (€M)
+    'costi': 620.0,                     # Costi operativi regolati 2024 (€M)
+    'efficienza': 0.0325,               # Crescita annua dei costi riconosciuti oltre quelli effettivi (residuo di calibrazione)
+    'inflazione_prevista': 0.02,        # Inflazione incorporata nella tariffa
+    'inflazione': 0.02,                 # Inflazione effettiva
+    'quota_inflazione': 1.0,            # Quota dello scostamento di inflazione recuperata
+    'ricavi_regolati': 900.0,           # Ricavi regolati 2024 (€M)
+    'traffico_previsto': 0.015,         # Crescita annua delle unità di servizio prevista
+    'traffico': 0.02,                   # Crescita annua delle unità di servizio effettiva
+    'banda_traffico': 0.02,             # Banda morta: scostamento interamente della società
+    'quota_rischio': 0.30,              # Quota della società oltre la banda morta
+    'limite_rischio': 0.10,             # Oltre il limite lo scostamento è tutto degli utenti
+    'bilanciamento_residuo': 0.075,     # Quota del bilanciamento RP3 smaltita dopo il reset (residuo di calibrazione)
+    'anni_smaltimento': 1,              # Anni di smaltimento della quota residua
+    'non_regolato': 12.0,               # EBITDA non regolamentato 2024 (€M)
+    'crescita_non_regolato': 0.20,      # Crescita annua dell'EBITDA non regolamentato
+}
+
+# Deviazioni standard (normali) dei parametri incerti nei lotti di scenari casuali
+INCERTEZZA_DEFAULT = {
+    'traffico': 0.03,
+    'inflazione': 0.01,
+    'efficienza': 0.01,
+    'crescita_rab': 0.01,
+    'crescita_non_regolato': 0.07,
+}
+
+PERCENTILI = (5, 50, 95)
+
+
+def _colonna(valore):
+    return np.asarray(valore, dtype=np.float64).reshape(-1, 1)
+
+
+def _ritarda(x, anni=RITARDO_BILANCIAMENTO):
+    ritardato = np.zeros_like(x)
+    ritardato[:, anni:] = x[:, :-anni]
+    return ritardato
+
+
+def quota_trattenuta(scarto, banda, quota, limite):
+    """Parte dello scostamento di traffico (relativo) che resta alla società, stesso segno."""
+    assoluto = np.abs(scarto)
+    condiviso = np.clip(assoluto, banda, limite) - banda
+    return np.sign(scarto) * (np.minimum(assoluto, banda) + quota * condiviso)
+
+
+def componenti(ebitda_base, **parametri):
+    """Componenti dell'EBITDA (€M), ciascuna una matrice scenari × anni (ANNI).
+
+    ``ebitda_base`` è l'EBITDA 2024; i ``parametri`` sovrascrivono
+    PARAMETRI_DEFAULT e possono essere array di ``n`` scenari.
+    """
+    p = {nome: _colonna(valore) for nome, valore in {**PARAMETRI_DEFAULT, **parametri}.items()}
+    k = np.arange(ANNI.size, dtype=np.float64)[None, :]
+    rp4 = k >= 1
+
+    crescita_rab = (1 + p['crescita_rab']) ** k
+    remunerazione = np.where(rp4, p['wacc_rp4'], p['wacc_rp3']) * p['rab'] * crescita_rab
+    ammortamenti = p['ammortamenti'] * crescita_rab
+
+    indice_previsto = (1 + p['inflazione_prevista']) ** k
+    indice_effettivo = (1 + p['inflazione']) ** k
+    costi = p['costi'] * (indice_previsto * (1 + p['efficienza']) ** k - indice_effettivo)
+    scarto_inflazione = p['costi'] * (indice_effettivo - indice_previsto)
+
+    ricavi = p['ricavi_regolati'] * indice_previsto
+    scarto_traffico = ((1 + p['traffico']) / (1 + p['traffico_previsto'])) ** k - 1
+    trattenuta = quota_trattenuta(scarto_traffico, p['banda_traffico'], p['quota_rischio'], p['limite_rischio'])
+    traffico = ricavi * trattenuta
+    # La quota degli utenti torna in tariffa con segno opposto (restituita se il traffico è superiore)
+    da_utenti = ricavi * (scarto_traffico - trattenuta)
+
+    non_regolato = p['non_regolato'] * (1 + p['crescita_non_regolato']) ** k
+
+    # Bilanciamento RP3 nel 2024: ciò che resta dell'EBITDA dopo le altre componenti
+    bilanciamento_rp3 = _colonna(ebitda_base) - (remunerazione + ammortamenti + non_regolato)[:, :1]
+    smaltimento = rp4 & (k <= p['anni_smaltimento'])
+    residuo = bilanciamento_rp3 * p['bilanciamento_residuo'] * smaltimento / np.maximum(p['anni_smaltimento'], 1)
+    bilanciamento = np.where(rp4, residuo, bilanciamento_rp3)
+    bilanciamento = bilanciamento + _ritarda(p['quota_inflazione'] * scarto_inflazione - da_utenti)
+
+    parti = {
+        'Remunerazione RAB': remunerazione,
+        'Ammortamenti': ammortamenti,
+        'Margine costi': costi,
+        'Rischio traffico': traffico,
+        'Bilanciamento': bilanciamento,
+        'Non regolamentato': non_regolato,
+    }
+    forma = np.broadcast_shapes(*(parte.shape for parte in parti.values()))
+    parti = {nome: np.broadcast_to(parte, forma) for nome, parte in parti.items()}
+    parti['EBITDA'] = sum(parti.values())
+    return parti
+
+
+def percorsi_ebitda(ebitda_base, **parametri):
+    """EBITDA (€M) per scenario × anno (ANNI), in un solo passaggio vettoriale."""
+    return componenti(ebitda_base, **parametri)['EBITDA']
+
+
+def indicatori(ebitda):
+    """Indicatori del reset per ogni scenario (righe di ``ebitda``).
+
+    Le colonne sono l'ultimo anno prima del reset, l'anno del reset e i
+    successivi (come ANNI). ``calo_reset`` è la variazione del reset sull'anno
+    prima, ``cagr_recupero`` la crescita annua composta dal reset all'ultimo
+    anno, ``recupero`` la variazione complessiva sullo stesso periodo
+    (decimali).
+    """
+    ebitda = np.atleast_2d(ebitda)
+    reset, ultimo = ebitda[:, 1], ebitda[:, -1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'calo_reset': reset / ebitda[:, 0] - 1,
+            'cagr_recupero': np.where(reset > 0, (ultimo / reset) ** (1 / (ebitda.shape[1] - 2)) - 1, np.nan),
+            'recupero': ultimo / reset - 1,
+        }
+
+
+def scenari_casuali(n, seed=0, incertezza=None, **parametri):
+    """Lotto di ``n`` set di parametri: i centrali con rumore normale su quelli di ``incertezza``."""
+    rng = np.random.default_rng(seed)
+    incertezza = INCERTEZZA_DEFAULT if incertezza is None else incertezza
+    centrali = {**PARAMETRI_DEFAULT, **parametri}
+    return {
+        nome: centrali[nome] + rng.standard_normal(n) * deviazione
+        for nome, deviazione in incertezza.items()
+    } | {nome: valore for nome, valore in parametri.items() if nome not in incertezza}
+
+
+def bande(ebitda):
+    """Percentili PERCENTILI dell'EBITDA per anno, su tutti gli scenari."""
+    valori = np.percentile(ebitda, PERCENTILI, axis=0)
+    out = pd.DataFrame({f'p{q}': riga for q, riga in zip(PERCENTILI, valori)})
+    out.insert(0, 'Anno', ANNI)
+    return out
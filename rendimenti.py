@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Backtest del rendimento totale per l'azionista (TSR) sullo storico prezzi.
+
+Dalla serie delle chiusure giornaliere e dai dividendi per data di stacco
+si costruiscono, una volta sola, due indici cumulati:
+
+- reinvestimento (DRIP): ogni dividendo netto viene reinvestito alla
+  chiusura del giorno di stacco, per cui la ricchezza per azione iniziale
+  è il prodotto cumulato dei fattori ``(P_t + D_t) / P_(t-1)``;
+- incasso: le azioni restano quelle iniziali e i dividendi netti si
+  accumulano in contanti (senza interessi), cioè la somma cumulata di ``D_t``.
+
+Il rendimento tra un ingresso e un'uscita qualsiasi è allora un rapporto
+o una differenza tra due elementi degli indici: tutte le coppie
+ingresso × durata della griglia si calcolano con un'indicizzazione
+vettoriale, senza cicli sulle date. Migliaia di ingressi per decine di
+durate richiedono pochi millisecondi.
+
+I dividendi possono essere netti della ritenuta italiana del 26% sui
+dividendi percepiti da persone fisiche.
+"""
+import numpy as np
+import pandas as pd
+
+import prezzi
+
+RITENUTA_ITALIA = 0.26
+
+# Stacco convenzionale (mese, giorno dell'anno successivo all'esercizio) se la data non è in archivio
+STACCO_CONVENZIONALE = (5, 20)
+
+GIORNI_ANNO = 365.25
+
+PERCENTILI = (5, 25, 50, 75, 95)
+
+
+def stacchi(dps_annuali, stacchi_noti):
+    """Dividendi per data di stacco dallo storico annuale del DPS (frame ``carica_dps``).
+
+    La data di stacco viene da ``stacchi_noti`` (colonne esercizio e
+    data_stacco, vedi ``prezzi.carica_dividendi``) o, se assente, è quella
+    convenzionale; gli esercizi senza dividendo (es. 2020) restano con DPS 0.
+    """
+    esercizi = dps_annuali['Anno Esercizio'].to_numpy()
+    convenzionali = pd.to_datetime(pd.DataFrame({
+        'year': esercizi + 1, 'month': STACCO_CONVENZIONALE[0], 'day': STACCO_CONVENZIONALE[1],
+    }))
+    noti = stacchi_noti.set_index('esercizio')['data_stacco'].reindex(esercizi)
+    return pd.DataFrame({
+        'data_stacco': noti.fillna(pd.Series(convenzionali.to_numpy(), index=noti.index)).to_numpy(),
+        'dps': dps_annuali['DPS (€)'].to_numpy(dtype=np.float64),
+        'esercizio': esercizi,
+    }).sort_values('data_stacco', kind='stable')
+
+
+def inizio_copertura(dps_annuali):
+    """Prima data da cui lo storico del DPS copre tutti i dividendi staccati.
+
+    Prima di questa data cade lo stacco dell'esercizio precedente al primo
+    in archivio, che il backtest non conosce: gli ingressi vanno limitati
+    a partire da qui per non sottostimare il TSR.
+    """
+    return pd.Timestamp(int(dps_annuali['Anno Esercizio'].min()), *STACCO_CONVENZIONALE)
+
+
+def indici(prezzi_giornalieri, dividendi, ritenuta=0.0):
+    """Indici cumulati giorno per giorno: (ricchezza con reinvestimento, dividendi netti incassati)."""
+    chiusure = prezzi_giornalieri.to_numpy(dtype=np.float64)
+    netti = prezzi.dps_giornaliero(prezzi_giornalieri, dividendi).to_numpy() * (1 - ritenuta)
+    fattori = np.empty_like(chiusure)
+    fattori[0] = 1.0
+    fattori[1:] = (chiusure[1:] + netti[1:]) / chiusure[:-1]
+    return np.cumprod(fattori), np.cumsum(netti)
+
+
+def tsr(prezzi_giornalieri, dividendi, anni, ritenuta=0.0, passo=1):
+    """TSR annualizzato per ogni ingresso × durata: (ingressi, anni, reinvestito, incassato).
+
+    Gli ingressi sono un giorno di quotazione ogni ``passo``, alla chiusura;
+    l'uscita è il primo giorno di quotazione a ``anni`` (anche frazionari)
+    dall'ingresso. ``reinvestito`` e ``incassato`` sono matrici float32
+    ``n_ingressi × n_durate`` di rendimenti annui decimali, NaN dove
+    l'uscita cade oltre la fine dello storico.
+    """
+    date = prezzi_giornalieri.index.to_numpy()
+    chiusure = prezzi_giornalieri.to_numpy(dtype=np.float64)
+    ricchezza, incassati = indici(prezzi_giornalieri, dividendi, ritenuta)
+    anni = np.asarray(anni, dtype=np.float64)
+
+    ingressi = np.arange(0, date.size, passo)
+    durate = (anni * GIORNI_ANNO * 86400).astype('timedelta64[s]')
+    uscite = np.searchsorted(date, date[ingressi][:, None] + durate[None, :])
+    valide = uscite < date.size
+    uscite = np.minimum(uscite, date.size - 1)
+
+    entrata = ingressi[:, None]
+    giorni = (date[uscite] - date[entrata]) / np.timedelta64(1, 'D')
+    multiplo_reinvestito = ricchezza[uscite] / ricchezza[entrata]
+    multiplo_incassato = (chiusure[uscite] + incassati[uscite] - incassati[entrata]) / chiusure[entrata]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        esponente = GIORNI_ANNO / giorni
+        # Non basta un esponente NaN: 1 ** NaN vale 1
+        reinvestito = np.where(valide, multiplo_reinvestito ** esponente - 1, np.nan)
+        incassato = np.where(valide, multiplo_incassato ** esponente - 1, np.nan)
+    return date[ingressi], anni, reinvestito.astype(np.float32), incassato.astype(np.float32)
+
+
+def distribuzione(anni, annui, percentili=PERCENTILI, soglia=0.10):
+    """Percentili del TSR annuo (%) per durata, sugli ingressi con uscita nello storico.
+
+    Colonne: ``Anni``, ``Ingressi``, ``P<n>`` per ogni percentile e
+    ``Quota ≥ soglia (%)``. Le durate senza alcun ingresso valido sono NaN.
+    """
+    valide = ~np.isnan(annui)
+    conteggi = valide.sum(axis=0)
+    # I NaN finiscono in fondo a ogni colonna ordinata: il percentile indicizza solo i primi ``conteggi``
+    ordinati = np.sort(annui, axis=0)
+    posizioni = np.asarray(percentili, dtype=np.float64)[:, None] / 100 * np.maximum(conteggi - 1, 0)
+    basso = np.floor(posizioni).astype(np.intp)
+    alto = np.minimum(basso + 1, np.maximum(conteggi - 1, 0))
+    colonne = np.arange(annui.shape[1])
+    frazione = posizioni - basso
+    valori = ordinati[basso, colonne] * (1 - frazione) + ordinati[alto, colonne] * frazione
+    valori[:, conteggi == 0] = np.nan
+    with np.errstate(invalid='ignore'):
+        quota = np.where(conteggi > 0, (annui >= soglia).sum(axis=0) / np.maximum(conteggi, 1) * 100, np.nan)
+    risultato = pd.DataFrame({'Anni': anni, 'Ingressi': conteggi})
+    for percentile, riga in zip(percentili, valori):
+        risultato[f'P{percentile}'] = riga * 100
+    risultato[f'Quota ≥ {soglia:.0%} (%)'] = quota
+    return risultato
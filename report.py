@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""Report HTML statici per emittente, generati in batch senza server Streamlit.
+
+Ogni report contiene il blocco degli indicatori chiave, i nove grafici
+della pagina, la tabella dei target e la tabella finanziaria, ed è un
+singolo file HTML autosufficiente (plotly.js incluso). Dati e figure
+arrivano dagli stessi ``dati.carica_*`` e ``grafici.crea_fig_*`` dell'app.
+
+Le società vengono distribuite su un pool di processi, ognuno con la
+propria cache di dati e figure. Un emittente viene rigenerato solo se
+l'impronta dei suoi input (dati in archivio, anagrafica, tabelle comuni,
+classifica dello screening, storico prezzi e codice di report, frame e
+grafici) è cambiata dall'ultima esecuzione; le impronte sono salvate in
+``indice.json`` nella cartella di uscita.
+
+Uso::
+
+    python report.py                          # tutte le società dell'archivio
+    python report.py --societa ENAV.MI --forza
+    python report.py --processi 8 --uscita /var/www/report
+    python report.py --riscalda               # cache su disco dell'app, da eseguire a ogni deploy
+"""
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import cache_disco
+import dati
+import grafici
+import prezzi
+import screening
+import simulazione
+import tabelle
+
+CARTELLA = Path(__file__).parent
+CARTELLA_USCITA = CARTELLA / "report"
+FILE_INDICE = "indice.json"
+
+# Incrementare per forzare la rigenerazione di tutti i report
+VERSIONE_REPORT = 1
+
+# Simulazione Monte Carlo con i valori iniziali degli slider di app.py (parametri, percorsi)
+SIMULAZIONE_PREDEFINITA = (
+    tuple(sorted((nome, valore) for nome, valore in simulazione.PARAMETRI_DEFAULT.items()
+                 if nome not in ('payout', 'elasticita_traffico'))),
+    1_000_000,
+)
+
+STILE = """
+body { font-family: -apple-system, "Segoe UI", Roboto, sans-serif; margin: 0 auto; max-width: 1200px; padding: 24px; color: #262730; }
+h1 { margin-bottom: 4px; }
+.nota { color: #808495; font-size: 14px; }
+.kpi { display: grid; grid-template-columns: repeat(4, 1fr); gap: 16px; margin: 24px 0; }
+.kpi div { border: 1px solid #e6e9ef; border-radius: 8px; padding: 12px 16px; }
+.kpi span { display: block; color: #808495; font-size: 14px; }
+.kpi strong { font-size: 28px; font-weight: 500; }
+.kpi em { color: #09ab3b; font-style: normal; font-size: 14px; }
+.grafici { display: grid; grid-template-columns: 1fr 1fr; gap: 16px; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 24px; font-size: 14px; }
+th, td { border-bottom: 1px solid #e6e9ef; padding: 6px 10px; text-align: right; }
+th:first-child, td:first-child { text-align: left; }
+.disclaimer { background: #f8f9fa; border-left: 5px solid #007bff; border-radius: 10px; padding: 12px 16px; font-size: 13px; }
+"""
+
+
+def _impronta_codice():
+    # Un cambiamento nel report, nei frame o nei costruttori delle figure invalida tutti i report;
+    # le liste dei moduli sono quelle delle cache su disco di dati e grafici
+    return cache_disco.versione_file(__file__, tabelle.__file__, screening.__file__, *dati.MODULI_FRAME, *grafici.MODULI_FIGURE)
+
+
+def _stato_prezzi(societa):
+    percorso = prezzi.file_prezzi(societa)
+    if not percorso.exists():
+        return None
+    return percorso.stat().st_mtime_ns, prezzi.FILE_DIVIDENDI.stat().st_mtime_ns
+
+
+def impronta_input(societa, codice=None):
+    """Hash di tutto ciò da cui dipende il report di una società."""
+    anagrafica = dati.carica_anagrafica()
+    return cache_disco.impronta(
+        VERSIONE_REPORT,
+        dati.VERSIONE_DATI,
+        codice if codice is not None else _impronta_codice(),
+        dati.carica_serie(societa),
+        anagrafica.loc[[societa]],
+        dati.carica_yield_comp(),
+        # Dell'universo conta solo la classifica disegnata, non il resto dell'indice
+        _classifica(societa),
+        *dati.carica_revenue_split(),
+        dati.carica_targets(),
+        _stato_prezzi(societa),
+    )
+
+
+def _classifica(societa):
+    """Le prime 10 società per rendimento nell'esercizio del DPS atteso (grafico dello screening)."""
+    anno = dati.carica_kpi(societa)['anno_dps_atteso']
+    return dati.carica_indice_screening().migliori('rendimento', 10, {'anno': (anno, anno)})
+
+
+def _figure(societa):
+    """Le nove figure della pagina, nell'ordine dell'app (grafici pigri inclusi, Monte Carlo esclusa)."""
+    kpi = dati.carica_kpi(societa)
+    nome_breve = kpi['nome_breve']
+    yield_comp = dati.carica_yield_comp()
+    df_yield_ttm = dati.carica_yield_trailing(societa)
+    corrente, futura = dati.carica_revenue_split()
+    return [
+        grafici.crea_fig_dps(dati.carica_dps(societa), nome_breve),
+        grafici.crea_fig_yield_trailing(df_yield_ttm) if df_yield_ttm is not None else grafici.crea_fig_yield(dati.carica_yield(societa)),
+        grafici.crea_fig_payout(dati.carica_payout(societa), nome_breve),
+        grafici.crea_fig_fcf_div(dati.carica_fcf_div(societa)),
+        grafici.crea_fig_proj(dati.carica_dps_projection(societa)),
+        grafici.crea_fig_reset(dati.carica_ebitda_reset(societa)),
+        grafici.crea_fig_screening(_classifica(societa), 'rendimento', screening.CRITERI['rendimento'][0], societa,
+                                   yield_comp[yield_comp['Società'] != nome_breve]),
+        grafici.crea_fig_revenue_split(corrente, 'Ricavi 2023 (%)', f"Composizione Ricavi {nome_breve} 2023"),
+        grafici.crea_fig_revenue_split(futura, 'Ricavi 2029E (%)', f"Previsione Composizione Ricavi {nome_breve} 2029"),
+    ]
+
+
+def _blocco_kpi(kpi):
+    voci = [
+        (f"Ultimo DPS Pagato (Esercizio {int(kpi['anno_ultimo_dps'])})", f"€ {kpi['ultimo_dps']:.4f}", ""),
+        ("Dividend Yield (Attuale)", f"{kpi['yield_attuale']:.2f}%", ""),
+        ("Politica di Payout", kpi['politica_payout'], ""),
+        (f"DPS Proposto (Esercizio {int(kpi['anno_dps_atteso'])})", f"€ {kpi['dps_atteso']:.4f}", f"{kpi['crescita_dps']:+.1f}%"),
+    ]
+    celle = "".join(
+        f"<div><span>{html.escape(etichetta)}</span><strong>{html.escape(valore)}</strong>"
+        + (f"<br><em>{html.escape(delta)}</em>" if delta else "") + "</div>"
+        for etichetta, valore, delta in voci
+    )
+    return f'<div class="kpi">{celle}</div>'
+
+
+def componi_html(societa):
+    """HTML completo e autosufficiente del report di una società."""
+    kpi = dati.carica_kpi(societa)
+    # plotly.js viene incluso una sola volta, con la prima figura
+    grafici_html = "".join(
+        f"<div>{fig.to_html(full_html=False, include_plotlyjs=(i == 0), config={'responsive': True})}</div>"
+        for i, fig in enumerate(_figure(societa))
+    )
+    return f"""<!DOCTYPE html>
+<html lang="it">
+<head>
+<meta charset="utf-8">
+<title>Analisi Dividendi {html.escape(kpi['nome'])}</title>
+<style>{STILE}</style>
+</head>
+<body>
+<h1>Analisi Dividendi: {html.escape(kpi['nome'])} ({html.escape(societa)})</h1>
+<p class="nota">Report generato il {datetime.now().strftime('%d/%m/%Y')}. Settore: {html.escape(str(kpi['settore']))}.
+Prezzo di riferimento: €{kpi['prezzo_riferimento']:.2f}.</p>
+<h2>📊 Indicatori Chiave del Dividendo</h2>
+{_blocco_kpi(kpi)}
+<h2>📈 Grafici</h2>
+<div class="grafici">{grafici_html}</div>
+<h2>🎯 Obiettivi Finanziari Piano Industriale 2025-2029</h2>
+{tabelle.tabella_target(dati.carica_targets()).to_html(border=0)}
+<h2>🔢 Tabella Finanziaria Riassuntiva</h2>
+{tabelle.tabella_finanziaria(dati.carica_fin(societa)).to_html(border=0)}
+<div class="disclaimer">Le informazioni contenute in questo report sono fornite esclusivamente a scopo
+informativo generale e/o educativo e non costituiscono consulenza finanziaria, legale, fiscale o di investimento.</div>
+</body>
+</html>
+"""
+
+
+def genera_report(societa, cartella):
+    """Scrive il report di una società; restituisce (societa, percorso, secondi, errore)."""
+    inizio = time.perf_counter()
+    try:
+        percorso = Path(cartella) / f"report_{societa}.html"
+        temporaneo = percorso.with_suffix(f".{os.getpid()}.tmp")
+        temporaneo.write_text(componi_html(societa), encoding="utf-8")
+        os.replace(temporaneo, percorso)
+        return societa, str(percorso), time.perf_counter() - inizio, None
+    except Exception as errore:  # un emittente con dati incompleti non deve fermare il batch
+        return societa, None, time.perf_counter() - inizio, f"{type(errore).__name__}: {errore}"
+
+
+def _genera_con_cartella(argomenti):
+    return genera_report(*argomenti)
+
+
+def _leggi_indice(cartella):
+    percorso = cartella / FILE_INDICE
+    return json.loads(percorso.read_text(encoding="utf-8")) if percorso.exists() else {}
+
+
+def genera_batch(societa=None, cartella=CARTELLA_USCITA, processi=None, forza=False):
+    """Rigenera i report cambiati; restituisce (generati, saltati, errori)."""
+    cartella = Path(cartella)
+    cartella.mkdir(parents=True, exist_ok=True)
+    societa = list(societa or dati.societa_disponibili())
+    indice = _leggi_indice(cartella)
+    codice = _impronta_codice()
+
+    impronte = {ticker: impronta_input(ticker, codice) for ticker in societa}
+    da_generare = [
+        ticker for ticker in societa
+        if forza
+        or indice.get(ticker, {}).get('impronta') != impronte[ticker]
+        or not (cartella / f"report_{ticker}.html").exists()
+    ]
+    saltati = [ticker for ticker in societa if ticker not in da_generare]
+
+    processi = min(processi or os.cpu_count() or 1, len(da_generare)) or 1
+    lavori = [(ticker, str(cartella)) for ticker in da_generare]
+    if processi == 1:
+        risultati = list(map(_genera_con_cartella, lavori))
+    else:
+        # Blocchi di più società per processo: la cache dei dati comuni resta calda nel worker
+        blocco = max(1, len(lavori) // (processi * 4))
+        with ProcessPoolExecutor(max_workers=processi) as pool:
+            risultati = list(pool.map(_genera_con_cartella, lavori, chunksize=blocco))
+
+    generati, errori = [], []
+    for ticker, percorso, secondi, errore in risultati:
+        if errore:
+            errori.append((ticker, errore))
+            continue
+        generati.append((ticker, percorso, secondi))
+        indice[ticker] = {
+            'impronta': impronte[ticker],
+            'file': Path(percorso).name,
+            'generato': datetime.now().isoformat(timespec='seconds'),
+        }
+    (cartella / FILE_INDICE).write_text(json.dumps(indice, indent=2, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+    return generati, saltati, errori
+
+
+def riscalda_societa(societa):
+    """Porta nella cache su disco figure e frame costosi di una società; restituisce i secondi."""
+    inizio = time.perf_counter()
+    _figure(societa)
+    # Proiezione con la Monte Carlo e what-if ai valori di default: le uniche loro figure su disco
+    bande_mc = dati.carica_simulazione_dps(societa, *SIMULAZIONE_PREDEFINITA)
+    grafici.crea_fig_proj(dati.carica_dps_projection(societa), bande_mc)
+    dati.carica_modello_whatif(societa)
+    cache_disco.attendi_scritture()
+    return time.perf_counter() - inizio
+
+
+def riscalda(societa=None, processi=None):
+    """Riscaldamento della cache su disco al deploy, prima di avviare il server.
+
+    Le figure e i frame calcolati vengono scritti da ``grafici`` e ``dati``
+    nella cache condivisa; il primo visitatore di ogni worker li legge da
+    lì. Gli spazi delle versioni di codice precedenti vengono eliminati.
+    """
+    dati.elimina_spazi_superati(grafici.SPAZIO_FIGURE)
+    societa = list(societa or dati.societa_disponibili())
+    processi = min(processi or os.cpu_count() or 1, len(societa)) or 1
+    if processi == 1:
+        secondi = list(map(riscalda_societa, societa))
+    else:
+        with ProcessPoolExecutor(max_workers=processi) as pool:
+            secondi = list(pool.map(riscalda_societa, societa))
+    cache_disco.pulisci()
+    return dict(zip(societa, secondi))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera i report HTML statici per emittente")
+    parser.add_argument("--societa", nargs="+", help="ticker da generare (default: tutti quelli in archivio)")
+    parser.add_argument("--uscita", type=Path, default=CARTELLA_USCITA, help="cartella dei report (default: report/)")
+    parser.add_argument("--processi", type=int, help="processi paralleli (default: numero di CPU)")
+    parser.add_argument("--forza", action="store_true", help="rigenera anche i report con input invariati")
+    parser.add_argument("--riscalda", action="store_true",
+                        help="popola solo la cache su disco dell'app (figure e simulazioni), da eseguire a ogni deploy")
+    args = parser.parse_args(argv)
+
+    if args.riscalda:
+        inizio = time.perf_counter()
+        riscaldate = riscalda(args.societa, args.processi)
+        spazi = cache_disco.statistiche().values()
+        voci, byte = sum(v for v, _ in spazi), sum(b for _, b in spazi)
+        print(f"{len(riscaldate)} società riscaldate in {time.perf_counter() - inizio:.1f}s: "
+              f"{voci} voci, {byte / 1024 / 1024:.1f} MB in {cache_disco.CARTELLA_CACHE}")
+        return 0
+
+    inizio = time.perf_counter()
+    generati, saltati, errori = genera_batch(args.societa, args.uscita, args.processi, args.forza)
+    for ticker, errore in errori:
+        print(f"ERRORE {ticker}: {errore}", file=sys.stderr)
+    print(f"{len(generati)} report generati, {len(saltati)} invariati, {len(errori)} errori "
+          f"in {time.perf_counter() - inizio:.1f}s -> {args.uscita}")
+    return 1 if errori else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
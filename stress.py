@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""Stress test del dividendo contro shock di traffico in stile COVID-19.
+
+Uno shock è un profilo dell'indice delle unità di servizio rispetto al
+piano, descritto da:
+
+- profondità: quota di traffico persa nell'anno dello shock;
+- durata: anni dallo shock alla fine del recupero;
+- forma del recupero (FORME): ``V`` recupero lineare, ``U`` lento nei
+  primi anni e rapido alla fine, ``L`` una parte della perdita resta
+  permanente.
+
+Il profilo da ripetere si ricava dallo storico locale delle unità di
+servizio (``dati_finanziari/traffico_<ticker>.csv``, colonne anno e
+unita_servizio): è il calo più profondo rispetto all'anno precedente, con
+la durata del ritorno a quel livello e la forma più vicina al percorso
+osservato. Senza il file vale PROFILO_COVID.
+
+Lo shock si propaga al dividendo in quattro passaggi:
+
+1. ricavi: la tariffa unitaria è fissata sulle unità di servizio previste,
+   per cui i ricavi scendono con il traffico nell'anno stesso. Sono quelli
+   dell'emittente in archivio (ricavi_di_piano), trattati per intero come
+   esposti al traffico (per ENAV la quota non regolata è intorno al 5%);
+2. bilanciamento: la parte della perdita oltre la quota della società
+   (``regolazione.quota_trattenuta``) torna in tariffa dopo
+   ``regolazione.RITARDO_BILANCIAMENTO`` anni, ripartita su ``anni_recupero``;
+3. FCF: il FCF di piano meno i ricavi persi al netto dei costi evitati,
+   più i recuperi in tariffa;
+4. DPS: la quota di payout (80%) del FCF, mai negativa.
+
+Gli scenari casuali (profondità, durata, forma e anno dello shock) sono
+matrici scenari × anni calcolate in blocchi di BLOCCO scenari, ciascuno
+con il proprio generatore (``SeedSequence.spawn``): il risultato non
+dipende dal numero di processi. Nell'app i blocchi girano in processo;
+``python stress.py --processi N`` (main) li distribuisce su un unico pool
+condiviso (_pool), avviato alla prima richiesta con il contesto spawn, per
+lotti più grandi di quelli proposti dall'app.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import archivio
+import regolazione
+
+_REGOLAZIONE = regolazione.PARAMETRI_DEFAULT
+
+PARAMETRI_DEFAULT = {
+    'payout': 0.80,                                         # Quota del FCF distribuita
+    'risparmio_costi': 0.15,                                # Costi evitati per € di ricavi persi
+    'anni_recupero': 5,                                     # Anni su cui il bilanciamento torna in tariffa
+    'banda_traffico': _REGOLAZIONE['banda_traffico'],
+    'quota_rischio': _REGOLAZIONE['quota_rischio'],
+    'limite_rischio': _REGOLAZIONE['limite_rischio'],
+}
+
+# Forma del recupero: (esponente della quota recuperata nel tempo, quota della perdita permanente)
+FORME = {
+    'V': (1.0, 0.0),
+    'U': (2.0, 0.0),
+    'L': (1.0, 0.3),
+}
+
+# Profilo di riferimento senza storico locale del traffico (ipotesi, non un dato osservato)
+PROFILO_COVID = {'profondita': 0.55, 'durata': 3, 'forma': 'V', 'anno': 2020}
+
+# Intervalli dei profili casuali: profondità (decimali), durata (anni, estremi inclusi)
+INTERVALLI_DEFAULT = {
+    'profondita': (0.05, 0.70),
+    'durata': (1, 5),
+}
+
+BLOCCO = 125_000
+
+_POOL = {'esecutore': None, 'processi': 0}
+_LOCK_POOL = threading.Lock()
+
+PERCENTILI = (5, 50, 95)
+
+# Forma delle righe di per_profondita calcolate sugli scenari di tutte le forme insieme
+TUTTE_LE_FORME = 'Tutte'
+
+
+def file_traffico(societa):
+    """Percorso atteso dello storico delle unità di servizio: dati_finanziari/traffico_<ticker>.csv."""
+    return archivio.CARTELLA_ARCHIVIO / f"traffico_{societa}.csv"
+
+
+def carica_traffico(percorso):
+    """Unità di servizio annue del file, indicizzate per anno."""
+    storico = pd.read_csv(percorso, usecols=['anno', 'unita_servizio']).dropna()
+    return storico.set_index('anno')['unita_servizio'].astype(np.float64).sort_index()
+
+
+def _colonna(valore):
+    return np.asarray(valore).reshape(-1, 1)
+
+
+def indice_traffico(profondita, durata, forma, inizio, n_anni):
+    """Traffico rispetto al piano (1 = piano) per scenario × anno.
+
+    ``profondita``, ``durata``, ``forma`` (codici in ordine di FORME) e
+    ``inizio`` (colonna dell'anno dello shock) sono scalari o array di
+    ``n`` scenari.
+    """
+    esponenti, permanenti = (np.array(valori) for valori in zip(*FORME.values()))
+    forma = _colonna(forma)
+    t = np.arange(n_anni)[None, :] - _colonna(inizio)
+    recuperato = np.clip(t / np.maximum(_colonna(durata), 1), 0, 1) ** esponenti[forma]
+    perdita = _colonna(profondita) * (permanenti[forma] + (1 - permanenti[forma]) * (1 - recuperato))
+    return np.where(t >= 0, 1 - perdita, 1.0)
+
+
+def profilo_storico(unita_servizio):
+    """Profilo dello shock più profondo dello storico (dict come PROFILO_COVID); None senza cali.
+
+    La profondità è il calo sull'anno precedente, la durata gli anni fino
+    al ritorno a quel livello (fino all'ultimo anno se non è stato
+    recuperato) e la forma quella di FORME con lo scarto quadratico minore
+    sul percorso osservato.
+    """
+    valori = unita_servizio.to_numpy(dtype=np.float64)
+    if valori.size < 2:
+        return None
+    cali = 1 - valori[1:] / valori[:-1]
+    shock = int(np.argmax(cali)) + 1
+    if cali[shock - 1] <= 0:
+        return None
+    relativo = valori[shock:] / valori[shock - 1]
+    tornato = np.flatnonzero(relativo >= 1)
+    durata = int(tornato[0]) if tornato.size else relativo.size - 1
+    profondita = float(1 - relativo[0])
+    forme = np.arange(len(FORME))
+    percorsi = indice_traffico(profondita, max(durata, 1), forme, 0, relativo.size)
+    scarti = ((percorsi - np.minimum(relativo, 1)) ** 2).sum(axis=1)
+    return {
+        'profondita': profondita,
+        'durata': max(durata, 1),
+        'forma': list(FORME)[int(np.argmin(scarti))],
+        'anno': int(unita_servizio.index[shock]),
+    }
+
+
+def ricavi_di_piano(ricavi_storici, anni):
+    """Ricavi attesi (€M) negli ``anni`` di piano dai ricavi per anno dell'emittente in archivio.
+
+    L'ultimo anno di ``ricavi_storici`` cresce con l'inflazione e il
+    traffico previsti di regolazione.PARAMETRI_DEFAULT. Senza ricavi lo
+    stress test non si calcola (ValueError): l'esposizione al traffico non
+    si prende in prestito da un'altra società.
+    """
+    ricavi_storici = ricavi_storici.dropna()
+    if ricavi_storici.empty:
+        raise ValueError("Lo stress test richiede i ricavi dell'emittente in archivio (metrica 'ricavi')")
+    crescita = (1 + _REGOLAZIONE['inflazione_prevista']) * (1 + _REGOLAZIONE['traffico_previsto'])
+    ultimo = ricavi_storici.index.max()
+    return float(ricavi_storici.loc[ultimo]) * crescita ** (np.asarray(anni) - ultimo)
+
+
+def propaga(indice, fcf_piano, ricavi, azioni, **parametri):
+    """FCF (€M) e DPS (€) per scenario × anno dato l'indice del traffico (vedi indice_traffico)."""
+    p = {**PARAMETRI_DEFAULT, **parametri}
+    ricavi = np.asarray(ricavi, dtype=np.float64)[None, :]
+    scarto = indice - 1
+    perdita = -ricavi * scarto
+    trattenuta = regolazione.quota_trattenuta(scarto, p['banda_traffico'], p['quota_rischio'], p['limite_rischio'])
+    da_utenti = ricavi * (trattenuta - scarto)
+
+    anni = indice.shape[1]
+    recupero = np.zeros_like(indice)
+    anni_recupero = max(int(p['anni_recupero']), 1)
+    for ritardo in range(regolazione.RITARDO_BILANCIAMENTO, min(regolazione.RITARDO_BILANCIAMENTO + anni_recupero, anni)):
+        recupero[:, ritardo:] += da_utenti[:, :anni - ritardo] / anni_recupero
+
+    fcf = np.asarray(fcf_piano, dtype=np.float64)[None, :] - perdita * (1 - p['risparmio_costi']) + recupero
+    dps = np.maximum(fcf, 0) * (p['payout'] / azioni)
+    return fcf, dps
+
+
+def esiti(dps, dps_iniziale, dps_piano):
+    """Tagli del dividendo per scenario (righe di ``dps``).
+
+    ``taglio``: almeno un DPS inferiore all'anno prima (il primo anno
+    rispetto a ``dps_iniziale``); ``profondita_taglio``: il calo annuo più
+    forte (decimali, 0 senza tagli); ``azzerato``: almeno un anno senza
+    dividendo; ``dividendi_persi``: quota dei dividendi di piano non pagati
+    nel periodo.
+    """
+    precedente = np.concatenate([np.full((dps.shape[0], 1), dps_iniziale), dps[:, :-1]], axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cali = np.where(precedente > 0, 1 - dps / precedente, 0.0)
+    return {
+        'taglio': (dps < precedente).any(axis=1),
+        'profondita_taglio': np.maximum(cali.max(axis=1), 0).astype(np.float32),
+        'azzerato': (dps <= 0).any(axis=1),
+        'dividendi_persi': (1 - dps.sum(axis=1) / np.sum(dps_piano)).astype(np.float32),
+    }
+
+
+def _simula_blocco(lavoro):
+    seme, n, fcf_piano, ricavi, azioni, dps_iniziale, dps_piano, intervalli, parametri = lavoro
+    rng = np.random.default_rng(seme)
+    anni = len(fcf_piano)
+    scenari = {
+        'profondita': rng.uniform(*intervalli['profondita'], n),
+        'durata': rng.integers(intervalli['durata'][0], intervalli['durata'][1] + 1, n),
+        'forma': rng.integers(0, len(FORME), n),
+        'inizio': rng.integers(0, anni, n),
+    }
+    indice = indice_traffico(**scenari, n_anni=anni)
+    _, dps = propaga(indice, fcf_piano, ricavi, azioni, **parametri)
+    return {
+        'profondita': scenari['profondita'].astype(np.float32),
+        'forma': scenari['forma'].astype(np.int8),
+        'inizio': scenari['inizio'].astype(np.int8),
+        'dps': dps.astype(np.float32),
+        **esiti(dps, dps_iniziale, dps_piano),
+    }
+
+
+def _pool(processi):
+    """Pool di processi condiviso (contesto spawn), ricreato solo se servono più processi."""
+    with _LOCK_POOL:
+        if _POOL['processi'] < processi:
+            if _POOL['esecutore'] is not None:
+                _POOL['esecutore'].shutdown(wait=False)
+            _POOL['esecutore'] = ProcessPoolExecutor(max_workers=processi, mp_context=multiprocessing.get_context('spawn'))
+            _POOL['processi'] = processi
+        return _POOL['esecutore']
+
+
+def simula(fcf_piano, ricavi, azioni, dps_iniziale, dps_piano, n_scenari=500_000, seed=0, processi=1,
+           intervalli=None, **parametri):
+    """Lotto di ``n_scenari`` shock casuali: dict di array per scenario (vedi esiti) più ``dps``.
+
+    ``fcf_piano``, ``ricavi`` (ricavi_di_piano) e ``dps_piano`` sono le
+    serie di piano per anno, ``azioni`` il numero di azioni (milioni) e
+    ``dps_iniziale`` l'ultimo DPS noto. I
+    blocchi di BLOCCO scenari girano in processo uno dopo l'altro, o con
+    ``processi`` > 1 sul pool condiviso (_pool).
+    """
+    intervalli = {**INTERVALLI_DEFAULT, **(intervalli or {})}
+    fcf = np.asarray(fcf_piano, dtype=np.float64)
+    ricavi = np.asarray(ricavi, dtype=np.float64)
+    dimensioni = [BLOCCO] * (n_scenari // BLOCCO) + ([n_scenari % BLOCCO] if n_scenari % BLOCCO else [])
+    semi = np.random.SeedSequence(seed).spawn(len(dimensioni))
+    lavori = [
+        (seme, n, fcf, ricavi, azioni, dps_iniziale, np.asarray(dps_piano), intervalli, parametri)
+        for seme, n in zip(semi, dimensioni)
+    ]
+    if min(processi, len(lavori)) > 1:
+        blocchi = list(_pool(processi).map(_simula_blocco, lavori))
+    else:
+        blocchi = list(map(_simula_blocco, lavori))
+    return {chiave: np.concatenate([blocco[chiave] for blocco in blocchi]) for chiave in blocchi[0]}
+
+
+def riepilogo(risultati):
+    """Probabilità (decimali) e profondità dei tagli su tutti gli scenari."""
+    taglio = risultati['taglio']
+    profondita = risultati['profondita_taglio'][taglio]
+    return pd.Series({
+        'scenari': taglio.size,
+        'prob_taglio': taglio.mean(),
+        'prob_azzeramento': risultati['azzerato'].mean(),
+        'taglio_mediano': np.median(profondita) if profondita.size else np.nan,
+        'taglio_p95': np.percentile(profondita, 95) if profondita.size else np.nan,
+        'dividendi_persi_medi': risultati['dividendi_persi'].mean(),
+    })
+
+
+def per_anno(risultati, anni, dps_iniziale):
+    """Percentili PERCENTILI del DPS e probabilità di taglio rispetto all'anno prima, per anno."""
+    dps = risultati['dps']
+    precedente = np.concatenate([np.full((dps.shape[0], 1), dps_iniziale, dtype=dps.dtype), dps[:, :-1]], axis=1)
+    bande = np.percentile(dps, PERCENTILI, axis=0)
+    out = pd.DataFrame({f'p{q}': riga for q, riga in zip(PERCENTILI, bande)})
+    out.insert(0, 'Anno', np.asarray(anni))
+    out['prob_taglio'] = (dps < precedente).mean(axis=0)
+    return out
+
+
+def _statistiche_classi(gruppi):
+    return pd.DataFrame({
+        'Scenari': gruppi.size(),
+        'Probabilità taglio (%)': gruppi['taglio'].mean() * 100,
+        'Taglio mediano (%)': gruppi['profondita_taglio'].median() * 100,
+        'Probabilità azzeramento (%)': gruppi['azzerato'].mean() * 100,
+        'Dividendi persi (%)': gruppi['dividendi_persi'].mean() * 100,
+    })
+
+
+def per_profondita(risultati, profondita=INTERVALLI_DEFAULT['profondita'], n_classi=14):
+    """Probabilità di taglio e taglio mediano per forma del recupero × classe di profondità dello shock.
+
+    Le ``n_classi`` classi dividono in parti uguali l'intervallo
+    ``profondita`` (minimo, massimo) da cui simula ha estratto gli shock.
+    Colonne: ``Forma``, ``Profondità (%)`` (centro della classe),
+    ``Scenari``, ``Probabilità taglio (%)``, ``Taglio mediano (%)`` (sui
+    soli scenari con taglio), ``Probabilità azzeramento (%)`` e
+    ``Dividendi persi (%)`` (media della quota del piano non pagata). Le
+    righe con Forma TUTTE_LE_FORME seguono quelle per forma e sono
+    calcolate sugli scenari di ogni classe presi insieme (la mediana non si
+    ricava dalle mediane per forma).
+    """
+    classi = np.linspace(*profondita, n_classi + 1)
+    classe = np.clip(np.digitize(risultati['profondita'], classi) - 1, 0, n_classi - 1)
+    df = pd.DataFrame({
+        'Forma': np.asarray(list(FORME))[risultati['forma']],
+        'classe': classe,
+        'taglio': risultati['taglio'],
+        'profondita_taglio': np.where(risultati['taglio'], risultati['profondita_taglio'], np.nan),
+        'azzerato': risultati['azzerato'],
+        'dividendi_persi': risultati['dividendi_persi'],
+    })
+    per_forma = _statistiche_classi(df.groupby(['Forma', 'classe'], sort=True)).reset_index()
+    tutte = _statistiche_classi(df.groupby('classe', sort=True)).reset_index().assign(Forma=TUTTE_LE_FORME)
+    out = pd.concat([per_forma, tutte[per_forma.columns]], ignore_index=True)
+    centri = (classi[:-1] + classi[1:]) / 2 * 100
+    out.insert(1, 'Profondità (%)', centri[out.pop('classe').to_numpy()])
+    return out
+
+
+def replay(profilo, fcf_piano, ricavi, azioni, dps_iniziale, dps_piano, **parametri):
+    """Il ``profilo`` ripetuto in ogni anno di piano: DPS (€) per anno dello shock × anno, più gli esiti."""
+    anni = np.asarray(fcf_piano.index)
+    forma = list(FORME).index(profilo['forma'])
+    inizi = np.arange(anni.size)
+    indice = indice_traffico(profilo['profondita'], profilo['durata'], np.full(anni.size, forma), inizi, anni.size)
+    _, dps = propaga(indice, np.asarray(fcf_piano, dtype=np.float64), ricavi, azioni, **parametri)
+    out = pd.DataFrame(dps, columns=anni)
+    out.insert(0, 'Anno shock', anni)
+    return out.assign(**{nome: valori for nome, valori in esiti(dps, dps_iniziale, dps_piano).items()})
+
+
+def main(argv=None):
+    import dati
+
+    parser = argparse.ArgumentParser(description="Stress test del dividendo contro shock di traffico, fuori dall'app")
+    parser.add_argument("--societa", default=dati.TICKER, help=f"ticker dell'emittente (default: {dati.TICKER})")
+    parser.add_argument("--scenari", type=int, default=2_000_000, help="scenari simulati (default 2.000.000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processi", type=int, default=os.cpu_count(), help="processi paralleli (default: numero di CPU)")
+    args = parser.parse_args(argv)
+
+    fcf_piano, ricavi, azioni, dps_iniziale, dps_piano = dati.input_stress(args.societa, dati.VERSIONE_DATI)
+    inizio = time.perf_counter()
+    risultati = simula(fcf_piano, ricavi, azioni, dps_iniziale, dps_piano, args.scenari, args.seed, args.processi)
+    print(f"{args.scenari} scenari su {args.processi} processi in {time.perf_counter() - inizio:.1f}s")
+    print(riepilogo(risultati).to_string())
+    print(per_anno(risultati, fcf_piano.index, dps_iniziale).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Formattazione per la visualizzazione delle tabelle tipizzate di ``dati``.
+
+I frame restano numerici (float32, categorical, flag booleani) finché
+servono ai calcoli e alle cache; qui vengono convertiti nelle tabelle di
+testo mostrate nell'app e nei report, con etichette e unità di misura.
+"""
+import numpy as np
+import pandas as pd
+
+
+def formatta_numero(valore, unita='€M'):
+    """Testo di un valore numerico; 'N/A' se mancante."""
+    if pd.isna(valore):
+        return 'N/A'
+    valore = float(np.float32(valore))
+    return f"{valore:g}x" if unita == 'x' else f"{valore:g}"
+
+
+def formatta_leva(valore, qualificatore):
+    """Leva finanziaria con il suo qualificatore: 'Cassa Netta', '<0.8x' o '1.45x'."""
+    if qualificatore == 'cassa_netta':
+        return 'Cassa Netta'
+    prefisso = '<' if qualificatore == 'inferiore' else ''
+    return prefisso + formatta_numero(valore, 'x')
+
+
+def tabella_finanziaria(df_fin):
+    """Tabella larga (una colonna per anno, 'E' per le stime) da ``dati.carica_fin``."""
+    testi = [
+        formatta_leva(valore, qualificatore) if unita == 'x' else formatta_numero(valore, unita)
+        for valore, unita, qualificatore in zip(df_fin['Valore'], df_fin['Unità'], df_fin['Qualificatore'])
+    ]
+    anni = [f"{anno}E" if stima else str(anno) for anno, stima in zip(df_fin['Anno'], df_fin['Stima'])]
+    larga = pd.DataFrame({'Metrica': df_fin['Metrica'], 'Anno': anni, 'Testo': testi})
+    ordine_anni = list(dict.fromkeys(anni))
+    return larga.pivot(index='Metrica', columns='Anno', values='Testo')[ordine_anni].rename_axis(columns=None)
+
+
+def _formatta_variazione(valore, tipo, nota):
+    if tipo == 'CAGR':
+        testo = f"{float(np.float32(valore)):+g}%"
+    elif tipo == 'Media annua':
+        testo = f"€{formatta_numero(valore)}M/anno medio"
+    else:
+        testo = f"{float(np.float32(valore)):+g}x"
+    return f"{testo} ({nota})" if nota else testo
+
+
+def _formatta_cumulato(valore):
+    # Importi cumulati di piano in euro, in miliardi se tondi: '€1 Mld', '€813M'
+    if pd.isna(valore):
+        return 'N/A'
+    if valore >= 1000 and valore % 1000 == 0:
+        return f"€{valore / 1000:g} Mld"
+    return f"€{formatta_numero(valore)}M"
+
+
+def tabella_target(df_targets):
+    """Tabella dei target di piano da ``dati.carica_targets``, indicizzata per metrica."""
+    cumulati = (df_targets['Tipo Variazione'] == 'Media annua').to_numpy()
+    colonne = {}
+    for anno in ('2024', '2029 Target'):
+        colonne[anno] = [
+            _formatta_cumulato(valore) if cumulato else formatta_numero(valore, unita)
+            for valore, unita, cumulato in zip(df_targets[anno], df_targets['Unità'], cumulati)
+        ]
+    colonne['CAGR/Diff'] = [
+        _formatta_variazione(*riga)
+        for riga in zip(df_targets['Variazione'], df_targets['Tipo Variazione'], df_targets['Nota'])
+    ]
+    return pd.DataFrame(colonne, index=pd.Index(df_targets['Metrica'].astype(str), name='Metrica'))
+
+
+def tabella_replay(df_replay):
+    """DPS di piano con lo shock ripetuto in ogni anno, da ``dati.carica_replay``, indicizzata per anno dello shock."""
+    anni = [colonna for colonna in df_replay.columns if isinstance(colonna, (int, np.integer))]
+    colonne = {str(anno): [f"€{valore:.3f}" for valore in df_replay[anno]] for anno in anni}
+    colonne['Taglio massimo'] = [f"{valore:.0%}" for valore in df_replay['profondita_taglio']]
+    colonne['Dividendi persi'] = [f"{valore:.0%}" for valore in df_replay['dividendi_persi']]
+    indice = pd.Index([f"Shock nel {anno}" for anno in df_replay['Anno shock']], name='Scenario')
+    return pd.DataFrame(colonne, index=indice)
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Tempi di rendering della pagina, aggregati nel processo.
+
+Si attiva con ``ENAV_TELEMETRIA=1``. Ogni misura ha una fase e un nome:
+
+- ``sezione``: una sezione della pagina (funzione ``sezione_*`` di app.py)
+- ``dati``: costruzione di un frame in ``dati.py`` (solo i cache miss)
+- ``dati_disco``: lettura di un frame dalla cache su disco condivisa
+- ``figura`` / ``figura_cache`` / ``figura_disco``: costruzione di una
+  figura Plotly o sua lettura dalla cache in memoria (hash degli input) o
+  dalla cache su disco condivisa
+- ``serializzazione``: invio di grafici e tabelle al browser (JSON/Arrow)
+- ``espansore``: contenuto di un espansore (testi markdown)
+- ``pagina``: rerun completo
+- ``avvio``: import dei moduli, primo contenuto inviato e prima pagina
+  completa del processo (misurati una volta, anche a telemetria disattiva)
+
+Da disattivata il costo è nullo: i decoratori restituiscono la funzione
+originale e ``misura`` un context manager vuoto condiviso.
+
+Le metriche sono leggibili dal pannello di debug dell'app (``?debug=1``)
+e, con ``ENAV_TELEMETRIA_PORTA`` impostata, da un endpoint HTTP del
+processo: ``/metrics`` in formato testo Prometheus, ``/metrics.json`` in
+JSON. Ogni processo espone le proprie metriche.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+ATTIVA = os.environ.get("ENAV_TELEMETRIA", "0") == "1"
+PORTA = os.environ.get("ENAV_TELEMETRIA_PORTA")
+
+# Limiti superiori (secondi) dei bucket dell'istogramma Prometheus
+BUCKET = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Campioni recenti tenuti per misura, per i percentili del pannello
+CAMPIONI = 512
+
+_VUOTO = nullcontext()
+_LOCK = threading.Lock()
+_MISURE = {}
+_AVVIO = {}
+_server = None
+
+
+class _Misura:
+    __slots__ = ("conteggio", "somma", "massimo", "bucket", "recenti")
+
+    def __init__(self):
+        self.conteggio = 0
+        self.somma = 0.0
+        self.massimo = 0.0
+        self.bucket = [0] * len(BUCKET)
+        self.recenti = deque(maxlen=CAMPIONI)
+
+
+def orologio():
+    """Istante di inizio di una misura manuale; None se la telemetria è disattiva."""
+    return time.perf_counter() if ATTIVA else None
+
+
+def registra(fase, nome, inizio):
+    """Chiude una misura aperta con ``orologio()``."""
+    if inizio is None:
+        return
+    _aggiungi(fase, nome, time.perf_counter() - inizio)
+
+
+def avvio(tappa, inizio):
+    """Registra una tappa dell'avvio del processo, solo la prima volta.
+
+    Le tappe sono misurate anche a telemetria disattiva (costano una
+    lettura dell'orologio per processo); alla tappa ``prima_pagina`` il
+    riepilogo viene scritto su stderr, nei log del server.
+    """
+    if tappa in _AVVIO:
+        return
+    _AVVIO[tappa] = durata = time.perf_counter() - inizio
+    _aggiungi("avvio", tappa, durata)
+    if tappa == "prima_pagina":
+        tappe = ", ".join(f"{nome} {secondi * 1000:.0f} ms" for nome, secondi in _AVVIO.items())
+        print(f"[avvio] {tappe}", file=sys.stderr, flush=True)
+
+
+def tappe_avvio():
+    """Tempi delle tappe di avvio registrate finora, in millisecondi."""
+    return {tappa: round(secondi * 1000, 1) for tappa, secondi in _AVVIO.items()}
+
+
+def _aggiungi(fase, nome, durata):
+    with _LOCK:
+        misura = _MISURE.get((fase, nome))
+        if misura is None:
+            misura = _MISURE[(fase, nome)] = _Misura()
+        misura.conteggio += 1
+        misura.somma += durata
+        misura.massimo = max(misura.massimo, durata)
+        for i, limite in enumerate(BUCKET):
+            if durata <= limite:
+                misura.bucket[i] += 1
+                break
+        misura.recenti.append(durata)
+
+
+@contextmanager
+def _misura_attiva(fase, nome):
+    inizio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registra(fase, nome, inizio)
+
+
+def misura(fase, nome):
+    """Context manager che cronometra il blocco (vuoto se la telemetria è disattiva)."""
+    return _misura_attiva(fase, nome) if ATTIVA else _VUOTO
+
+
+def cronometra(fase, nome=None):
+    """Decoratore che cronometra ogni chiamata; da disattivata restituisce la funzione invariata."""
+    def decora(funzione):
+        if not ATTIVA:
+            return funzione
+        etichetta = nome or funzione.__name__
+
+        @functools.wraps(funzione)
+        def misurata(*args, **kwargs):
+            inizio = time.perf_counter()
+            try:
+                return funzione(*args, **kwargs)
+            finally:
+                registra(fase, etichetta, inizio)
+        return misurata
+    return decora
+
+
+sezione = cronometra("sezione")
+
+
+def azzera():
+    with _LOCK:
+        _MISURE.clear()
+
+
+def riepilogo():
+    """Una riga per misura: conteggio, totale, media, p50, p95 e massimo in millisecondi."""
+    with _LOCK:
+        istantanea = [(fase, nome, m.conteggio, m.somma, m.massimo, list(m.recenti)) for (fase, nome), m in _MISURE.items()]
+    righe = []
+    for fase, nome, conteggio, somma, massimo, recenti in istantanea:
+        p50, p95 = np.percentile(recenti, [50, 95]) * 1000
+        righe.append({
+            'fase': fase,
+            'nome': nome,
+            'conteggio': conteggio,
+            'totale_ms': round(somma * 1000, 2),
+            'medio_ms': round(somma / conteggio * 1000, 2),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'max_ms': round(massimo * 1000, 2),
+        })
+    return sorted(righe, key=lambda riga: riga['totale_ms'], reverse=True)
+
+
+def esporta_json():
+    return json.dumps({'misure': riepilogo()}, ensure_ascii=False, indent=2)
+
+
+def esporta_prometheus():
+    """Istogramma ``enav_durata_secondi`` in formato testo Prometheus (0.0.4)."""
+    with _LOCK:
+        istantanea = [(fase, nome, list(m.bucket), m.conteggio, m.somma) for (fase, nome), m in sorted(_MISURE.items())]
+    righe = [
+        "# HELP enav_durata_secondi Durata delle operazioni di rendering della pagina.",
+        "# TYPE enav_durata_secondi histogram",
+    ]
+    for fase, nome, bucket, conteggio, somma in istantanea:
+        etichette = f'fase="{fase}",nome="{nome}"'
+        cumulato = 0
+        for limite, quanti in zip(BUCKET, bucket):
+            cumulato += quanti
+            righe.append(f'enav_durata_secondi_bucket{{{etichette},le="{limite}"}} {cumulato}')
+        righe.append(f'enav_durata_secondi_bucket{{{etichette},le="+Inf"}} {conteggio}')
+        righe.append(f'enav_durata_secondi_sum{{{etichette}}} {somma:.6f}')
+        righe.append(f'enav_durata_secondi_count{{{etichette}}} {conteggio}')
+    return "\n".join(righe) + "\n"
+
+
+def _gestore_metriche():
+    # http.server viene importato solo se l'endpoint è configurato
+    from http.server import BaseHTTPRequestHandler
+
+    class GestoreMetriche(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                corpo, tipo = esporta_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                corpo, tipo = esporta_json(), "application/json; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            dati = corpo.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(dati)))
+            self.end_headers()
+            self.wfile.write(dati)
+
+        def log_message(self, *args):
+            pass
+
+    return GestoreMetriche
+
+
+def avvia_esportatore(porta=PORTA):
+    """Avvia (una sola volta per processo) l'endpoint HTTP delle metriche, se configurato."""
+    global _server
+    if not ATTIVA or not porta:
+        return None
+    with _LOCK:
+        if _server is None:
+            from http.server import ThreadingHTTPServer
+            _server = ThreadingHTTPServer(("0.0.0.0", int(porta)), _gestore_metriche())
+            threading.Thread(target=_server.serve_forever, name="telemetria", daemon=True).start()
+    return _server
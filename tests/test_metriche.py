@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import archivio
+import metriche
+
+
+@pytest.fixture(scope="module")
+def enav():
+    larga = metriche.tabella_larga(archivio.in_pandas(archivio.apri_archivio()))
+    return metriche.calcola_metriche(larga).loc['ENAV.MI']
+
+
+def test_copertura_e_payout_enav(enav):
+    anni = [2021, 2022, 2023, 2024]
+    np.testing.assert_array_equal(enav.loc[anni, 'copertura_fcf'], [0.0, 1.31, 0.80, 1.36])
+    np.testing.assert_array_equal(enav.loc[anni, 'dividendi_pagati'], [58.6, 106.6, 124.6, 146.3])
+    assert enav.loc[2022, 'payout_fcf'] == pytest.approx(0.1967 / 0.26 * 100)
+    # FCF per azione negativo: payout al riempimento, non un rapporto negativo
+    assert enav.loc[2021, 'payout_fcf'] == 0.0
+
+
+def test_kernel_denominatori_non_positivi_e_nan():
+    r = metriche.kernel_payout(
+        dps=np.array([0.2, 0.2, 0.2, np.nan]),
+        eps=np.array([0.0, -0.1, 0.4, 0.4]),
+        fcf_per_azione=np.array([0.4, 0.4, 0.0, 0.4]),
+        fcf=np.array([100.0, -5.0, 0.0, 100.0]),
+        azioni=541.0,
+        riempimento=-1.0,
+    )
+    np.testing.assert_array_equal(r['payout_eps'], [-100.0, -100.0, 50.0, np.nan])
+    np.testing.assert_array_equal(r['payout_fcf'], [50.0, 50.0, -100.0, np.nan])
+    np.testing.assert_array_equal(r['copertura_fcf'], [0.92, -1.0, -1.0, np.nan])
+    assert not any(np.isinf(valori).any() for valori in r.values())
+
+
+def test_kernel_broadcasting_societa_per_anni():
+    dps = np.array([[0.2, 0.3], [0.1, 0.0]])
+    r = metriche.kernel_payout(dps, eps=np.array([0.4, 0.5]), fcf_per_azione=0.5, fcf=np.array([[50.0], [0.0]]),
+                               azioni=np.array([[100.0], [200.0]]))
+    np.testing.assert_allclose(r['payout_eps'], [[50.0, 60.0], [25.0, 0.0]])
+    np.testing.assert_array_equal(r['dividendi_pagati'], [[20.0, 30.0], [20.0, 0.0]])
+    np.testing.assert_array_equal(r['copertura_fcf'], [[2.5, 1.67], [0.0, 0.0]])
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import regolazione
+
+EBITDA_2024 = 311.0  # Stima in archivio
+PIANO = [225.0, 246.0, 285.0, 325.0, 361.0]
+
+
+def test_default_vicini_al_piano_e_residui_documentati():
+    ebitda = regolazione.percorsi_ebitda(EBITDA_2024)[0]
+    assert ebitda[0] == pytest.approx(EBITDA_2024)
+    # Gli scarti dal Piano riportati nel docstring del modulo
+    np.testing.assert_array_equal(np.round(ebitda[1:]), [223, 246, 284, 324, 364])
+    assert np.sqrt(np.mean((ebitda[1:] - PIANO) ** 2)) < 2.0
+
+
+def test_le_componenti_sommano_all_ebitda():
+    parti = regolazione.componenti(EBITDA_2024, traffico=[-0.05, 0.0, 0.04])
+    ebitda = parti.pop('EBITDA')
+    assert ebitda.shape == (3, regolazione.ANNI.size)
+    np.testing.assert_allclose(sum(parti.values()), ebitda)
+    np.testing.assert_allclose(ebitda[:, 0], EBITDA_2024)
+
+
+def test_lotto_uguale_agli_scenari_singoli():
+    scenari = regolazione.scenari_casuali(50, seed=4, wacc_rp4=0.06)
+    lotto = regolazione.percorsi_ebitda(EBITDA_2024, **scenari)
+    for i in (0, 17, 49):
+        singolo = regolazione.percorsi_ebitda(EBITDA_2024, **{nome: v[i] if np.ndim(v) else v for nome, v in scenari.items()})
+        np.testing.assert_allclose(lotto[i], singolo[0])
+    np.testing.assert_array_equal(scenari['wacc_rp4'], 0.06)
+    assert scenari['traffico'].shape == (50,)
+
+
+def test_quota_trattenuta_banda_e_limite():
+    scarti = np.array([0.01, -0.01, 0.06, -0.06, 0.25, -0.25])
+    attese = np.array([0.01, -0.01, 0.02 + 0.3 * 0.04, -(0.02 + 0.3 * 0.04), 0.02 + 0.3 * 0.08, -(0.02 + 0.3 * 0.08)])
+    np.testing.assert_allclose(regolazione.quota_trattenuta(scarti, 0.02, 0.3, 0.10), attese)
+
+
+def test_indicatori_del_reset():
+    ebitda = np.array([[300.0, 240.0, 250.0, 260.0, 280.0, 300.0]])
+    r = regolazione.indicatori(ebitda)
+    assert r['calo_reset'][0] == pytest.approx(-0.2)
+    assert r['recupero'][0] == pytest.approx(0.25)
+    assert r['cagr_recupero'][0] == pytest.approx(1.25 ** 0.25 - 1)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import rendimenti
+
+
+@pytest.fixture(scope="module")
+def storico():
+    date = pd.bdate_range('2019-01-01', '2023-12-29')
+    rng = np.random.default_rng(3)
+    chiusure = pd.Series(8 * np.exp(np.cumsum(rng.normal(0, 0.01, date.size))), index=date)
+    dividendi = pd.DataFrame({
+        'data_stacco': pd.to_datetime(['2019-05-20', '2020-05-18', '2021-05-24', '2022-05-23', '2023-05-22']),
+        'dps': [0.21, 0.0, 0.11, 0.20, 0.23],
+    })
+    return chiusure, dividendi
+
+
+def tsr_per_ingresso(chiusure, dividendi, entrata, uscita, ritenuta):
+    # Riferimento con un ciclo sui giorni: azioni possedute e contanti incassati
+    azioni, contanti = 1.0, 0.0
+    dps = dividendi.set_index('data_stacco')['dps'] * (1 - ritenuta)
+    for giorno in chiusure.index[entrata + 1:uscita + 1]:
+        staccato = dps.get(giorno, 0.0)
+        azioni += azioni * staccato / chiusure[giorno]
+        contanti += staccato
+    prezzo_entrata, prezzo_uscita = chiusure.iloc[entrata], chiusure.iloc[uscita]
+    return azioni * prezzo_uscita / prezzo_entrata, (prezzo_uscita + contanti) / prezzo_entrata
+
+
+def test_tsr_uguale_al_ciclo_sui_giorni(storico):
+    chiusure, dividendi = storico
+    ingressi, anni, reinvestito, incassato = rendimenti.tsr(chiusure, dividendi, [1.0, 2.5], ritenuta=0.26, passo=50)
+    for riga, data in enumerate(ingressi):
+        entrata = chiusure.index.get_loc(data)
+        for colonna, durata in enumerate(anni):
+            uscita = chiusure.index.searchsorted(data + pd.Timedelta(days=durata * rendimenti.GIORNI_ANNO))
+            if uscita >= chiusure.size:
+                assert np.isnan(reinvestito[riga, colonna]) and np.isnan(incassato[riga, colonna])
+                continue
+            esponente = rendimenti.GIORNI_ANNO / (chiusure.index[uscita] - data).days
+            attesi = np.array(tsr_per_ingresso(chiusure, dividendi, entrata, uscita, 0.26)) ** esponente - 1
+            np.testing.assert_allclose([reinvestito[riga, colonna], incassato[riga, colonna]], attesi, rtol=1e-5)
+
+
+def test_reinvestire_rende_di_piu_senza_ritenuta(storico):
+    chiusure, dividendi = storico
+    _, _, lordo, _ = rendimenti.tsr(chiusure, dividendi, [3.0])
+    _, _, netto, _ = rendimenti.tsr(chiusure, dividendi, [3.0], ritenuta=rendimenti.RITENUTA_ITALIA)
+    validi = ~np.isnan(lordo)
+    assert validi.any() and (lordo[validi] > netto[validi]).all()
+
+
+def test_distribuzione_come_nanpercentile():
+    rng = np.random.default_rng(0)
+    annui = rng.normal(0.08, 0.05, (400, 3))
+    annui[300:, 1] = np.nan
+    annui[:, 2] = np.nan
+    out = rendimenti.distribuzione(np.array([1.0, 2.0, 3.0]), annui)
+    assert list(out['Ingressi']) == [400, 300, 0]
+    for percentile in rendimenti.PERCENTILI:
+        np.testing.assert_allclose(out[f'P{percentile}'][:2], np.nanpercentile(annui[:, :2], percentile, axis=0) * 100)
+    assert out.iloc[2, 2:].isna().all()
+    assert out['Quota ≥ 10% (%)'][0] == pytest.approx((annui[:, 0] >= 0.10).mean() * 100)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import screening
+
+
+@pytest.fixture(scope="module")
+def tabella():
+    rng = np.random.default_rng(11)
+    n = 5_000
+    tabella = pd.DataFrame({
+        'societa': np.repeat([f'S{i:04d}' for i in range(n // 10)], 10),
+        'anno': np.tile(np.arange(2016, 2026), n // 10).astype(np.int16),
+        'rendimento': rng.uniform(0, 12, n),
+        'payout_fcf': rng.uniform(0, 150, n),
+        'copertura_fcf': rng.uniform(0, 3, n),
+        'leva': rng.uniform(0, 6, n),
+        'cagr_dps': rng.normal(3, 8, n),
+    })
+    for colonna in screening.CRITERI:
+        tabella.loc[rng.random(n) < 0.1, colonna] = np.nan
+    return tabella
+
+
+FILTRI = {'anno': (2020, 2024), 'payout_fcf': (None, 90.0), 'leva': (1.0, 4.5)}
+
+
+def maschera(tabella, filtri):
+    dentro = np.ones(len(tabella), dtype=bool)
+    for colonna, (minimo, massimo) in filtri.items():
+        valori = tabella[colonna]
+        dentro &= valori.notna().to_numpy()
+        if minimo is not None:
+            dentro &= (valori >= minimo).to_numpy()
+        if massimo is not None:
+            dentro &= (valori <= massimo).to_numpy()
+    return dentro
+
+
+def test_candidati_come_una_maschera(tabella):
+    indice = screening.IndiceScreening(tabella)
+    np.testing.assert_array_equal(indice.candidati(FILTRI), np.flatnonzero(maschera(tabella, FILTRI)))
+    assert indice.candidati({'anno': (2030, None)}).size == 0
+    assert indice.anni == list(range(2016, 2026))
+
+
+@pytest.mark.parametrize("criterio", list(screening.CRITERI))
+def test_primi_k_come_un_ordinamento(tabella, criterio):
+    indice = screening.IndiceScreening(tabella)
+    decrescente = screening.CRITERI[criterio][1]
+    attesi = (tabella[maschera(tabella, FILTRI)].dropna(subset=[criterio])
+              .sort_values(criterio, ascending=not decrescente, kind='stable').head(25))
+    classifica = indice.migliori(criterio, 25, FILTRI)
+    assert list(classifica['posizione']) == list(range(1, 26))
+    colonne = ['societa', 'anno', criterio]
+    pd.testing.assert_frame_equal(classifica[colonne], attesi[colonne].reset_index(drop=True))
+
+
+def test_parita_e_k_oltre_i_candidati():
+    tabella = pd.DataFrame({
+        'societa': ['A', 'B', 'C', 'D'], 'anno': np.int16(2024),
+        'rendimento': [5.0, np.nan, 7.0, 5.0], 'payout_fcf': 60.0, 'copertura_fcf': 1.2, 'leva': 2.0, 'cagr_dps': 1.0,
+    })
+    classifica = screening.IndiceScreening(tabella).migliori('rendimento', 10)
+    assert list(classifica['societa']) == ['C', 'A', 'D']
+    assert list(screening.IndiceScreening(tabella).migliori('rendimento', 2, decrescente=False)['societa']) == ['A', 'D']
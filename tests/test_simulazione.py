@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+import simulazione
+
+AZIONI = 541.7
+DPS_PIANO = [0.28, 0.29, 0.30, 0.31, 0.32]
+PROIEZIONE = pd.DataFrame({
+    'Anno': [2024, 2025, 2026, 2027, 2028, 2029],
+    'DPS (€)': [0.27] + DPS_PIANO,
+    'Tipo': ['Proposto'] + ['Piano'] * 5,
+})
+SENZA_INCERTEZZA = {'vol_traffico': 0.0, 'prob_shock': 0.0, 'vol_reset': 0.0, 'sd_capex': 0.0}
+
+
+def test_fcf_di_piano_inverte_il_payout():
+    fcf = simulazione.fcf_di_piano(PROIEZIONE, AZIONI, 0.8)
+    assert list(fcf.index) == [2025, 2026, 2027, 2028, 2029]
+    np.testing.assert_allclose(fcf.to_numpy() * 0.8 / AZIONI, DPS_PIANO)
+
+
+def test_senza_incertezza_il_dps_e_quello_di_piano():
+    fcf = simulazione.fcf_di_piano(PROIEZIONE, AZIONI)
+    bande = simulazione.simula_dps(fcf, AZIONI, 0.27, n_percorsi=1_000, **SENZA_INCERTEZZA)
+    for colonna in ('p5', 'p50', 'p95', 'media'):
+        np.testing.assert_allclose(bande[colonna], DPS_PIANO, rtol=1e-4)  # percorsi in float32
+    np.testing.assert_array_equal(bande['prob_taglio'], 0.0)
+
+
+def test_stesso_seme_stesso_risultato():
+    fcf = simulazione.fcf_di_piano(PROIEZIONE, AZIONI)
+    primo = simulazione.simula_dps(fcf, AZIONI, 0.27, n_percorsi=50_000, seed=7)
+    pdt.assert_frame_equal(primo, simulazione.simula_dps(fcf, AZIONI, 0.27, n_percorsi=50_000, seed=7))
+    assert not primo.equals(simulazione.simula_dps(fcf, AZIONI, 0.27, n_percorsi=50_000, seed=8))
+    assert (primo['p5'] <= primo['p50']).all() and (primo['p50'] <= primo['p95']).all()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+import regolazione
+import stress
+
+AZIONI = 541.7
+DPS_PIANO = np.array([0.28, 0.29, 0.30, 0.31, 0.32])
+FCF_PIANO = pd.Series(DPS_PIANO * AZIONI / 0.8, index=np.arange(2025, 2030))
+RICAVI = stress.ricavi_di_piano(pd.Series([1011.31, 1037.0], index=[2023, 2024]), FCF_PIANO.index)
+
+
+@pytest.fixture
+def blocchi_piccoli(monkeypatch):
+    monkeypatch.setattr(stress, 'BLOCCO', 2_000)
+
+
+def simula(n, seed=0, processi=1, **kwargs):
+    return stress.simula(FCF_PIANO, RICAVI, AZIONI, 0.27, DPS_PIANO, n, seed, processi, **kwargs)
+
+
+def uguali(a, b):
+    return a.keys() == b.keys() and all(np.array_equal(a[chiave], b[chiave]) for chiave in a)
+
+
+def test_ricavi_dall_ultimo_anno_dell_emittente():
+    crescita = (1 + regolazione.PARAMETRI_DEFAULT['inflazione_prevista']) * (1 + regolazione.PARAMETRI_DEFAULT['traffico_previsto'])
+    np.testing.assert_allclose(RICAVI, 1037.0 * crescita ** np.arange(1, 6))
+    with pytest.raises(ValueError):
+        stress.ricavi_di_piano(pd.Series([np.nan], index=[2024]), FCF_PIANO.index)
+
+
+def test_stesso_seme_stesso_risultato(blocchi_piccoli):
+    primo = simula(9_000, seed=5)
+    assert primo['dps'].shape == (9_000, 5)
+    assert uguali(primo, simula(9_000, seed=5))
+    assert not uguali(primo, simula(9_000, seed=6))
+
+
+def test_seriale_e_parallelo_uguali(blocchi_piccoli):
+    try:
+        assert uguali(simula(9_000, seed=5), simula(9_000, seed=5, processi=2))
+    finally:
+        if stress._POOL['esecutore'] is not None:
+            stress._POOL['esecutore'].shutdown()
+            stress._POOL.update(esecutore=None, processi=0)
+
+
+def test_senza_shock_il_dps_e_quello_di_piano():
+    indice = stress.indice_traffico(0.0, 3, 0, 0, 5)
+    fcf, dps = stress.propaga(indice, FCF_PIANO, RICAVI, AZIONI)
+    np.testing.assert_allclose(fcf[0], FCF_PIANO)
+    np.testing.assert_allclose(dps[0], DPS_PIANO)
+    esiti = stress.esiti(dps, 0.27, DPS_PIANO)
+    assert not esiti['taglio'][0] and not esiti['azzerato'][0]
+    assert esiti['dividendi_persi'][0] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_profilo_storico_di_uno_shock_a_v():
+    unita = pd.Series([100.0, 102.0, 45.9, 73.44, 102.0, 104.0], index=np.arange(2018, 2024))
+    profilo = stress.profilo_storico(unita)
+    assert profilo == {'profondita': pytest.approx(0.55), 'durata': 2, 'forma': 'V', 'anno': 2020}
+    assert stress.profilo_storico(pd.Series([100.0, 101.0, 103.0], index=[2021, 2022, 2023])) is None
+
+
+def test_mediana_su_tutte_le_forme_dagli_scenari_insieme(blocchi_piccoli):
+    risultati = simula(12_000, seed=2)
+    classi = stress.per_profondita(risultati, n_classi=4)
+    tutte = classi[classi['Forma'] == stress.TUTTE_LE_FORME].reset_index(drop=True)
+    assert tutte['Scenari'].sum() == 12_000
+    confini = np.linspace(*stress.INTERVALLI_DEFAULT['profondita'], 5)
+    classe = np.clip(np.digitize(risultati['profondita'], confini) - 1, 0, 3)
+    for i in range(4):
+        scelti = (classe == i) & risultati['taglio']
+        assert tutte.loc[i, 'Taglio mediano (%)'] == pytest.approx(np.median(risultati['profondita_taglio'][scelti]) * 100)
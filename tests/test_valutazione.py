@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+import valutazione
+
+FLUSSI = [0.28, 0.29, 0.30, 0.31, 0.32]
+
+
+def valore_cella(flussi, ke, g, anni_transizione=valutazione.ANNI_TRANSIZIONE):
+    # Riferimento anno per anno per una sola cella della griglia
+    crescita_iniziale = flussi[-1] / flussi[-2] - 1
+    valore = sum(f / (1 + ke) ** t for t, f in enumerate(flussi, 1))
+    flusso, t = flussi[-1], len(flussi)
+    for passo in range(1, anni_transizione + 1):
+        flusso *= 1 + crescita_iniziale + (g - crescita_iniziale) * passo / anni_transizione
+        t += 1
+        valore += flusso / (1 + ke) ** t
+    return valore + flusso * (1 + g) / (ke - g) / (1 + ke) ** t
+
+
+def test_griglia_uguale_al_calcolo_per_cella():
+    ke = np.linspace(0.06, 0.10, 5)
+    g = np.linspace(0.0, 0.03, 4)
+    valori = valutazione.valori_multistadio(FLUSSI, ke, g)
+    assert valori.shape == (4, 5)
+    attesi = [[valore_cella(FLUSSI, k, c) for k in ke] for c in g]
+    np.testing.assert_allclose(valori, attesi, rtol=1e-12)
+
+
+def test_rendita_perpetua_senza_crescita():
+    valori = valutazione.valori_multistadio([1.0, 1.0, 1.0], [0.08], [0.0], anni_transizione=0)
+    assert valori[0, 0] == pytest.approx(12.5)
+
+
+def test_celle_senza_valore_terminale_finito():
+    ke = np.array([0.03, 0.034, 0.04])
+    valori = valutazione.valori_multistadio(FLUSSI, ke, [0.03])
+    assert np.isnan(valori[0, :2]).all() and np.isfinite(valori[0, 2])
+
+
+def test_ke_implicito_ritrova_il_costo_del_capitale():
+    ke = np.linspace(0.05, 0.12, 71)
+    g = np.array([0.0, 0.02])
+    valori = valutazione.valori_multistadio(FLUSSI, ke, g)
+    prezzi = valori[:, 30]
+    implicito = np.array([valutazione.ke_implicito(ke, valori, p)[i] for i, p in enumerate(prezzi)])
+    np.testing.assert_allclose(implicito, ke[30], rtol=1e-9)
+    assert np.isnan(valutazione.ke_implicito(ke, valori, 1000.0)).all()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+import whatif
+
+BASE = {'prezzo': 6.0, 'ultimo_dps': 0.27, 'dps_atteso': 0.28, 'eps': 0.25, 'fcf': 200.0, 'azioni': 500.0,
+        'payout_politica': 0.8}
+
+
+@pytest.fixture
+def modello():
+    df_payout = pd.DataFrame({
+        'Anno': [2024, 2025], 'EPS (€)': [0.23, 0.25], 'DPS (€)': [0.27, 0.28], 'FCF per Share (€)': [0.37, 0.40],
+        'Payout Ratio (% di EPS)': [117.0, 112.0], 'Payout Ratio (% di FCF)': [73.0, 70.0],
+    })
+    df_yield_comp = pd.DataFrame({'Società': ['ENAV', 'Snam'], 'Dividend Yield 2024E (%)': [4.67, 6.0]})
+    return whatif.crea_modello(**BASE, df_payout=df_payout, df_yield_comp=df_yield_comp)
+
+
+def test_riepilogo_dello_scenario_di_base(modello):
+    r = whatif.riepilogo(modello)
+    assert r['yield_attuale'] == 4.5 and r['yield_forward'] == pytest.approx(4.67)
+    assert r['payout_eps'] == pytest.approx(112.0)
+    assert r['payout_fcf'] == pytest.approx(70.0)
+    assert r['copertura_fcf'] == pytest.approx(1.43)
+    assert r['dps_sostenibile'] == pytest.approx(0.32)
+
+
+def test_il_prezzo_ricalcola_solo_i_rendimenti(modello):
+    modello.ricalcoli.clear()
+    assert modello.imposta('prezzo', 7.0)
+    assert not modello.imposta('prezzo', 7.0)
+    whatif.riepilogo(modello)
+    modello['df_payout']
+    assert set(modello.ricalcoli) == {'yield_attuale', 'yield_forward'}
+
+
+def test_deriva_copia_solo_i_nodi_toccati(modello):
+    copia = modello.deriva()
+    for nome in ('kernel', 'df_payout', 'fig_payout', 'df_yield_comp'):
+        assert copia[nome] is modello[nome]
+    assert copia.ricalcoli == {}
+
+    copia.imposta('dps_atteso', 0.20)
+    assert copia['df_payout'] is not modello['df_payout']
+    assert copia['df_payout'].loc[1, 'DPS (€)'] == 0.20
+    assert modello['df_payout'].loc[1, 'DPS (€)'] == 0.28
+    assert modello['yield_forward'] == pytest.approx(4.67)
+    assert copia['df_yield_comp'].loc[0, 'Dividend Yield 2024E (%)'] == pytest.approx(3.33)
+    assert copia['fig_payout'] is not modello['fig_payout']
+    # Il rendimento attuale non dipende dal DPS atteso: resta il valore condiviso
+    assert copia['yield_attuale'] == modello['yield_attuale']
+    assert 'yield_attuale' not in copia.ricalcoli
+
+
+def test_una_formula_non_si_imposta(modello):
+    with pytest.raises(KeyError):
+        modello.imposta('kernel', {})
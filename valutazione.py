@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Valutazione a sconto dei flussi (DDM e FCFE) su griglie costo del capitale × crescita.
+
+Il modello è a tre stadi, per azione:
+
+1. flussi espliciti: DPS proposto e di piano (DDM) o FCF per azione
+   (FCFE), scontati anno per anno al costo del capitale proprio ``ke``;
+2. transizione: per ``anni_transizione`` anni la crescita passa
+   linearmente da quella dell'ultimo anno di piano a quella terminale ``g``;
+3. valore terminale di Gordon sull'ultimo flusso della transizione.
+
+Tutte le combinazioni ``g`` × ``ke`` sono calcolate in un solo passaggio:
+i flussi di transizione dipendono solo da ``g`` e gli sconti solo da
+``ke``, per cui il loro valore attuale è un prodotto matriciale
+``(n_g × T) @ (T × n_ke)``; stadio esplicito e valore terminale sono
+broadcast. Una griglia 1000 × 1000 (un milione di scenari) richiede
+qualche decina di millisecondi.
+
+Le celle con ``ke - g`` sotto ``SPREAD_MINIMO`` non hanno un valore
+terminale finito e sono NaN.
+"""
+import numpy as np
+
+# Differenza minima tra costo del capitale e crescita terminale (Gordon)
+SPREAD_MINIMO = 0.005
+
+ANNI_TRANSIZIONE = 5
+
+
+def valori_multistadio(flussi, ke, g, anni_transizione=ANNI_TRANSIZIONE, crescita_iniziale=None):
+    """Valore attuale per azione su tutta la griglia: matrice float64 ``len(g) × len(ke)``.
+
+    ``flussi`` sono i flussi espliciti per azione, uno per anno a partire
+    dal primo anno dopo la data di valutazione; ``ke`` e ``g`` sono tassi
+    decimali. ``crescita_iniziale`` è la crescita da cui parte la
+    transizione (default: quella dell'ultimo anno esplicito).
+    """
+    flussi = np.asarray(flussi, dtype=np.float64)
+    ke = np.asarray(ke, dtype=np.float64)
+    g = np.asarray(g, dtype=np.float64)
+    n = flussi.size
+    if crescita_iniziale is None:
+        crescita_iniziale = flussi[-1] / flussi[-2] - 1 if n > 1 and flussi[-2] > 0 else 0.0
+
+    # Stadio esplicito: dipende solo da ke
+    sconto = (1 + ke)[None, :] ** -np.arange(1, n + anni_transizione + 1)[:, None]
+    valore = (flussi @ sconto[:n])[None, :]
+
+    # Transizione: crescita lineare verso g, flussi (n_g × T) per sconti (T × n_ke)
+    passi = np.arange(1, anni_transizione + 1) / anni_transizione
+    crescite = crescita_iniziale + (g[:, None] - crescita_iniziale) * passi[None, :]
+    transizione = flussi[-1] * np.cumprod(1 + crescite, axis=1)
+    valore = valore + transizione @ sconto[n:]
+
+    # Valore terminale di Gordon, scontato alla fine della transizione
+    ultimo = transizione[:, -1] if anni_transizione else np.full(g.size, flussi[-1])
+    spread = ke[None, :] - g[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        valore = valore + (ultimo * (1 + g))[:, None] / spread * sconto[-1][None, :]
+    valore[spread < SPREAD_MINIMO] = np.nan
+    return valore
+
+
+def ke_implicito(ke, valori, prezzo):
+    """Costo del capitale che eguaglia il valore al prezzo, per ogni riga (crescita) della griglia.
+
+    È il rendimento totale annuo atteso comprando al ``prezzo`` se i flussi
+    si realizzano; NaN se il prezzo è fuori dal valore coperto dalla griglia.
+    """
+    ke = np.asarray(ke, dtype=np.float64)
+    # Il valore decresce con ke; le celle NaN (ke troppo vicino a g) valgono "infinito"
+    valori = np.where(np.isnan(valori), np.inf, valori)
+    sopra = (valori > prezzo).sum(axis=1)
+    validi = (sopra > 0) & (sopra < ke.size)
+    i = np.clip(sopra, 1, ke.size - 1)
+    righe = np.arange(valori.shape[0])
+    v0, v1 = valori[righe, i - 1], valori[righe, i]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frazione = np.where(np.isfinite(v0), (v0 - prezzo) / (v0 - v1), 1.0)
+    return np.where(validi, ke[i - 1] + frazione * (ke[i] - ke[i - 1]), np.nan)
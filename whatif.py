@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Motore what-if incrementale sulle metriche derivate del dividendo.
+
+Le metriche sono nodi di un grafo di dipendenze: ogni nodo conosce gli
+input da cui dipende e viene ricalcolato solo quando uno di questi cambia.
+Cambiare il prezzo di riferimento invalida quindi soltanto i rendimenti e
+il grafico di confronto dei rendimenti; payout, copertura FCF e relativo
+grafico restano quelli già calcolati.
+
+Il modello con i valori di base viene valutato una volta per processo
+(vedi ``dati.carica_modello_whatif``) e ogni sessione ne riceve una
+``deriva()``: finché l'utente non cambia un input la sessione condivide
+tutti i valori e le figure del modello di base, e un input cambiato
+ricalcola privatamente solo i nodi a valle (copy-on-write per nodo).
+"""
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+import grafici
+import metriche
+
+# Le formule scrivono su copie superficiali dei frame di base: senza copy-on-write
+# le modifiche di una sessione finirebbero nel modello condiviso (anche senza dati.py)
+pd.set_option("mode.copy_on_write", True)
+
+
+class GrafoDipendenze:
+    """Grafo di nodi input e formule con ricalcolo pigro e incrementale."""
+
+    def __init__(self):
+        self._formule = {}
+        self._dipendenti = defaultdict(set)
+        self._valori = {}
+        self._sporchi = set()
+        self.ricalcoli = Counter()
+
+    def input(self, nome, valore):
+        self._valori[nome] = valore
+
+    def formula(self, nome, *dipendenze):
+        """Decoratore: registra ``funzione(*valori_dipendenze)`` come nodo ``nome``."""
+        def registra(funzione):
+            self._formule[nome] = (funzione, dipendenze)
+            for dipendenza in dipendenze:
+                self._dipendenti[dipendenza].add(nome)
+            self._sporchi.add(nome)
+            return funzione
+        return registra
+
+    def imposta(self, nome, valore):
+        """Aggiorna un input e invalida solo i nodi a valle. Restituisce True se è cambiato."""
+        if nome in self._formule:
+            raise KeyError(f"{nome!r} è una formula, non un input")
+        if nome in self._valori and self._valori[nome] == valore:
+            return False
+        self._valori[nome] = valore
+        # Lettura senza inserimento: il dizionario dei dipendenti è condiviso con le copie di deriva()
+        da_visitare = list(self._dipendenti.get(nome, ()))
+        while da_visitare:
+            nodo = da_visitare.pop()
+            if nodo not in self._sporchi:
+                self._sporchi.add(nodo)
+                da_visitare.extend(self._dipendenti.get(nodo, ()))
+        return True
+
+    def valuta_tutto(self):
+        """Calcola tutti i nodi: un grafo senza nodi sporchi si può condividere in sola lettura."""
+        for nome in self._formule:
+            self[nome]
+        return self
+
+    def deriva(self):
+        """Copia leggera che condivide formule e valori calcolati con questo grafo.
+
+        Le modifiche fatte con ``imposta`` sulla copia non toccano l'originale:
+        i nodi invalidati vengono ricalcolati in oggetti nuovi della copia.
+        """
+        copia = GrafoDipendenze.__new__(GrafoDipendenze)
+        copia._formule = self._formule
+        copia._dipendenti = self._dipendenti
+        copia._valori = dict(self._valori)
+        copia._sporchi = set(self._sporchi)
+        copia.ricalcoli = Counter()
+        return copia
+
+    def __getitem__(self, nome):
+        if nome in self._sporchi:
+            funzione, dipendenze = self._formule[nome]
+            self._valori[nome] = funzione(*(self[d] for d in dipendenze))
+            self._sporchi.discard(nome)
+            self.ricalcoli[nome] += 1
+        return self._valori[nome]
+
+
+INPUT = ('prezzo', 'ultimo_dps', 'dps_atteso', 'eps', 'fcf', 'azioni', 'payout_politica')
+
+
+def crea_modello(prezzo, ultimo_dps, dps_atteso, eps, fcf, azioni, payout_politica, df_payout, df_yield_comp, nome="ENAV"):
+    """Modello what-if inizializzato con i valori correnti di una società, già valutato.
+
+    ``df_payout`` e ``df_yield_comp`` sono i frame di base: l'ultimo anno del
+    payout e la barra della società nel confronto yield vengono sostituiti
+    con i valori dello scenario. Le figure del modello di base, uguali per
+    tutte le sessioni, vanno anche nella cache su disco; quelle ricalcolate
+    dalle ``deriva()`` hanno gli input di una sola sessione e restano in
+    memoria.
+    """
+    g = GrafoDipendenze()
+    costruttori = {'payout': grafici.crea_fig_payout, 'yield_comp': grafici.crea_fig_yield_comp}
+    for chiave, valore in {
+        'prezzo': prezzo,
+        'ultimo_dps': ultimo_dps,
+        'dps_atteso': dps_atteso,
+        'eps': eps,
+        'fcf': fcf,
+        'azioni': azioni,
+        'payout_politica': payout_politica,
+    }.items():
+        g.input(chiave, valore)
+
+    @g.formula('yield_attuale', 'ultimo_dps', 'prezzo')
+    def _(dps, prezzo):
+        return round(dps / prezzo * 100, 2)
+
+    @g.formula('yield_forward', 'dps_atteso', 'prezzo')
+    def _(dps, prezzo):
+        return round(dps / prezzo * 100, 2)
+
+    @g.formula('kernel', 'dps_atteso', 'eps', 'fcf', 'azioni')
+    def _(dps, eps, fcf, azioni):
+        risultati = metriche.kernel_payout(dps, eps, fcf / azioni, fcf, azioni)
+        return {chiave: float(valore) for chiave, valore in risultati.items()}
+
+    @g.formula('dps_sostenibile', 'fcf', 'azioni', 'payout_politica')
+    def _(fcf, azioni, payout):
+        return max(fcf, 0.0) * payout / azioni
+
+    # Copie superficiali: con il copy-on-write di pandas si duplicano solo i blocchi modificati
+    @g.formula('df_payout', 'dps_atteso', 'eps', 'fcf', 'azioni', 'kernel')
+    def _(dps, eps, fcf, azioni, kernel):
+        df = df_payout.copy(deep=False)
+        ultimo = df.index[-1]
+        df.loc[ultimo, ['EPS (€)', 'DPS (€)', 'FCF per Share (€)']] = [eps, dps, fcf / azioni]
+        df.loc[ultimo, 'Payout Ratio (% di EPS)'] = kernel['payout_eps']
+        df.loc[ultimo, 'Payout Ratio (% di FCF)'] = kernel['payout_fcf']
+        return df
+
+    @g.formula('fig_payout', 'df_payout')
+    def _(df):
+        return costruttori['payout'](df, nome)
+
+    @g.formula('df_yield_comp', 'yield_forward')
+    def _(rendimento):
+        df = df_yield_comp.copy(deep=False)
+        df.loc[df['Società'] == nome, df.columns[1]] = rendimento
+        return df
+
+    @g.formula('fig_yield_comp', 'df_yield_comp')
+    def _(df):
+        return costruttori['yield_comp'](df)
+
+    g.valuta_tutto()
+    costruttori.update(payout=grafici.crea_fig_payout.solo_memoria, yield_comp=grafici.crea_fig_yield_comp.solo_memoria)
+    return g
+
+
+def riepilogo(g):
+    """Metriche scalari dello scenario, pronte per la visualizzazione."""
+    kernel = g['kernel']
+    return pd.Series({
+        'yield_attuale': g['yield_attuale'],
+        'yield_forward': g['yield_forward'],
+        'payout_eps': kernel['payout_eps'],
+        'payout_fcf': kernel['payout_fcf'],
+        'copertura_fcf': kernel['copertura_fcf'],
+        'dps_sostenibile': g['dps_sostenibile'],
+    })